@@ -0,0 +1,68 @@
+"""
+Measures state space exploration throughput with different numbers of worker processes
+
+python benchmarks/parallel_explore.py problems/TowersOfHanoi.py --problem-args 10
+"""
+
+import argparse
+import sys
+import time
+
+from soluzion_server.parallel_explore import explore_parallel
+from soluzion_server.problem_loading import load_problem
+from soluzion_server.state_graph import explore
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        "problem_path", type=str, help="Path to the Soluzion problem file"
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4, 8],
+        help="numbers of worker processes to measure",
+    )
+    parser.add_argument(
+        "--problem-args",
+        type=str,
+        nargs="*",
+        default=[],
+        help="extra command line arguments for the problem, like the number of disks for TowersOfHanoi",
+    )
+    parser.add_argument(
+        "--state-limit", type=int, default=10_000_000, help="state limit"
+    )
+    args = parser.parse_args()
+
+    # Problems read their own options from sys.argv, and spawned workers inherit it
+    sys.argv = [sys.argv[0], args.problem_path, *args.problem_args]
+    problem = load_problem(args.problem_path)
+
+    results = []
+    start = time.perf_counter()
+    graph = explore(problem, args.state_limit)
+    results.append(("serial", time.perf_counter() - start))
+    states = len(graph)
+    del graph
+
+    for processes in args.processes:
+        start = time.perf_counter()
+        graph = explore_parallel(problem.__file__, processes, args.state_limit)
+        results.append((f"{processes} processes", time.perf_counter() - start))
+        assert len(graph) == states
+        del graph
+
+    print()
+    for name, elapsed in results:
+        print(
+            f"{name:>12}  states={states:8d}  time={elapsed:7.2f}s  {states / elapsed:9.0f} states/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Measures how long the server takes to start from a fresh interpreter: importing its entry point, checking
+a problem with --check, and serving until /health answers
+
+python benchmarks/startup_time.py problems/TowersOfHanoi.py --runs 10
+python benchmarks/startup_time.py problems/TowersOfHanoi.py --runs 10 --precompute-graph
+"""
+
+import argparse
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_command(command: list[str]) -> float:
+    start = time.perf_counter()
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def time_until_healthy(command: list[str], port: int, timeout: float) -> float:
+    """
+    Starts the server and polls /health until it answers, then stops it
+    """
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(
+                    f"http://127.0.0.1:{port}/health", timeout=1
+                ):
+                    return time.perf_counter() - start
+            except OSError:
+                if server.poll() is not None:
+                    raise RuntimeError(f"The server exited with {server.returncode}")
+                time.sleep(0.005)
+        raise RuntimeError(f"The server didn't answer within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("problem_path", type=str, help="Soluzion problem to serve")
+    parser.add_argument(
+        "--runs", type=int, default=10, help="number of times to time each step"
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=30, help="seconds to wait for the server"
+    )
+    # Anything else is passed on to the server
+    args, extra = parser.parse_known_args()
+
+    server = [sys.executable, "-m", "soluzion_server.main", args.problem_path]
+
+    def healthy() -> float:
+        # Without the cache directory, so every run starts the same way
+        port = free_port()
+        command = server + ["-p", str(port), "--no-cache", *extra]
+        return time_until_healthy(command, port, args.timeout)
+
+    steps = {
+        "import": lambda: time_command(
+            [sys.executable, "-c", "import soluzion_server.main"]
+        ),
+        "--check": lambda: time_command(server + ["--check", *extra]),
+        "healthy": healthy,
+    }
+
+    for name, step in steps.items():
+        step()  # Warm the OS file cache
+        times = [step() for _ in range(args.runs)]
+        print(
+            f"{name:>8}  median={statistics.median(times) * 1000:7.1f}ms  "
+            f"min={min(times) * 1000:7.1f}ms  max={max(times) * 1000:7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Measures the memory held by game states under a simulated load of many rooms, with and without interning
+
+python benchmarks/state_interning.py problems/TowersOfHanoi.py --rooms 500 --moves 50
+"""
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+import soluzion_server.state_interning as state_interning
+from soluzion_server.problem_loading import load_problem
+
+
+def simulate(problem, rooms: int, moves: int, seed: int):
+    """
+    Plays random moves in every room, keeping each room's state stack alive like a GameSession does
+    :return: the list of (current_state, state_stack) per room
+    """
+    rng = random.Random(seed)
+    games = []
+    for _ in range(rooms):
+        state = state_interning.intern_state(problem.State())
+        stack = []
+        for _ in range(moves):
+            if state.is_goal():
+                break
+            operators = [op for op in problem.OPERATORS if op.is_applicable(state)]
+            if not operators:
+                break
+            stack.append(state)
+            state = state_interning.intern_state(rng.choice(operators).apply(state))
+        games.append((state, stack))
+    return games
+
+
+def measure(problem, rooms: int, moves: int, seed: int, interning: bool):
+    state_interning.intern_table = None
+    if interning:
+        state_interning.enable_state_interning()
+
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    games = simulate(problem, rooms, moves, seed)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    unique = len(
+        {
+            id(state)
+            for current_state, stack in games
+            for state in [current_state, *stack]
+        }
+    )
+    del games
+    return current, elapsed, unique
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        "problem_path", type=str, help="Path to the Soluzion problem file"
+    )
+    parser.add_argument(
+        "--rooms", type=int, default=500, help="number of simulated rooms"
+    )
+    parser.add_argument(
+        "--moves", type=int, default=50, help="random moves played per room"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args()
+
+    problem = load_problem(args.problem_path)
+
+    results = {}
+    for interning in (False, True):
+        results[interning] = measure(
+            problem, args.rooms, args.moves, args.seed, interning
+        )
+
+    for interning, (memory, elapsed, unique) in results.items():
+        print(
+            f"interning={'on ' if interning else 'off'}  "
+            f"memory={memory / 1024:9.1f} KiB  state objects={unique:7d}  time={elapsed:.3f}s"
+        )
+
+    saved = 1 - results[True][0] / results[False][0]
+    print(f"memory saved: {saved:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Compares the generated from_dict/to_dict of soluzion_types with the compiled codecs, checked and trusted,
+on the payloads the server decodes and sends most
+
+python benchmarks/type_codecs.py --calls 100000
+"""
+
+import argparse
+import time
+from typing import Any, Callable
+
+from soluzion_server.soluzion_types import (
+    ListRooms,
+    OperatorApplied,
+    OperatorChosen,
+    OperatorElement,
+    OperatorsAvailable,
+    Param,
+    Room,
+    RoomElement,
+    RoomPlayer,
+    RoomPlayerClass,
+    Step,
+)
+from soluzion_server.type_codecs import decode, decoder, encode, encoder
+
+PLAYERS = [{"name": f"player-{i}", "roles": [i], "sid": f"sid-{i}"} for i in range(4)]
+OPERATORS = [
+    {"name": f"Move disk from peg{i} to peg{i + 1}", "op_no": i, "params": None}
+    for i in range(6)
+]
+
+PAYLOADS: dict[type, dict[str, Any]] = {
+    OperatorChosen: {"op_no": 3, "params": [1, "two"]},
+    Room: {"in_game": True, "owner": "sid-0", "players": PLAYERS, "room": "lobby"},
+    ListRooms: {
+        "rooms": [
+            {
+                "in_game": False,
+                "owner": "sid-0",
+                "players": PLAYERS,
+                "room": f"room-{i}",
+            }
+            for i in range(20)
+        ]
+    },
+    OperatorsAvailable: {"operators": OPERATORS},
+    OperatorApplied: {
+        "operator": {"name": OPERATORS[0]["name"], "op_no": 0, "params": None},
+        "state": '{"pegs": [[3, 2, 1], [], []]}',
+    },
+    Step: {
+        "game_ended": None,
+        "message": "Peg1: [3, 2, 1]\nPeg2: []\nPeg3: []",
+        "operator": {"name": OPERATORS[0]["name"], "op_no": 0},
+        "operators": OPERATORS,
+        "state": None,
+        "step": 12,
+        "transitions": ["A disk moved"],
+    },
+}
+
+
+def per_call(function: Callable[[], Any], calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument(
+        "--calls", type=int, default=100_000, help="calls to time each codec over"
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'payload':>18}  {'':>6}  {'generated':>9}  {'checked':>9}  {'trusted':>9}  speedup"
+    )
+    for cls, payload in PAYLOADS.items():
+        obj = cls.from_dict(payload)
+        assert encode(decode(cls, payload)) == obj.to_dict()
+        assert decoder(cls) is not cls.from_dict, f"{cls.__name__} wasn't compiled"
+
+        timings = {
+            "decode": [
+                lambda: cls.from_dict(payload),
+                lambda: decoder(cls)(payload),
+                lambda: decoder(cls, trusted=True)(payload),
+            ],
+            "encode": [
+                lambda: obj.to_dict(),
+                lambda: encoder(cls, trusted=False)(obj),
+                lambda: encoder(cls)(obj),
+            ],
+        }
+        for direction, functions in timings.items():
+            generated, checked, trusted = (
+                per_call(function, args.calls) * 1e6 for function in functions
+            )
+            print(
+                f"{cls.__name__:>18}  {direction:>6}  {generated:>7.2f}us  {checked:>7.2f}us  "
+                f"{trusted:>7.2f}us  {generated / trusted:>6.1f}x"
+            )
+
+    # list_rooms used to decode each room's payload again before encoding the list
+    rooms = [Room.from_dict(PAYLOADS[Room]) for _ in range(20)]
+    round_trip = per_call(
+        lambda: ListRooms(
+            [RoomElement.from_dict(room.to_dict()) for room in rooms]
+        ).to_dict(),
+        args.calls // 10,
+    )
+    direct = per_call(
+        lambda: {"rooms": [encode(room) for room in rooms]}, args.calls // 10
+    )
+    print(
+        f"list_rooms of {len(rooms)}: round trip {round_trip * 1e6:.1f}us, "
+        f"direct {direct * 1e6:.1f}us, {round_trip / direct:.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Compares the per-event overhead of the Socket.IO endpoint and the plain WebSocket endpoint of a running
+server: connection setup time, request/response round trips, and the bytes each event is framed in
+
+soluzion_server problems/TowersOfHanoi.py -p 5000
+python benchmarks/websocket_overhead.py --port 5000
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+
+import simple_websocket
+import socketio
+from engineio import packet as eio_packet
+from socketio import packet
+
+from soluzion_server.websocket_endpoint import encode_frame
+
+
+def socketio_client(port: int, calls: int) -> tuple[float, list[float]]:
+    connected = threading.Event()
+    client = socketio.Client()
+    client.on("your_sid", lambda data: connected.set())
+
+    start = time.perf_counter()
+    client.connect(f"http://localhost:{port}")
+    connected.wait(10)
+    setup = time.perf_counter() - start
+
+    round_trips = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        client.call("list_rooms", {})
+        round_trips.append(time.perf_counter() - start)
+
+    client.disconnect()
+    return setup, round_trips
+
+
+def websocket_client(port: int, calls: int) -> tuple[float, list[float]]:
+    start = time.perf_counter()
+    ws = simple_websocket.Client.connect(f"ws://localhost:{port}/ws")
+    ws.receive()  # your_sid
+    setup = time.perf_counter() - start
+
+    round_trips = []
+    for ack_id in range(calls):
+        start = time.perf_counter()
+        ws.send(encode_frame(ack_id, "list_rooms", {}))
+        while json.loads(ws.receive())[0] != ack_id:
+            pass
+        round_trips.append(time.perf_counter() - start)
+
+    ws.close()
+    return setup, round_trips
+
+
+def socketio_bytes(event: str, data: dict, ack_id: int = None) -> int:
+    encoded = packet.Packet(packet.EVENT, data=[event, data], id=ack_id).encode()
+    return len(eio_packet.Packet(eio_packet.MESSAGE, encoded).encode())
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter
+    )
+    parser.add_argument("--port", type=int, default=5000, help="port of the server")
+    parser.add_argument(
+        "--calls", type=int, default=2000, help="number of round trips to time"
+    )
+    args = parser.parse_args()
+
+    results = [
+        ("socket.io", *socketio_client(args.port, args.calls)),
+        ("websocket", *websocket_client(args.port, args.calls)),
+    ]
+
+    print()
+    for name, setup, round_trips in results:
+        print(
+            f"{name:>10}  connect={setup * 1000:7.2f}ms  "
+            f"round trip mean={statistics.mean(round_trips) * 1e6:7.1f}us "
+            f"median={statistics.median(round_trips) * 1e6:7.1f}us"
+        )
+
+    # Framing of a typical event, the payload itself is the same either way
+    data = {"operators": [{"name": "Move disk from peg1 to peg2", "op_no": 0}]}
+    payload = len(json.dumps(data, separators=(",", ":")))
+    print()
+    print(f"payload of operators_available: {payload} bytes")
+    print(
+        f"{'socket.io':>10}  event={socketio_bytes('operators_available', data) - payload} bytes "
+        f"request={socketio_bytes('list_rooms', {}, 12) - 2} bytes"
+    )
+    print(
+        f"{'websocket':>10}  event={len(encode_frame('operators_available', data)) - payload} bytes "
+        f"request={len(encode_frame(12, 'list_rooms', {})) - 2} bytes"
+    )
+
+
+if __name__ == "__main__":
+    main()
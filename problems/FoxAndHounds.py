@@ -73,8 +73,8 @@ class State():
 
   def copy(self):
     news = State()
-    news.foxCoords = self.foxCoords
-    news.coordsOfHounds = self.coordsOfHounds
+    news.foxCoords = self.foxCoords[:]
+    news.coordsOfHounds = [gp[:] for gp in self.coordsOfHounds]
     news.foxsTurn = self.foxsTurn
     return news
       
@@ -244,3 +244,11 @@ if DEBUG:
     print(o.name)
 #</OPERATORS>
 
+
+#<EVALUATE> (optional, used by the server's best move search)
+def EVALUATE(s):
+  '''Scores a position for the player whose turn it is. The further
+  the fox has advanced, the better for the fox.'''
+  fox_score = s.foxCoords[0] - 3.5
+  return fox_score if s.foxsTurn else -fox_score
+#</EVALUATE>
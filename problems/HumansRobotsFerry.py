@@ -30,6 +30,8 @@ that could be executed "safely."
 #</COMMON_DATA>
 
 #<COMMON_CODE>
+import json
+
 H=0  # array index to access human counts
 R=1  # same idea for robots
 LEFT=0 # same idea for left side of creek
@@ -113,6 +115,9 @@ class State():
   def goal_message(self):
     return "Congratulations on successfully guiding the humans and robots across the creek!"
 
+  def serialize(self):
+    return json.dumps(self.d)
+
 #</COMMON_CODE>
 
 #<OPERATORS>
@@ -127,4 +132,6 @@ OPERATORS = [Operator(
   for (h,r) in HR_combinations]
 #</OPERATORS>
 
-
+#<DESERIALIZE> (optional, used by the server's evaluate API)
+DESERIALIZE = lambda serialized: State(json.loads(serialized))
+#</DESERIALIZE>
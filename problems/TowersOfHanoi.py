@@ -30,6 +30,8 @@ except:
 # </COMMON_DATA>
 
 # <COMMON_CODE>
+import json
+
 class State:
     def __init__(self, d=None):
         if d==None:
@@ -96,6 +98,9 @@ class State:
     def goal_message(self):
         return "The Tower Transport is Triumphant!"
 
+    def serialize(self):
+        return json.dumps(self.d)
+
 # </COMMON_CODE>
 
 # <OPERATORS>
@@ -119,3 +124,7 @@ GOAL_TEST = lambda s: goal_test(s)
 # <GOAL_MESSAGE_FUNCTION> (optional)
 GOAL_MESSAGE_FUNCTION = lambda s: goal_message(s)
 # </GOAL_MESSAGE_FUNCTION>
+
+# <DESERIALIZE> (optional, used by the server's evaluate API)
+DESERIALIZE = lambda serialized: State(json.loads(serialized))
+# </DESERIALIZE>
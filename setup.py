@@ -17,10 +17,11 @@ setup(
         "python-socketio[client]~=5.11.2",
         "prompt_toolkit~=3.0.43",
         "flask-cors~=4.0.1",
+        "numpy>=1.22",
     ],
     entry_points={
         "console_scripts": [
-            "soluzion_server=soluzion_server.main:main",
+            "soluzion_server=soluzion_server.cli:main",
             "soluzion_client=soluzion_test_client.test_client:main",
         ]
     },
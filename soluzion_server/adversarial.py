@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Collection, Optional
+
+import soluzion_server.globals as server_globals
+from soluzion_server.soluzion_expanded import ExpandedState, Problem, operator_name
+from soluzion_server.state_interning import state_fingerprint
+
+WIN = 1_000_000.0
+"""Score of a won game, less the number of moves it takes so quicker wins are preferred"""
+
+TABLE_SIZE = 1_000_000
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+_table: dict[bytes, tuple[int, float, int, Optional[int]]] = {}
+"""Transposition table of (depth, score, bound, best op_no) per state fingerprint. It's kept between
+searches in the same worker, so following moves start from what earlier searches learned"""
+
+
+@dataclass
+class MoveResult:
+    op_no: Optional[int]
+    """Operator number of the best move, None if there's no move to make"""
+
+    name: Optional[str]
+
+    score: Optional[float]
+    """Score of the position after the move for the player making it, None if no depth was completed"""
+
+    depth: int = 0
+    """Number of moves ahead the last completed search looked"""
+
+    nodes: int = 0
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+def _moves(
+    problem: Problem, state: ExpandedState, roles: Collection[int] | None
+) -> list[tuple[int, ExpandedState]]:
+    moves = []
+    for op_no, operator in enumerate(problem.OPERATORS):
+        if operator.params:
+            continue
+        try:
+            if roles:
+                applicable = any(operator.is_applicable(state, role) for role in roles)
+            else:
+                applicable = operator.is_applicable(state)
+            if applicable:
+                moves.append((op_no, operator.apply(state)))
+        except Exception as e:
+            print(f"Operator {op_no} failed during search: {e}")
+    return moves
+
+
+def _side(problem: Problem, state: ExpandedState, role_count: int) -> Optional[tuple]:
+    """
+    Gets the roles with a move in the state. Problems without roles are assumed to alternate turns
+    """
+    if role_count == 0:
+        return None
+    return tuple(
+        role
+        for role in range(role_count)
+        if any(
+            not operator.params and operator.is_applicable(state, role)
+            for operator in problem.OPERATORS
+        )
+    )
+
+
+def search_best_move(
+    state: ExpandedState,
+    time_limit: float,
+    roles: Collection[int] | None = None,
+    max_depth: int = 64,
+) -> MoveResult:
+    """
+    Iterative deepening negamax search with alpha-beta pruning for the player to move. Reaching a goal
+    wins the game for the player who made the move, and having no moves loses it. Positions at the
+    depth limit are scored with the problem's EVALUATE(state) if it defines one, for the player to
+    move in that state, and as even otherwise
+    :param time_limit: seconds to search for, the deepest completed search is used
+    :param roles: roles to find a move for, the first move must be applicable for one of them
+    """
+    problem = server_globals.PROBLEM
+    role_count = len(getattr(problem, "ROLES", None) or [])
+    evaluate = getattr(problem, "EVALUATE", None)
+    if not callable(evaluate):
+        evaluate = None
+
+    deadline = time.monotonic() + time_limit
+    nodes = 0
+
+    if len(_table) > TABLE_SIZE:
+        _table.clear()
+
+    def changes_side(side, child: ExpandedState) -> bool:
+        return side is None or _side(problem, child, role_count) != side
+
+    def negamax(
+        state: ExpandedState,
+        fingerprint: bytes,
+        depth: int,
+        alpha: float,
+        beta: float,
+        ply: int,
+    ) -> float:
+        nonlocal nodes
+        nodes += 1
+        if nodes % 256 == 0 and time.monotonic() > deadline:
+            raise _OutOfTime()
+
+        if depth == 0:
+            return float(evaluate(state)) if evaluate is not None else 0.0
+
+        entry = _table.get(fingerprint)
+        best_op = None
+        if entry is not None:
+            entry_depth, score, bound, best_op = entry
+            # Win scores are stored relative to the position, not the root
+            if abs(score) > WIN / 2:
+                score -= ply if score > 0 else -ply
+            if entry_depth >= depth and (
+                bound == EXACT
+                or (bound == LOWER and score >= beta)
+                or (bound == UPPER and score <= alpha)
+            ):
+                return score
+
+        moves = _moves(problem, state, None)
+        if not moves:
+            return -(WIN - ply)
+        if best_op is not None:
+            moves.sort(key=lambda move: move[0] != best_op)
+
+        side = _side(problem, state, role_count)
+        original_alpha = alpha
+        best = -float("inf")
+        for op_no, child in moves:
+            if child.is_goal():
+                score = WIN - ply - 1
+            elif changes_side(side, child):
+                score = -negamax(
+                    child,
+                    state_fingerprint(child, problem),
+                    depth - 1,
+                    -beta,
+                    -alpha,
+                    ply + 1,
+                )
+            else:
+                score = negamax(
+                    child,
+                    state_fingerprint(child, problem),
+                    depth - 1,
+                    alpha,
+                    beta,
+                    ply + 1,
+                )
+
+            if score > best:
+                best, best_op = score, op_no
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        if best <= original_alpha:
+            bound = UPPER
+        elif best >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        stored = best + (ply if best > WIN / 2 else -ply if best < -WIN / 2 else 0)
+        _table[fingerprint] = (depth, stored, bound, best_op)
+        return best
+
+    moves = _moves(problem, state, roles)
+    if state.is_goal() or not moves:
+        return MoveResult(None, None, None)
+
+    side = _side(problem, state, role_count)
+    root = state_fingerprint(state, problem)
+    result = MoveResult(
+        moves[0][0], operator_name(problem.OPERATORS[moves[0][0]], state), None
+    )
+
+    entry = _table.get(root)
+    first_op = entry[3] if entry is not None else None
+
+    for depth in range(1, max_depth + 1):
+        if first_op is not None:
+            moves.sort(key=lambda move: move[0] != first_op)
+
+        try:
+            best, best_op = -float("inf"), None
+            for op_no, child in moves:
+                if child.is_goal():
+                    score = WIN - 1
+                elif changes_side(side, child):
+                    score = -negamax(
+                        child,
+                        state_fingerprint(child, problem),
+                        depth - 1,
+                        -WIN,
+                        -best,
+                        1,
+                    )
+                else:
+                    score = negamax(
+                        child,
+                        state_fingerprint(child, problem),
+                        depth - 1,
+                        best,
+                        WIN,
+                        1,
+                    )
+                if score > best:
+                    best, best_op = score, op_no
+        except _OutOfTime:
+            break
+
+        first_op = best_op
+        # Only some of the moves were searched when they're limited to the roles, so the score isn't the
+        # state's own and would be wrong for searches reaching it with every move
+        if not roles:
+            _table[root] = (depth, best, EXACT, best_op)
+        result = MoveResult(
+            best_op,
+            operator_name(problem.OPERATORS[best_op], state),
+            best,
+            depth,
+            nodes,
+        )
+
+        # The outcome is decided, searching deeper won't change it
+        if abs(best) > WIN / 2:
+            break
+
+    result.nodes = nodes
+    return result
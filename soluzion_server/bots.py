@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import itertools
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from soluzion_server.globals import GameSession, connected_players
+from soluzion_server.soluzion_types import BotPolicy
+from soluzion_server.solver import get_solver
+from soluzion_server.state_graph import get_state_graph
+
+_executor: ThreadPoolExecutor | None = None
+_move_delay = 0.0
+_bot_numbers = itertools.count(1)
+
+
+def configure_bots(workers: int, move_delay: float = 1.0):
+    """
+    Sets up the threads shared by every bot to make their moves on
+    :param move_delay: seconds a bot waits before each move, so people can follow the game
+    """
+    global _executor, _move_delay
+    _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bot")
+    _move_delay = move_delay
+
+
+def new_bot_sid() -> str:
+    """
+    Makes an id for a bot, in place of the sid of a socket
+    """
+    return f"bot-{next(_bot_numbers)}"
+
+
+def is_bot(sid: str) -> bool:
+    player = connected_players.get(sid)
+    return player is not None and player.bot is not None
+
+
+def choose_operator(
+    policy: BotPolicy, game: GameSession, roles: set[int], op_nos: list[int]
+) -> Optional[int]:
+    """
+    Picks one of the available operators for a bot
+    """
+    state = game.current_state
+
+    if policy == BotPolicy.BEST:
+        result = get_solver(game.problem).best_move(state, roles)
+        if result is not None and result.op_no in op_nos:
+            return result.op_no
+
+    elif policy == BotPolicy.PLAN:
+        if game.node is not None:
+            result = get_state_graph().plan(game.node)
+        else:
+            result = get_solver(game.problem).solve(state)
+        if result.operators and result.operators[0] in op_nos:
+            return result.operators[0]
+
+    # Operators with parameters would need arguments made up for them
+    choices = [op_no for op_no in op_nos if not game.problem.OPERATORS[op_no].params]
+    return random.choice(choices) if choices else None
+
+
+def _play(game: GameSession, sid: str, step: int, op_nos: list[int]):
+    # Only imported here since the transport schedules the bots
+    from soluzion_server.engine import apply_operator, game_operator_applicable
+    from soluzion_server.transport import deliver
+
+    player = connected_players.get(sid)
+    if player is None or player.bot is None:
+        return
+
+    try:
+        op_no = choose_operator(player.bot, game, player.roles, op_nos)
+        if op_no is None:
+            return
+
+        with game.lock:
+            # Someone else may have moved while the bot was thinking
+            if game.step != step or sid not in game.players:
+                return
+            if not game_operator_applicable(game, op_no, player.roles):
+                return
+            events = apply_operator(game, op_no, None)
+            player.moved_to = game.step
+            deliver(events)
+    except Exception as e:
+        print(f"Bot {sid} failed to move: {e}")
+
+
+def schedule_bot_move(game: GameSession, sid: str, op_nos: list[int]):
+    """
+    Queues a bot to choose and apply one of the operators available to it, after the move delay
+    """
+    if _executor is None or not op_nos:
+        return
+
+    # Without roles every player can always move, so a bot waits for someone else to move after it
+    # instead of playing the whole game on its own
+    player = connected_players.get(sid)
+    if (
+        not getattr(game.problem, "ROLES", None)
+        and player is not None
+        and player.moved_to == game.step
+        and any(other != sid for other in game.players)
+    ):
+        return
+
+    if _move_delay <= 0:
+        _executor.submit(_play, game, sid, game.step, op_nos)
+        return
+    timer = threading.Timer(
+        _move_delay, _executor.submit, (_play, game, sid, game.step, op_nos)
+    )
+    timer.daemon = True
+    timer.start()
@@ -0,0 +1,30 @@
+import importlib
+import sys
+
+COMMANDS = {
+    "explore": "soluzion_server.parallel_explore",
+    "simulate": "soluzion_server.simulation",
+    "profile": "soluzion_server.profiling",
+}
+"""Subcommands, and the module whose main() runs each one"""
+
+
+def main():
+    """
+    Runs a subcommand if the first argument names one, otherwise starts the server
+    """
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        command = sys.argv.pop(1)
+        sys.argv[0] = f"{sys.argv[0]} {command}"
+        importlib.import_module(COMMANDS[command]).main()
+        return
+
+    # Before anything else is imported, so the profile covers every module the server loads
+    if "--startup-profile" in sys.argv:
+        from soluzion_server.startup_profile import start_startup_profile
+
+        start_startup_profile()
+
+    from soluzion_server.main import main as serve
+
+    serve()
@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+import ast
+import linecache
+import re
+import textwrap
+from typing import Any, Callable, Optional
+
+import soluzion_server.soluzion_types as soluzion_types
+from soluzion_server.type_codecs import _invalid, decoder, encoder
+
+# Checks of the generated converters, as (condition, result) templates on the value {v}
+_CHECKED = {
+    "from_str": ("isinstance({v}, str)", "{v}"),
+    "from_bool": ("isinstance({v}, bool)", "{v}"),
+    "from_none": ("{v} is None", "{v}"),
+    "from_float": (
+        "isinstance({v}, (float, int)) and not isinstance({v}, bool)",
+        "float({v})",
+    ),
+    "to_float": ("isinstance({v}, (int, float))", "{v}"),
+}
+_TRUSTED = {
+    "from_str": "{v}",
+    "from_bool": "{v}",
+    "from_none": "{v}",
+    "from_float": "float({v})",
+    "to_float": "{v}",
+}
+
+
+class UnsupportedCode(Exception):
+    """The generated code uses a construct the codec compiler doesn't know, so its own is used"""
+
+
+class _Compiler:
+    """
+    Turns the expressions quicktype generates for a field into one specialized expression, inlining the
+    converters instead of calling them through lambdas and from_union's try/except
+    """
+
+    def __init__(self, where: str, trusted: bool, namespace: dict[str, Any]):
+        self.where = where
+        self.trusted = trusted
+        self.namespace = namespace
+        self._depth = 0
+
+    def fail(self, value: str) -> str:
+        return f"_invalid({self.where!r}, {value})"
+
+    def apply(self, node: ast.expr, value_node: ast.expr, value: str) -> str:
+        """
+        :param node: expression converting value_node
+        :param value: source of the already evaluated value, a plain name
+        """
+        if ast.dump(node) == ast.dump(value_node):
+            return value
+        if not isinstance(node, ast.Call) or not node.args:
+            raise UnsupportedCode(ast.unparse(node))
+        if ast.dump(node.args[-1]) != ast.dump(value_node):
+            raise UnsupportedCode(ast.unparse(node))
+        return self.function(node.func, node.args[:-1], value)
+
+    def function(self, func: ast.expr, args: list[ast.expr], value: str) -> str:
+        """
+        :param func: converter applied to the value, with its leading arguments
+        """
+        if isinstance(func, ast.Lambda):
+            if args or len(func.args.args) != 1:
+                raise UnsupportedCode(ast.unparse(func))
+            param = ast.Name(id=func.args.args[0].arg, ctx=ast.Load())
+            return self.apply(func.body, param, value)
+
+        if (
+            isinstance(func, ast.Attribute)
+            and func.attr == "from_dict"
+            and isinstance(func.value, ast.Name)
+        ):
+            return f"{self.codec(func.value.id, decode=True)}({value})"
+
+        if not isinstance(func, ast.Name):
+            raise UnsupportedCode(ast.unparse(func))
+        name = func.id
+
+        if name in _TRUSTED and not args:
+            if self.trusted:
+                return _TRUSTED[name].format(v=value)
+            condition, result = _CHECKED[name]
+            return (
+                f"({result.format(v=value)} if {condition.format(v=value)} "
+                f"else {self.fail(value)})"
+            )
+
+        if name in ("from_list", "from_dict") and len(args) == 1:
+            self._depth += 1
+            item = f"y{self._depth}"
+            converted = self.function(args[0], [], item)
+            self._depth -= 1
+            if name == "from_list":
+                kind = "list"
+                if converted == item:
+                    result = f"list({value})"
+                else:
+                    result = f"[{converted} for {item} in {value}]"
+            else:
+                kind = "dict"
+                if converted == item:
+                    result = f"dict({value})"
+                else:
+                    result = f"{{k: {converted} for k, {item} in {value}.items()}}"
+            if self.trusted:
+                return result
+            return f"({result} if isinstance({value}, {kind}) else {self.fail(value)})"
+
+        if name == "from_union" and len(args) == 1 and isinstance(args[0], ast.List):
+            options = [
+                option
+                for option in args[0].elts
+                if not (isinstance(option, ast.Name) and option.id == "from_none")
+            ]
+            # Every union quicktype generates here is an optional value
+            if len(options) != 1 or len(args[0].elts) != 2:
+                raise UnsupportedCode(ast.unparse(args[0]))
+            converted = self.function(options[0], [], value)
+            if converted == value:
+                return value
+            return f"(None if {value} is None else {converted})"
+
+        if name in ("to_class", "to_enum") and len(args) == 1:
+            if not isinstance(args[0], ast.Name):
+                raise UnsupportedCode(ast.unparse(args[0]))
+            cls = self.type(args[0].id)
+            result = (
+                f"{value}.value"
+                if name == "to_enum"
+                else f"{self.codec(args[0].id, decode=False)}({value})"
+            )
+            if self.trusted:
+                return result
+            return f"({result} if isinstance({value}, {cls}) else {self.fail(value)})"
+
+        # An enum's constructor decodes its value, raising ValueError for unknown ones
+        if not args:
+            cls = getattr(soluzion_types, name, None)
+            if isinstance(cls, type) and issubclass(cls, soluzion_types.Enum):
+                return f"{self.type(name)}({value})"
+
+        raise UnsupportedCode(ast.unparse(func))
+
+    def type(self, name: str) -> str:
+        cls = getattr(soluzion_types, name, None)
+        if not isinstance(cls, type):
+            raise UnsupportedCode(name)
+        self.namespace[name] = cls
+        return name
+
+    def codec(self, name: str, decode: bool) -> str:
+        cls = getattr(soluzion_types, self.type(name))
+        codec = f"_{'decode' if decode else 'encode'}_{name}"
+        self.namespace[codec] = (
+            decoder(cls, self.trusted) if decode else encoder(cls, self.trusted)
+        )
+        return codec
+
+
+def _method(cls: type, name: str) -> ast.FunctionDef:
+    code = getattr(getattr(cls, name, None), "__code__", None)
+    if code is None:
+        raise UnsupportedCode(f"{cls.__name__}.{name}")
+
+    # Only the method's own lines are parsed, found by their indentation, as inspect.getsource would
+    # tokenize its way through the generated module
+    lines = linecache.getlines(code.co_filename)
+    start = code.co_firstlineno - 1
+    while start < len(lines) and lines[start].lstrip().startswith("@"):
+        start += 1
+    if start >= len(lines):
+        raise UnsupportedCode(f"{cls.__name__}.{name}")
+    indent = len(lines[start]) - len(lines[start].lstrip())
+    end = start + 1
+    while end < len(lines) and (
+        not lines[end].strip() or len(lines[end]) - len(lines[end].lstrip()) > indent
+    ):
+        end += 1
+
+    try:
+        return ast.parse(textwrap.dedent("".join(lines[start:end]))).body[0]
+    except SyntaxError as e:
+        raise UnsupportedCode(f"{cls.__name__}.{name}") from e
+
+
+def _inline(expression: str, local: str, value: str) -> Optional[str]:
+    """
+    Puts the source of a value in place of the local holding it, when the expression reads it only once
+    """
+    if len(re.findall(rf"\b{local}\b", expression)) != 1:
+        return None
+    return re.sub(rf"\b{local}\b", lambda _: value, expression)
+
+
+def _compile(name: str, source: str, namespace: dict[str, Any]) -> Callable:
+    namespace["_invalid"] = _invalid
+    exec(compile(source, f"<{name}>", "exec"), namespace)
+    return namespace[name]
+
+
+def compile_decoder(cls: type, trusted: bool) -> Callable:
+    """
+    Compiles from_dict's field conversions into one function building the object
+    """
+    *fields, returned = _method(cls, "from_dict").body[1:]
+    namespace: dict[str, Any] = {cls.__name__: cls}
+    lines = ["def decode(obj):"]
+    if not trusted:
+        lines.append(
+            f"    if not isinstance(obj, dict): _invalid({cls.__name__!r}, obj)"
+        )
+    lines.append("    get = obj.get")
+    arguments: dict[str, str] = {}
+
+    for field in fields:
+        if not (
+            isinstance(field, ast.Assign)
+            and len(field.targets) == 1
+            and isinstance(field.targets[0], ast.Name)
+        ):
+            raise UnsupportedCode(ast.unparse(field))
+        local = f"f_{field.targets[0].id}"
+
+        # The value is what the converters are applied to, obj.get("key")
+        value_node = next(
+            (
+                node
+                for node in ast.walk(field.value)
+                if isinstance(node, ast.Call)
+                and ast.unparse(node.func) == "obj.get"
+                and len(node.args) == 1
+                and isinstance(node.args[0], ast.Constant)
+            ),
+            None,
+        )
+        if value_node is None:
+            raise UnsupportedCode(ast.unparse(field))
+        key = value_node.args[0].value
+
+        compiler = _Compiler(f"{cls.__name__}.{key}", trusted, namespace)
+        expression = compiler.apply(field.value, value_node, local)
+        inlined = _inline(expression, local, f"get({key!r})")
+        if inlined is None:
+            lines.append(f"    {local} = get({key!r})")
+            lines.append(f"    {local} = {expression}")
+            inlined = local
+        arguments[field.targets[0].id] = inlined
+
+    if not (
+        isinstance(returned, ast.Return)
+        and isinstance(returned.value, ast.Call)
+        and all(isinstance(arg, ast.Name) for arg in returned.value.args)
+        and all(arg.id in arguments for arg in returned.value.args)
+    ):
+        raise UnsupportedCode(ast.unparse(returned))
+    passed = ", ".join(arguments[arg.id] for arg in returned.value.args)
+    lines.append(f"    return {cls.__name__}({passed})")
+
+    return _compile("decode", "\n".join(lines), namespace)
+
+
+def compile_encoder(cls: type, trusted: bool) -> Callable:
+    """
+    Compiles to_dict's field conversions into one function building the dict, in the same key order and
+    leaving out the same unset optional fields
+    """
+    *fields, returned = _method(cls, "to_dict").body[1:]
+    namespace: dict[str, Any] = {cls.__name__: cls}
+    # Keys before the first optional one go in a dict literal, the rest are set in order
+    literal: list[str] = []
+    statements: list[str] = []
+
+    for field in fields:
+        condition = None
+        if (
+            isinstance(field, ast.If)
+            and len(field.body) == 1
+            and not field.orelse
+            and isinstance(field.test, ast.Compare)
+            and isinstance(field.test.ops[0], ast.IsNot)
+        ):
+            condition, field = field.test, field.body[0]
+
+        if not (
+            isinstance(field, ast.Assign)
+            and isinstance(field.targets[0], ast.Subscript)
+            and isinstance(field.targets[0].slice, ast.Constant)
+        ):
+            raise UnsupportedCode(ast.unparse(field))
+        key = field.targets[0].slice.value
+
+        value_node = next(
+            (
+                node
+                for node in ast.walk(field.value)
+                if isinstance(node, ast.Attribute)
+                and isinstance(node.value, ast.Name)
+                and node.value.id == "self"
+            ),
+            None,
+        )
+        if value_node is None:
+            raise UnsupportedCode(ast.unparse(field))
+        local = f"f_{value_node.attr}"
+
+        compiler = _Compiler(f"{cls.__name__}.{key}", trusted, namespace)
+        expression = compiler.apply(field.value, value_node, local)
+        inlined = _inline(expression, local, f"self.{value_node.attr}")
+
+        if condition is None and inlined is not None and not statements:
+            literal.append(f"{key!r}: {inlined}")
+        elif condition is None and inlined is not None:
+            statements.append(f"    result[{key!r}] = {inlined}")
+        else:
+            statements.append(f"    {local} = self.{value_node.attr}")
+            if condition is None:
+                statements.append(f"    result[{key!r}] = {expression}")
+            else:
+                statements.append(f"    if {local} is not None:")
+                statements.append(f"        result[{key!r}] = {expression}")
+
+    if not isinstance(returned, ast.Return):
+        raise UnsupportedCode(ast.unparse(returned))
+    lines = ["def encode(self):"]
+    if statements:
+        lines += [
+            f"    result = {{{', '.join(literal)}}}",
+            *statements,
+            "    return result",
+        ]
+    else:
+        lines.append(f"    return {{{', '.join(literal)}}}")
+
+    return _compile("encode", "\n".join(lines), namespace)
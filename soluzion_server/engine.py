@@ -0,0 +1,623 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable, Collection, Optional
+
+import soluzion_server.globals as server_globals
+from soluzion_server.globals import (
+    GameSession,
+    RoomSession,
+    connected_players,
+    room_sessions,
+)
+from soluzion_server.metadata import get_metadata
+from soluzion_server.problem_hosts import StateView, get_host_pool
+from soluzion_server.soluzion_expanded import (
+    ExpandedOperator,
+    ExpandedState,
+    Problem,
+    operator_name,
+)
+from soluzion_server.soluzion_types import *
+from soluzion_server.soluzion_types import OperatorElement
+from soluzion_server.state_graph import get_state_graph
+from soluzion_server.state_interning import intern_state
+from soluzion_server.type_codecs import decode, encode
+
+
+@dataclass
+class OutboundEvent:
+    """An event for a transport to deliver"""
+
+    event: ServerToClient
+    data: dict
+    to: str | list[str] | None
+    """Sid, room or list of sids to send to, everyone if None"""
+
+
+def spectator_channel(room_id: str) -> str:
+    """
+    Gets the name of the Socket.IO room the spectators of a room are in
+    """
+    return f"{room_id}/spectators"
+
+
+def room_audience(room_id: str) -> list[str]:
+    """
+    Gets the recipients of an event for everyone in a room, players and spectators alike
+    """
+    return [room_id, spectator_channel(room_id)]
+
+
+def serialize_state(state: ExpandedState) -> str | None:
+    """
+    Gets a serialized representation of the state, if .serialize is implemented
+    :return: serialized string, or None
+    """
+
+    # noinspection PyArgumentList
+    if hasattr(state, "serialize") and callable(state.serialize):
+        return state.serialize()
+    return None
+
+
+def representation_groups(
+    room_id: str, exclude: Collection[str] = ()
+) -> dict[frozenset[StateRepresentation], list[str]]:
+    """
+    Groups the players in a room by the representations of the state they requested when joining
+    :param exclude: sids of players to leave out
+    """
+    groups: dict[frozenset[StateRepresentation], list[str]] = {}
+    room = room_sessions.get(room_id)
+    for sid in room.player_sids if room is not None else []:
+        player = connected_players[sid]
+        if player.bot is not None or sid in exclude:
+            continue
+        groups.setdefault(frozenset(player.representations), []).append(sid)
+    return groups
+
+
+def describe_state(
+    state: ExpandedState,
+    room_id: str,
+    exclude: Collection[str] = (),
+    problem: Optional[Problem] = None,
+    view: Optional[StateView] = None,
+) -> tuple[Optional[str], Optional[str]]:
+    """
+    Gets the __str__ message and serialization of a state, each only if a player in the room requested it
+    or anyone is spectating
+    :param exclude: sids of players whose requests don't count
+    :param problem: problem the state belongs to, whose warm-up may already have the representations
+    :param view: the problem host's description of the state, if it was made by one
+    """
+    if view is not None:
+        return view.message, view.serialized
+    metadata = get_metadata(problem) if problem is not None else None
+    if metadata is not None and state is metadata.initial_state:
+        return metadata.initial_message, metadata.initial_serialized
+
+    room = room_sessions.get(room_id)
+    spectators = room is not None and len(room.spectator_sids) > 0
+    requested = frozenset(StateRepresentation) if spectators else frozenset()
+    requested = requested.union(*representation_groups(room_id, exclude))
+
+    message = f"{state}" if StateRepresentation.MESSAGE in requested else None
+    serialized = (
+        serialize_state(state) if StateRepresentation.STATE in requested else None
+    )
+    return message, serialized
+
+
+def state_events(
+    event: ServerToClient,
+    state: ExpandedState,
+    room_id: str,
+    payload: Callable[[Optional[str], Optional[str]], dict],
+    exclude: Collection[str] = (),
+    problem: Optional[Problem] = None,
+    view: Optional[StateView] = None,
+    description: Optional[tuple[Optional[str], Optional[str]]] = None,
+) -> list[OutboundEvent]:
+    """
+    Makes an event carrying the state for the players of a room, only computing the __str__ message and
+    serialization if a player in the room requested them. Spectators all get every representation in one
+    event, so it's only encoded once however many are watching
+    :param payload: builds the event payload from the message and serialized state
+    :param exclude: sids of players not to send it to
+    :param problem: problem the state belongs to, whose warm-up may already have the representations
+    :param view: the problem host's description of the state, if it was made by one
+    :param description: the message and serialization from describe_state, if the caller already has them
+    """
+    groups = representation_groups(room_id, exclude)
+    room = room_sessions.get(room_id)
+    spectators = room is not None and len(room.spectator_sids) > 0
+    if description is None:
+        description = describe_state(state, room_id, exclude, problem, view)
+    message, serialized = description
+
+    events = [
+        OutboundEvent(
+            event,
+            payload(
+                message if StateRepresentation.MESSAGE in representations else None,
+                serialized if StateRepresentation.STATE in representations else None,
+            ),
+            sids,
+        )
+        for representations, sids in groups.items()
+    ]
+    if spectators:
+        events.append(
+            OutboundEvent(
+                event, payload(message, serialized), spectator_channel(room_id)
+            )
+        )
+    return events
+
+
+def initial_game_state(
+    problem: Problem, args: Optional[dict[str, Any]]
+) -> ExpandedState:
+    """
+    Makes the state a game of the problem starts at
+    :param args: passed to the State() constructor, if the problem has no INITIAL_STATE
+    """
+    if hasattr(problem, "INITIAL_STATE") and problem.INITIAL_STATE is not None:
+        return problem.INITIAL_STATE
+    elif args is not None:
+        try:
+            return problem.State(args=args)
+        except Error as e:
+            print(e)
+            return problem.State()
+    else:
+        return problem.State()
+
+
+def role_sets(players: dict[str, set[int]]) -> list[frozenset[int]]:
+    """
+    Gets the distinct sets of roles the players of a game have, which the operators they're offered
+    depend on
+    """
+    return list({frozenset(roles) for roles in players.values()})
+
+
+def new_game(
+    room_id: str,
+    owner_sid: str,
+    players: dict[str, set[int]],
+    args: Optional[dict[str, Any]],
+    problem: Optional[Problem] = None,
+) -> GameSession:
+    """
+    Creates a game session at the problem's initial state, pinned to one of the problem's hosts if its
+    code doesn't run in the server
+    :param args: passed to the State() constructor, if the problem has no INITIAL_STATE
+    :param problem: problem to play, the default one if None
+    :raises ProblemHostError: if the host failed
+    """
+    if problem is None:
+        problem = server_globals.PROBLEM
+
+    pool = get_host_pool(problem)
+    if pool is not None:
+        host = pool.assign()
+        view = StateView(*host.call("start", args, role_sets(players)))
+        # Not interned, which would fingerprint it with the problem's code in the server
+        return GameSession(
+            view.load_state(),
+            [],
+            owner_sid,
+            room_id,
+            players,
+            problem=problem,
+            host=host,
+            view=view,
+        )
+
+    metadata = get_metadata(problem)
+    if args is None and metadata is not None:
+        # The warm-up's instance, so the text and operators worked out for it are reused
+        state = metadata.initial_state
+    else:
+        state = initial_game_state(problem, args)
+
+    state = intern_state(state, problem)
+
+    game = GameSession(state, [], owner_sid, room_id, players, problem=problem)
+
+    graph = get_state_graph(problem)
+    if graph is not None:
+        game.node = graph.node_of(state, problem)
+
+    return game
+
+
+def advance_game(
+    game: GameSession, op_no: int, args: Optional[list[Any]]
+) -> Optional[tuple[ExpandedState, ExpandedState]]:
+    """
+    Moves the game to the state an operator leads to, without sending any events
+    :return: the old and new states, or None if the game was already over
+    :raises ProblemHostError: if the game's host failed
+    """
+    operator: ExpandedOperator = game.problem.OPERATORS[op_no]
+    graph = get_state_graph(game.problem)
+
+    old_state = game.current_state
+
+    if is_game_over(game):
+        return None
+
+    new_state: ExpandedState
+    node: Optional[int] = None
+    if game.host is not None:
+        game.view = StateView(
+            *game.host.call(
+                "apply", game.view.state, op_no, args, role_sets(game.players)
+            )
+        )
+        new_state = game.view.load_state()
+    elif operator.params is None or args is None:
+        if game.node is not None:
+            node = graph.successor(game.node, op_no)
+
+        new_state = (
+            graph.states[node] if node is not None else operator.apply(old_state)
+        )
+    else:  # TODO make this distinction more clear
+        new_state = operator.transf(old_state, args)
+
+    # A host's states are only described by its view, fingerprinting them would run problem code here
+    if node is None and game.host is None:
+        new_state = intern_state(new_state, game.problem)
+        if graph is not None:
+            node = graph.node_of(new_state, game.problem)
+
+    game.state_stack.append(old_state)
+    game.current_state = new_state
+    game.node = node
+    game.depth += 1
+    game.step += 1
+
+    return old_state, new_state
+
+
+def game_started_events(game: GameSession) -> list[OutboundEvent]:
+    """
+    Makes the events announcing a new game to its players. The operators available to them follow
+    from operators_available_events
+    """
+    return state_events(
+        ServerToClient.GAME_STARTED,
+        game.current_state,
+        game.room,
+        lambda message, serialized: encode(GameStarted(message, serialized)),
+        problem=game.problem,
+        view=game.view,
+    )
+
+
+def step_sids(game: GameSession) -> list[str]:
+    """
+    Gets the players of a game who asked for step events in place of the separate ones
+    """
+    return [
+        sid
+        for sid in game.players
+        if sid in connected_players and connected_players[sid].step_events
+    ]
+
+
+def apply_operator(
+    game: GameSession, op_no: int, args: Optional[list[Any]]
+) -> list[OutboundEvent]:
+    """
+    Applies the effects of an operator on the game, transforming the state
+    :return: the events telling the players about it
+    :raises ProblemHostError: if the game's host failed
+    """
+    operator: ExpandedOperator = game.problem.OPERATORS[op_no]
+
+    states = advance_game(game, op_no, args)
+    if states is None:
+        return []
+    old_state, new_state = states
+    view = game.view
+
+    if view is not None:
+        transitions = view.transitions
+        applied_operator = OperatorAppliedOperator(view.applied, op_no, args)
+        game_ended = view.goal_message if view.goal else None
+    else:
+        transitions = transition_messages(old_state, new_state, operator, game.problem)
+        applied_operator = OperatorAppliedOperator(
+            operator_name(operator, old_state), op_no, args
+        )
+        game_ended = new_state.goal_message() if is_game_over(game) else None
+
+    # Players getting step events are left out of the separate ones
+    stepping = step_sids(game)
+    if stepping:
+        audience = [
+            *(sid for sid in game.players if sid not in stepping),
+            spectator_channel(game.room),
+        ]
+    else:
+        audience = room_audience(game.room)
+
+    # Worked out once for everyone, step events included
+    message, serialized = describe_state(new_state, game.room, view=view)
+
+    events = [
+        OutboundEvent(ServerToClient.TRANSITION, encode(Transition(text)), audience)
+        for text in transitions
+    ]
+    events += state_events(
+        ServerToClient.OPERATOR_APPLIED,
+        new_state,
+        game.room,
+        lambda message, serialized: encode(
+            OperatorApplied(message, applied_operator, serialized)
+        ),
+        stepping,
+        view=view,
+        description=(message, serialized),
+    )
+    if game_ended is not None:
+        events.append(
+            OutboundEvent(
+                ServerToClient.GAME_ENDED, encode(GameEnded(game_ended)), audience
+            )
+        )
+    events += operators_available_events(game, stepping)
+
+    for sid in stepping:
+        representations = connected_players[sid].representations
+        events.append(
+            OutboundEvent(
+                ServerToClient.STEP,
+                encode(
+                    Step(
+                        game_ended,
+                        (
+                            message
+                            if StateRepresentation.MESSAGE in representations
+                            else None
+                        ),
+                        applied_operator,
+                        available_operators(game, game.players[sid]),
+                        (
+                            serialized
+                            if StateRepresentation.STATE in representations
+                            else None
+                        ),
+                        game.step,
+                        transitions,
+                    )
+                ),
+                sid,
+            )
+        )
+
+    return events
+
+
+def is_game_over(game: GameSession) -> bool:
+    """
+    Checks if the game has reached a goal state
+    """
+    if game.view is not None:
+        return game.view.goal
+    if game.node is not None:
+        return bool(get_state_graph().goal[game.node])
+    return game.current_state.is_goal()
+
+
+def transition_messages(
+    old_state: ExpandedState,
+    new_state: ExpandedState,
+    operator: ExpandedOperator,
+    problem: Optional[Problem] = None,
+) -> list[str]:
+    """
+    Handles clients that have defined Transition Messages
+    :param problem: problem the states belong to, the default one if None
+    :return: the messages of the transitions that happened
+    """
+    if problem is None:
+        problem = server_globals.PROBLEM
+    messages = []
+    if not hasattr(problem, "TRANSITIONS") or problem.TRANSITIONS is None:
+        return messages
+
+    for condition, action in problem.TRANSITIONS:
+        if condition(old_state, new_state, operator):
+            if callable(action):
+                messages.append(action(old_state, new_state, operator))
+            else:
+                messages.append(str(action))
+
+        # TODO document this as not default behavior, normally only 1 transition happens
+        # break
+
+    return messages
+
+
+def validate_roles(room: RoomSession, problem: Problem):
+    """
+    Verifies whether the role assignments for the current players in the room are valid for the problem
+    :return: None if roles are valid, or a string error reason why they're invalid
+    """
+
+    if not hasattr(problem, "ROLES") or problem.ROLES is None:
+        return None
+
+    # List of all player roles
+    player_roles = [
+        role for sid in room.player_sids for role in connected_players[sid].roles
+    ]
+
+    metadata = get_metadata(problem)
+    roles = (
+        metadata.roles
+        if metadata is not None
+        else [decode(Role, ROLE) for ROLE in problem.ROLES]
+    )
+    for i, role in enumerate(roles):
+        count = player_roles.count(i)
+        if role.min is not None and count < role.min:
+            return f"Not enough players for role {role.name}"
+        if role.max is not None and count > role.max:
+            return f"Too many players for role {role.name}"
+
+    try:
+        if hasattr(problem, "VALIDATE_ROLES") and callable(problem.VALIDATE_ROLES):
+            result = problem.VALIDATE_ROLES(
+                [connected_players[sid].roles for sid in room.player_sids]
+            )
+            if result is not None:
+                return str(result)
+    except Exception as e:
+        return str(e)
+
+    return None
+
+
+def is_operator_applicable(
+    op: ExpandedOperator, state: ExpandedState, roles: Collection[int] | None
+):
+    """
+    Check if operator is applicable, working whether roles are defined or not
+    """
+
+    if state.is_goal():
+        return False
+
+    if roles is None or len(roles) == 0:
+        return op.is_applicable(state)
+
+    for role in roles:
+        if op.is_applicable(state, role):
+            return True
+
+    return False
+
+
+def get_applicable_operators(
+    state: ExpandedState, roles: Collection[int] | None
+) -> list[ExpandedOperator]:
+    """
+    Gets all applicable operators, possibly only for a specific role
+    """
+    return [
+        op
+        for op in server_globals.PROBLEM.OPERATORS
+        if is_operator_applicable(op, state, roles)
+    ]
+
+
+def hosted_operators(
+    game: GameSession, roles: Collection[int] | None
+) -> list[tuple[int, str]]:
+    """
+    Gets the numbers and names of the operators applicable for some roles in a hosted game's current
+    state, asking its host about role sets that changed since the state was made
+    """
+    role_set = frozenset(roles or ())
+    operators = game.view.operators.get(role_set)
+    if operators is None:
+        operators = game.host.call("operators", game.view.state, role_set)
+        game.view.operators[role_set] = operators
+    return operators
+
+
+def game_operator_applicable(
+    game: GameSession, op_no: int, roles: Collection[int] | None
+) -> bool:
+    """
+    Check if operator is applicable to the current state of a game, from the state graph or the game's
+    host if possible
+    """
+    if game.view is not None:
+        return any(number == op_no for number, _ in hosted_operators(game, roles))
+    if game.node is not None:
+        applicable = get_state_graph().is_applicable(game.node, op_no, roles)
+        if applicable is not None:
+            return applicable
+    return is_operator_applicable(
+        game.problem.OPERATORS[op_no], game.current_state, roles
+    )
+
+
+def game_applicable_operators(
+    game: GameSession, roles: Collection[int] | None
+) -> list[int]:
+    """
+    Gets the numbers of all operators applicable to the current state of a game, from the state graph or
+    the game's host if possible
+    """
+    if game.view is not None:
+        return [op_no for op_no, _ in hosted_operators(game, roles)]
+    if game.node is not None:
+        op_nos = get_state_graph().applicable_operators(game.node, roles)
+        if op_nos is not None:
+            return op_nos
+    return [
+        op_no
+        for op_no, op in enumerate(game.problem.OPERATORS)
+        if is_operator_applicable(op, game.current_state, roles)
+    ]
+
+
+def available_operators(
+    game: GameSession, roles: Collection[int] | None
+) -> list[OperatorElement]:
+    """
+    Describes the operators applicable for some roles in the current state of a game
+    """
+    operators = game.problem.OPERATORS
+    state = game.current_state
+
+    metadata = get_metadata(game.problem)
+    if game.view is None and metadata is not None and state is metadata.initial_state:
+        initial = metadata.initial_operators.get(frozenset(roles or ()))
+        if initial is not None:
+            return initial
+
+    def params(op_no: int) -> list[Param]:
+        if metadata is not None:
+            return metadata.params[op_no]
+        return [decode(Param, param) for param in (operators[op_no].params or [])]
+
+    if game.view is not None:
+        return [
+            OperatorElement(name, op_no, params(op_no))
+            for op_no, name in hosted_operators(game, roles)
+        ]
+
+    return [
+        OperatorElement(operator_name(operators[op_no], state), op_no, params(op_no))
+        for op_no in game_applicable_operators(game, roles)
+    ]
+
+
+def operators_available_events(
+    game: GameSession, exclude: Collection[str] = ()
+) -> list[OutboundEvent]:
+    """
+    Tells each player the operators that are available to them. If roles and turns are implemented,
+    this may send empty arrays if it's not a player's turn
+    :param exclude: sids of players not to tell
+    """
+    return [
+        OutboundEvent(
+            ServerToClient.OPERATORS_AVAILABLE,
+            encode(OperatorsAvailable(available_operators(game, roles))),
+            sid,
+        )
+        for sid, roles in game.players.items()
+        if sid not in exclude
+    ]
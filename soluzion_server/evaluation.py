@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+from typing import Any, Collection, Optional
+
+from flask import Flask, jsonify, request
+
+from soluzion_server.engine import is_operator_applicable, serialize_state
+from soluzion_server.globals import error_response
+from soluzion_server.problem_registry import get_problem_registry
+from soluzion_server.soluzion_expanded import ExpandedState, Problem, operator_name
+from soluzion_server.soluzion_types import ServerError
+from soluzion_server.state_graph import get_state_graph
+from soluzion_server.state_interning import intern_state
+
+MAX_BATCH = 10_000
+"""Number of states one request may evaluate"""
+
+
+def deserialize_state(serialized: str, problem: Problem) -> ExpandedState:
+    """
+    Rebuilds a state from its serialized string, with the problem's DESERIALIZE(serialized) if it defines
+    one, or else its State class's deserialize
+    """
+    deserialize = getattr(problem, "DESERIALIZE", None)
+    if not callable(deserialize):
+        deserialize = getattr(getattr(problem, "State", None), "deserialize", None)
+    if not callable(deserialize):
+        raise ValueError("The problem doesn't support deserializing states")
+    return deserialize(serialized)
+
+
+def evaluate_state(
+    serialized: str, roles: Collection[int] | None, problem: Problem
+) -> dict[str, Any]:
+    """
+    Gets whether a state is a goal, the operators applicable in it and the serialized states they lead
+    to, from the state graph if possible. Operators with parameters have no successor without arguments
+    """
+    operators = problem.OPERATORS
+    state = intern_state(deserialize_state(serialized, problem), problem)
+
+    graph = get_state_graph(problem)
+    node = graph.node_of(state, problem) if graph is not None else None
+    op_nos: Optional[list[int]] = None
+    if node is not None:
+        goal = bool(graph.goal[node])
+        op_nos = graph.applicable_operators(node, roles)
+    else:
+        goal = bool(state.is_goal())
+    if op_nos is None:
+        op_nos = [
+            op_no
+            for op_no, operator in enumerate(operators)
+            if is_operator_applicable(operator, state, roles)
+        ]
+
+    successors = []
+    for op_no in op_nos:
+        operator = operators[op_no]
+        successor = None
+        if not operator.params:
+            child = graph.successor(node, op_no) if node is not None else None
+            successor = serialize_state(
+                graph.states[child] if child is not None else operator.apply(state)
+            )
+        successors.append(
+            {
+                "name": operator_name(operator, state),
+                "op_no": op_no,
+                "state": successor,
+            }
+        )
+
+    return {"goal": goal, "operators": successors}
+
+
+def evaluate_states(
+    states: list[str], roles: Collection[int] | None, problem: Problem
+) -> list[dict[str, Any]]:
+    """
+    Evaluates each state on its own, so one that can't be read doesn't fail the others
+    """
+    results = []
+    for serialized in states:
+        try:
+            results.append(evaluate_state(serialized, roles, problem))
+        except Exception as e:
+            results.append(error_response(ServerError.INVALID_STATE, str(e)))
+    return results
+
+
+def configure_evaluation_handlers(app: Flask):
+    """
+    Add the HTTP endpoint for evaluating serialized states. It keeps nothing between requests, so any
+    number of servers can share the load
+    """
+
+    @app.route("/evaluate", methods=["POST"])
+    def evaluate():
+        body = request.get_json(silent=True)
+        states = body.get("states") if isinstance(body, dict) else None
+        roles = body.get("roles") if isinstance(body, dict) else None
+        name = body.get("problem") if isinstance(body, dict) else None
+
+        if (
+            not isinstance(states, list)
+            or not all(isinstance(state, str) for state in states)
+            or not (
+                roles is None
+                or isinstance(roles, list)
+                and all(isinstance(role, int) for role in roles)
+            )
+            or not (name is None or isinstance(name, str))
+        ):
+            return (
+                jsonify(
+                    error_response(
+                        ServerError.INVALID_STATE,
+                        "Expected a list of serialized states, and optionally a list of roles and a "
+                        "problem name",
+                    )
+                ),
+                400,
+            )
+        if len(states) > MAX_BATCH:
+            return (
+                jsonify(
+                    error_response(
+                        ServerError.INVALID_STATE,
+                        f"At most {MAX_BATCH} states can be evaluated at once",
+                    )
+                ),
+                400,
+            )
+
+        try:
+            problem = get_problem_registry().get(name)
+        except KeyError:
+            return (
+                jsonify(
+                    error_response(
+                        ServerError.UNKNOWN_PROBLEM, f"No problem named {name}"
+                    )
+                ),
+                400,
+            )
+        except Exception as e:
+            return (
+                jsonify(
+                    error_response(
+                        ServerError.UNKNOWN_PROBLEM, f"Unable to load {name}: {e}"
+                    )
+                ),
+                500,
+            )
+
+        roles = None if roles is None else set(roles)
+        return jsonify({"states": evaluate_states(states, roles, problem)}), 200
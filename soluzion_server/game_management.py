@@ -1,194 +1,57 @@
 from __future__ import annotations
 
-from typing import Collection
-
 from flask import request
 from flask_socketio import emit, SocketIO
 
+from soluzion_server.engine import (
+    OutboundEvent,
+    apply_operator,
+    game_operator_applicable,
+    game_started_events,
+    new_game,
+    operators_available_events,
+    room_audience,
+    validate_roles,
+)
 from soluzion_server.globals import *
-from soluzion_server.soluzion_expanded import ExpandedOperator
+from soluzion_server.problem_hosts import (
+    ProblemHost,
+    ProblemHostError,
+    configure_host_failures,
+)
+from soluzion_server.problem_registry import get_problem_registry
+from soluzion_server.rate_limiting import rate_limited
+from soluzion_server.scheduling import Priority, scheduled
 from soluzion_server.soluzion_types import *
-from soluzion_server.soluzion_types import OperatorElement
-
-
-def serialize_state(state: ExpandedState) -> str | None:
-    """
-    Gets a serialized representation of the state, if .serialize is implemented
-    :return: serialized string, or None
-    """
-
-    # noinspection PyArgumentList
-    if hasattr(state, "serialize") and callable(state.serialize):
-        return state.serialize()
-    return None
-
-
-def apply_operator(game: GameSession, op_no: int, args: Optional[list[Any]]):
-    """
-    Applies the effects of an operator on the game, transforming the state
-    """
-    operator: ExpandedOperator = PROBLEM.OPERATORS[op_no]
-
-    old_state = game.current_state
-
-    if old_state.is_goal():
-        return
-
-    new_state: ExpandedState
-    if operator.params is None or args is None:
-        new_state = operator.apply(old_state)
-    else:  # TODO make this distinction more clear
-        new_state = operator.transf(old_state, args)
-
-    game.state_stack.append(old_state)
-    game.current_state = new_state
-    game.depth += 1
-    game.step += 1
-
-    handle_transitions(old_state, new_state, operator, game.room)
-
-    emit(
-        ServerToClient.OPERATOR_APPLIED.value,
-        OperatorApplied(
-            f"{new_state}",
-            OperatorAppliedOperator(operator_name(operator, old_state), op_no, args),
-            serialize_state(new_state),
-        ).to_dict(),
-        to=game.room,
-    )
-
-    if new_state.is_goal():
-        emit(
-            ServerToClient.GAME_ENDED.value,
-            GameEnded(new_state.goal_message()).to_dict(),
-            to=game.room,
-        )
-
-    send_operators_available(game)
-
-
-def handle_transitions(
-    old_state: ExpandedState,
-    new_state: ExpandedState,
-    operator: ExpandedOperator,
-    room: str,
-):
-    """
-    Handles clients that have defined Transition Messages
-    """
-    if not hasattr(PROBLEM, "TRANSITIONS") or PROBLEM.TRANSITIONS is None:
-        return
-
-    for condition, action in PROBLEM.TRANSITIONS:
-        if condition(old_state, new_state, operator):
-            text: str
-            if callable(action):
-                text = action(old_state, new_state, operator)
-            else:
-                text = str(action)
-            emit(ServerToClient.TRANSITION.value, Transition(text).to_dict(), to=room)
-
-        # TODO document this as not default behavior, normally only 1 transition happens
-        # break
-
-
-def validate_roles(room: RoomSession):
-    """
-    Verifies whether the role assignments for the current players in the room are valid for the problem
-    :return: None if roles are valid, or a string error reason why they're invalid
-    """
-
-    if not hasattr(PROBLEM, "ROLES") or PROBLEM.ROLES is None:
-        return None
-
-    # List of all player roles
-    player_roles = [
-        role for sid in room.player_sids for role in connected_players[sid].roles
-    ]
-
-    for i, ROLE in enumerate(PROBLEM.ROLES):
-        role = Role.from_dict(ROLE)
-        count = player_roles.count(i)
-        if role.min is not None and count < role.min:
-            return f"Not enough players for role {role.name}"
-        if role.max is not None and count > role.max:
-            return f"Too many players for role {role.name}"
-
-    try:
-        if hasattr(PROBLEM, "VALIDATE_ROLES") and callable(PROBLEM.VALIDATE_ROLES):
-            result = PROBLEM.VALIDATE_ROLES(
-                [connected_players[sid].roles for sid in room.player_sids]
-            )
-            if result is not None:
-                return str(result)
-    except Exception as e:
-        return str(e)
-
-    return None
-
-
-def is_operator_applicable(
-    op: ExpandedOperator, state: ExpandedState, roles: Collection[int] | None
-):
-    """
-    Check if operator is applicable, working whether roles are defined or not
-    """
-
-    if state.is_goal():
-        return False
-
-    if roles is None or len(roles) == 0:
-        return op.is_applicable(state)
-
-    for role in roles:
-        if op.is_applicable(state, role):
-            return True
-
-    return False
-
-
-def get_applicable_operators(
-    state: ExpandedState, roles: Collection[int] | None
-) -> list[ExpandedOperator]:
-    """
-    Gets all applicable operators, possibly only for a specific role
-    """
-    return [op for op in PROBLEM.OPERATORS if is_operator_applicable(op, state, roles)]
-
-
-def operator_name(operator: ExpandedOperator, state: ExpandedState):
-    """
-    Gets the display name of an operator, supporting dynamic names
-    """
-    # noinspection PyArgumentList
-    return (
-        operator.get_name(state)
-        if hasattr(operator, "get_name") and callable(operator.get_name)
-        else operator.name
-    )
-
-
-def send_operators_available(game: GameSession):
-    """
-    Sends each player the operators that are available to them. If roles and turns are implemented,
-    this may send empty arrays if it's not a player's turn
-    """
-    state = game.current_state
-    for sid, roles in game.players.items():
-        operators = get_applicable_operators(state, roles)
-        emit(
-            ServerToClient.OPERATORS_AVAILABLE.value,
-            OperatorsAvailable(
-                [
-                    OperatorElement(
-                        operator_name(op, state),
-                        PROBLEM.OPERATORS.index(op),
-                        [Param.from_dict(param) for param in (op.params or [])],
-                    )
-                    for op in operators
-                ]
-            ).to_dict(),
-            to=sid,
+from soluzion_server.solver import get_solver, SearchResult
+from soluzion_server.state_graph import get_state_graph
+from soluzion_server.transport import configure_transport, deliver
+from soluzion_server.type_codecs import decode, encode
+
+
+def end_games_on_host(host: ProblemHost, reason: str):
+    """
+    Ends every game pinned to a problem host that failed, leaving the rooms of other hosts alone. The
+    rooms stay open, and a new game gets a working host
+    """
+    for room in list(room_sessions.values()):
+        game = room.game
+        if game is None or game.host is not host:
+            continue
+        with game.lock:
+            if room.game is not game:
+                continue
+            room.game = None
+
+        deliver(
+            [
+                OutboundEvent(
+                    ServerToClient.GAME_ENDED,
+                    encode(GameEnded(reason)),
+                    room_audience(room.id),
+                ),
+                OutboundEvent(ServerToClient.ROOM_CHANGED, room.to_dict(), None),
+            ]
         )
 
 
@@ -196,10 +59,13 @@ def configure_game_handlers(socketio: SocketIO):
     """
     Add the handlers for processing game events
     """
+    configure_transport(socketio)
+    configure_host_failures(end_games_on_host)
 
     @socketio.on(ClientToServer.START_GAME.value)
+    @scheduled(Priority.GAME)
     def start_game(data):
-        event = StartGame.from_dict(data)
+        event = decode(StartGame, data)
         room = current_room(request.sid)
         if room is None:
             return error_response(ServerError.NOT_IN_A_ROOM)
@@ -207,7 +73,10 @@ def configure_game_handlers(socketio: SocketIO):
         if room.game is not None:
             return error_response(ServerError.GAME_ALREADY_STARTED)
 
-        roles_error = validate_roles(room)
+        # New games start on the problem as it is now, running games keep theirs
+        problem = get_problem_registry().get(room.problem)
+
+        roles_error = validate_roles(room, problem)
         if roles_error is not None:
             return error_response(ServerError.INVALID_ROLES, roles_error)
 
@@ -215,35 +84,24 @@ def configure_game_handlers(socketio: SocketIO):
             (player, connected_players[player].roles) for player in room.player_sids
         )
 
-        state: ExpandedState
-
-        if hasattr(PROBLEM, "INITIAL_STATE") and PROBLEM.INITIAL_STATE is not None:
-            state = PROBLEM.INITIAL_STATE
-        elif event.args is not None:
-            try:
-                state = PROBLEM.State(args=event.args)
-            except Error as e:
-                print(e)
-                state = PROBLEM.State()
-        else:
-            state = PROBLEM.State()
-
         # Start the game session
 
-        game = room.game = GameSession(state, [], room.owner_sid, room.id, roles)
+        try:
+            game = room.game = new_game(
+                room.id, room.owner_sid, roles, event.args, problem
+            )
+        except ProblemHostError as e:
+            return error_response(ServerError.PROBLEM_HOST_FAILED, str(e))
 
-        emit(
-            ServerToClient.GAME_STARTED.value,
-            GameStarted(f"{state}", serialize_state(state)).to_dict(),
-            to=room.id,
-        )
+        deliver(game_started_events(game))
         emit(ServerToClient.ROOM_CHANGED.value, room.to_dict(), broadcast=True)
-
-        send_operators_available(game)
+        deliver(operators_available_events(game))
 
     @socketio.on(ClientToServer.OPERATOR_CHOSEN.value)
+    @rate_limited(ClientToServer.OPERATOR_CHOSEN)
+    @scheduled(Priority.GAME)
     def operator_chosen(data):
-        event = OperatorChosen.from_dict(data)
+        event = decode(OperatorChosen, data)
 
         player = current_player(request.sid)
         room = current_room(request.sid)
@@ -253,13 +111,104 @@ def configure_game_handlers(socketio: SocketIO):
             return error_response(ServerError.NOT_IN_A_ROOM)
         if game is None:
             return error_response(ServerError.GAME_NOT_STARTED)
-        if event.op_no < 0 or event.op_no >= len(PROBLEM.OPERATORS):
+        if event.op_no < 0 or event.op_no >= len(game.problem.OPERATORS):
             return error_response(ServerError.INVALID_OPERATOR, "Out of Bounds")
 
-        state = game.current_state
-        operator: ExpandedOperator = PROBLEM.OPERATORS[int(event.op_no)]
+        with game.lock:
+            try:
+                if not game_operator_applicable(game, int(event.op_no), player.roles):
+                    return error_response(
+                        ServerError.INVALID_OPERATOR, "Not Applicable"
+                    )
+                events = apply_operator(game, int(event.op_no), event.params)
+            except ProblemHostError as e:
+                return error_response(ServerError.PROBLEM_HOST_FAILED, str(e))
+            deliver(events)
+
+    def search_current_state(sid: str) -> SearchResult | dict:
+        """
+        Runs the solver from the current state of the player's game
+        :return: the search result, or an error response
+        """
+        game = current_game(sid)
+
+        if current_room(sid) is None:
+            return error_response(ServerError.NOT_IN_A_ROOM)
+        if game is None:
+            return error_response(ServerError.GAME_NOT_STARTED)
+
+        if game.node is not None:
+            return get_state_graph().plan(game.node)
+
+        result = get_solver(game.problem).solve(game.current_state)
 
-        if not is_operator_applicable(operator, state, player.roles):
-            return error_response(ServerError.INVALID_OPERATOR, "Not Applicable")
+        if result.exhausted:
+            return error_response(ServerError.SEARCH_BUDGET_EXCEEDED)
 
-        apply_operator(game, int(event.op_no), event.params)
+        return result
+
+    @socketio.on(ClientToServer.BEST_MOVE.value)
+    @rate_limited(ClientToServer.BEST_MOVE)
+    @scheduled(Priority.SEARCH)
+    def best_move(data):
+        player = current_player(request.sid)
+        game = current_game(request.sid)
+
+        if current_room(request.sid) is None:
+            return error_response(ServerError.NOT_IN_A_ROOM)
+        if game is None:
+            return error_response(ServerError.GAME_NOT_STARTED)
+
+        result = get_solver(game.problem).best_move(game.current_state, player.roles)
+        if result is None:
+            return error_response(ServerError.SEARCH_BUDGET_EXCEEDED)
+
+        return encode(
+            BestMove(
+                result.depth,
+                (
+                    PlanOperator(result.name, result.op_no)
+                    if result.op_no is not None
+                    else None
+                ),
+                result.score,
+            )
+        )
+
+    @socketio.on(ClientToServer.HINT.value)
+    @rate_limited(ClientToServer.HINT)
+    @scheduled(Priority.SEARCH)
+    def hint(data):
+        result = search_current_state(request.sid)
+        if not isinstance(result, SearchResult):
+            return result
+
+        if not result.operators:
+            return encode(Hint(None if result.operators is None else 0, None))
+
+        return encode(
+            Hint(
+                len(result.operators),
+                PlanOperator(result.names[0], result.operators[0]),
+            )
+        )
+
+    @socketio.on(ClientToServer.SOLVE.value)
+    @rate_limited(ClientToServer.SOLVE)
+    @scheduled(Priority.SEARCH)
+    def solve(data):
+        result = search_current_state(request.sid)
+        if not isinstance(result, SearchResult):
+            return result
+
+        if result.operators is None:
+            return encode(Solve(None))
+
+        return encode(
+            Solve(
+                [
+                    PlanOperator(name, op_no)
+                    for name, op_no in zip(result.names, result.operators)
+                ]
+            )
+        )
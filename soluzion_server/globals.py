@@ -1,11 +1,16 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Optional
+import threading
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Optional
 
 from soluzion_server.soluzion_expanded import Problem, ExpandedState
 from soluzion_server.soluzion_types import ErrorResponse, Error, Room, RoomPlayerClass
-from soluzion_server.soluzion_types import ServerError
+from soluzion_server.soluzion_types import BotPolicy, ServerError, StateRepresentation
+from soluzion_server.type_codecs import encode
+
+if TYPE_CHECKING:
+    from soluzion_server.problem_hosts import ProblemHost, StateView
 
 PROBLEM: Problem | None = None
 
@@ -21,6 +26,15 @@ class PlayerSession:
     name: Optional[str]
     room: Optional[str]
     roles: set[int]
+    representations: set[StateRepresentation] = field(
+        default_factory=lambda: set(StateRepresentation)
+    )
+    bot: Optional[BotPolicy] = (
+        None  # Set for bots played by the server, which have no socket
+    )
+    spectating: Optional[str] = None  # Room being watched, instead of played in
+    step_events: bool = False  # Gets one step event per operator applied
+    moved_to: Optional[int] = None  # Step a bot's last move led to
 
 
 @dataclass
@@ -32,6 +46,19 @@ class GameSession:
     players: dict[str, set[int]]  # Mapping of sid to role number
     step: int = 0
     depth: int = 0
+    node: Optional[int] = (
+        None  # Node of the current state in the precomputed state graph
+    )
+    lock: threading.RLock = field(default_factory=threading.RLock, repr=False)
+    problem: Problem = field(
+        default_factory=lambda: PROBLEM, repr=False
+    )  # Problem module the game is played with
+    host: Optional[ProblemHost] = field(
+        default=None, repr=False
+    )  # Subprocess running the problem's code for the game, if it isn't run in the server
+    view: Optional[StateView] = field(
+        default=None, repr=False
+    )  # The host's description of the current state
 
 
 @dataclass
@@ -40,20 +67,25 @@ class RoomSession:
     owner_sid: str
     player_sids: list[str]
     game: Optional[GameSession]
+    spectator_sids: list[str] = field(default_factory=list)
+    problem: Optional[str] = None  # Name of the hosted problem played in the room
 
     def to_dict(self):
-        return Room(
-            self.game is not None,
-            self.owner_sid,
-            [
-                RoomPlayerClass(
-                    player.name or player.sid, list(player.roles), player.sid
-                )
-                for player in connected_players.values()
-                if player.sid in self.player_sids
-            ],
-            self.id,
-        ).to_dict()
+        return encode(
+            Room(
+                self.game is not None,
+                self.owner_sid,
+                [
+                    RoomPlayerClass(
+                        player.name or player.sid, list(player.roles), player.sid
+                    )
+                    for player in connected_players.values()
+                    if player.sid in self.player_sids
+                ],
+                self.problem,
+                self.id,
+            )
+        )
 
 
 connected_players: dict[str, PlayerSession] = {}
@@ -82,7 +114,7 @@ def current_game(sid: str) -> GameSession | None:
 
 def error_response(error: ServerError, message: str = None):
     print(error.value, message)
-    return ErrorResponse(Error(message, error)).to_dict()
+    return encode(ErrorResponse(Error(message, error)))
 
 
 # end region
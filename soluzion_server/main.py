@@ -1,10 +1,19 @@
+from __future__ import annotations
+
 import argparse
+import os
+import sys
+from typing import Any
+
+# Nothing heavy is imported with this module: Flask, Socket.IO and the problem are only loaded by main(),
+# once the arguments are known to need them
+
+
+def rate_limit(text: str) -> tuple[Any, Any]:
+    from soluzion_server.rate_limiting import parse_rate_limit
 
-from flask import Flask, jsonify
-from flask_cors import CORS
-from flask_socketio import SocketIO
+    return parse_rate_limit(text)
 
-from soluzion_server.problem_loading import load_problem
 
 # Setup CLI args
 parser = argparse.ArgumentParser(
@@ -14,38 +23,315 @@ parser = argparse.ArgumentParser(
     formatter_class=argparse.ArgumentDefaultsHelpFormatter,
 )
 parser.add_argument("problem_path", type=str, help="Path to the Soluzion problem file")
+parser.add_argument(
+    "--problems",
+    type=str,
+    nargs="+",
+    default=[],
+    metavar="PATH",
+    help="more problem files, or directories of them, that rooms can play instead of problem_path. Each is "
+    "loaded when a room first plays it",
+)
+parser.add_argument(
+    "--reload-interval",
+    type=float,
+    default=1.0,
+    help="seconds between checks of the loaded problem files for changes to reload, or 0 to never reload",
+)
+parser.add_argument(
+    "--check",
+    action="store_true",
+    help="load and warm up every hosted problem, report any that fail, and exit without serving",
+)
 parser.add_argument("-p", "--port", type=int, default=5000, help="port to listen on")
 parser.add_argument("-d", "--debug", action="store_true", help="enable debug mode")
-args = parser.parse_args()
+parser.add_argument(
+    "--intern-states",
+    action="store_true",
+    help="share one instance of identical states between all rooms",
+)
+parser.add_argument(
+    "--precompute-graph",
+    action="store_true",
+    help="explore the problem's reachable states at startup, and serve games from the precomputed graph",
+)
+parser.add_argument(
+    "--graph-state-limit",
+    type=int,
+    default=100_000,
+    help="number of states to stop precomputing the graph at",
+)
+parser.add_argument(
+    "--explore-workers",
+    type=int,
+    default=1,
+    help="number of processes to explore the state space with for --precompute-graph",
+)
+parser.add_argument(
+    "--problem-hosts",
+    type=int,
+    default=0,
+    help="number of subprocesses per problem to run the problem's code for games in, each game pinned to one, "
+    "or 0 to run it in the server. Can't be combined with --precompute-graph",
+)
+parser.add_argument(
+    "--host-timeout",
+    type=float,
+    default=5.0,
+    help="seconds a problem host may take to answer before it's considered hung, and its games are ended",
+)
+parser.add_argument(
+    "--solver-workers",
+    type=int,
+    default=1,
+    help="number of worker processes running hint and solve searches",
+)
+parser.add_argument(
+    "--solver-max-nodes",
+    type=int,
+    default=200_000,
+    help="maximum number of states a search may expand",
+)
+parser.add_argument(
+    "--solver-time-limit",
+    type=float,
+    default=5.0,
+    help="maximum number of seconds a search may run for",
+)
+parser.add_argument(
+    "--move-time-limit",
+    type=float,
+    default=2.0,
+    help="number of seconds a best move search may run for",
+)
+parser.add_argument(
+    "--bot-workers",
+    type=int,
+    default=4,
+    help="number of threads shared by all bots to choose their moves on",
+)
+parser.add_argument(
+    "--bot-move-delay",
+    type=float,
+    default=1.0,
+    help="seconds a bot waits before each of its moves",
+)
+parser.add_argument(
+    "--cache-dir",
+    type=str,
+    default=os.path.join(os.path.expanduser("~"), ".cache", "soluzion_server"),
+    help="directory to keep precomputed state graphs and solver results in across restarts",
+)
+parser.add_argument(
+    "--no-cache",
+    action="store_true",
+    help="don't read or write the cache directory",
+)
+parser.add_argument(
+    "--send-queue-limit",
+    type=int,
+    default=256,
+    help="number of events a client may fall behind by before it's disconnected, after outdated ones are dropped",
+)
+parser.add_argument(
+    "--rate-limit",
+    type=rate_limit,
+    action="append",
+    default=[],
+    metavar="EVENT=RATE[/BURST]",
+    help="events per second, and at once, each client may send an event at, replacing the default for list_rooms, "
+    "set_roles and operator_chosen, or lifting it with a rate of 0",
+)
+parser.add_argument(
+    "--global-rate-limit",
+    type=float,
+    default=500,
+    help="events per second all clients together may send rate limited events at, or 0 for no limit",
+)
+parser.add_argument(
+    "--handler-workers",
+    type=int,
+    default=8,
+    help="number of threads running event handlers in order of priority, or 0 to run each as it arrives",
+)
+parser.add_argument(
+    "--shed-after",
+    type=float,
+    default=0.5,
+    help="seconds a lobby request may wait for a handler thread before it's answered with an Overloaded error",
+)
+parser.add_argument(
+    "--startup-profile",
+    action="store_true",
+    help="print how long each phase of startup and each imported module took, once the server is ready",
+)
+parser.add_argument(
+    "--websocket-path",
+    type=str,
+    default="/ws",
+    help="path of the plain WebSocket endpoint, which shares rooms with Socket.IO clients",
+)
+
 
-# Load the passed in Soluzion problem
-load_problem(args.problem_path)
+def load_problems(args: argparse.Namespace):
+    """
+    Loads and warms up the default problem, or every hosted problem with --check, exiting if any fail
+    :return: the default problem
+    """
+    from soluzion_server.problem_loading import load_problem
+    from soluzion_server.problem_registry import get_problem_registry, register_problems
+    from soluzion_server.state_interning import enable_state_interning
+    from soluzion_server.warmup import warm_up
 
-# Only import these after the problem has been loaded
-from soluzion_server.room_management import configure_room_handlers
-from soluzion_server.game_management import configure_game_handlers
+    problem = load_problem(args.problem_path)
+    register_problems(problem, args.problems)
 
-# Configure the flask socketio server
-app = Flask(__name__)
-app.config["SECRET_KEY"] = "secret!"
-socketio = SocketIO(app, logger=args.debug, cors_allowed_origins="*")
-cors = CORS(app, resources={r"*": {"origins": "*"}})
+    if args.intern_states:
+        enable_state_interning()
 
-# Add the handlers for processing player/room joining
-configure_room_handlers(socketio)
+    # Work out everything about the problems that doesn't change while they're played, so a broken
+    # problem fails here instead of on the first request for it
+    registry = get_problem_registry()
+    failures = 0
+    for name in registry.names() if args.check else [registry.default]:
+        try:
+            if name == registry.default:
+                warm_up(problem, registry.names())
+            else:
+                registry.get(name)
+        except Exception as e:
+            print(f"Problem {name} failed its warm-up: {e}")
+            failures += 1
+    if failures:
+        sys.exit(1)
+    if args.check:
+        print(f"All {len(registry.names())} problems passed their warm-up")
+        sys.exit(0)
 
-# Add the handlers for processing game events
-configure_game_handlers(socketio)
+    return problem
 
 
-# Health Endpoint
-@app.route("/health", methods=["GET"])
-def health_check():
-    return jsonify({"status": "healthy"}), 200
+def configure_server(args: argparse.Namespace, problem):
+    """
+    Sets up the caches, solver, bots and limits handlers rely on
+    """
+    from soluzion_server.bots import configure_bots
+    from soluzion_server.problem_hosts import configure_problem_hosts, get_host_pool
+    from soluzion_server.problem_registry import watch_problems
+    from soluzion_server.rate_limiting import configure_rate_limits
+    from soluzion_server.scheduling import configure_scheduler
+    from soluzion_server.solver import configure_solver
+    from soluzion_server.state_cache import configure_problem_cache
+    from soluzion_server.state_graph import precompute_state_graph
 
+    if args.reload_interval > 0:
+        watch_problems(args.reload_interval)
 
-def main():
+    if not args.no_cache:
+        configure_problem_cache(args.cache_dir, problem.__file__)
+
+    configure_solver(
+        args.problem_path,
+        args.solver_workers,
+        args.solver_max_nodes,
+        args.solver_time_limit,
+        args.move_time_limit,
+    )
+
+    configure_bots(args.bot_workers, args.bot_move_delay)
+
+    configure_problem_hosts(args.problem_hosts, args.host_timeout)
+    pool = get_host_pool(problem)
+    if pool is not None:
+        pool.start()
+
+    configure_rate_limits(dict(args.rate_limit), args.global_rate_limit)
+
+    configure_scheduler(args.handler_workers, args.shed_after)
+
+    if args.precompute_graph:
+        precompute_state_graph(args.graph_state_limit, args.explore_workers)
+
+
+def create_app(args: argparse.Namespace):
+    """
+    Builds the Flask app and Socket.IO server with every handler, after the problem has been loaded
+    :return: the app and its Socket.IO server
+    """
+    from flask import Flask, jsonify
+    from flask_cors import CORS
+    from flask_socketio import SocketIO
+
+    from soluzion_server.evaluation import configure_evaluation_handlers
+    from soluzion_server.game_management import configure_game_handlers
+    from soluzion_server.metrics import configure_metrics_handlers
+    from soluzion_server.room_management import configure_room_handlers
+    from soluzion_server.websocket_endpoint import (
+        SharedRoomManager,
+        configure_websocket_endpoint,
+    )
+
+    # Configure the flask socketio server
+    app = Flask(__name__)
+    app.config["SECRET_KEY"] = "secret!"
+    socketio = SocketIO(
+        app,
+        logger=args.debug,
+        cors_allowed_origins="*",
+        client_manager=SharedRoomManager(args.send_queue_limit),
+    )
+    CORS(app, resources={r"*": {"origins": "*"}})
+
+    # Add the handlers for processing player/room joining
+    configure_room_handlers(socketio)
+
+    # Add the handlers for processing game events
+    configure_game_handlers(socketio)
+
+    # Add the stateless HTTP API for evaluating serialized states
+    configure_evaluation_handlers(app)
+
+    # Report the server's counters
+    configure_metrics_handlers(app)
+
+    # Serve the same events to plain WebSocket clients
+    configure_websocket_endpoint(app, socketio, args.websocket_path)
+
+    # Health Endpoint
+    @app.route("/health", methods=["GET"])
+    def health_check():
+        return jsonify({"status": "healthy"}), 200
+
+    return app, socketio
+
+
+def main(argv: list[str] | None = None):
     """Start the Soluzion Server"""
+    args = parser.parse_args(argv)
+    if args.problem_hosts > 0 and args.precompute_graph:
+        parser.error("--problem-hosts can't be combined with --precompute-graph")
+
+    from soluzion_server.startup_profile import (
+        get_startup_profile,
+        start_startup_profile,
+        startup_phase,
+    )
+
+    if args.startup_profile:
+        start_startup_profile()
+
+    with startup_phase("load problems"):
+        problem = load_problems(args)
+    with startup_phase("configure"):
+        configure_server(args, problem)
+    with startup_phase("create app"):
+        app, socketio = create_app(args)
+
+    profile = get_startup_profile()
+    if profile is not None:
+        profile.stop()
+        print(profile.report())
+
     socketio.run(
         app,
         host="0.0.0.0",
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from soluzion_server.soluzion_expanded import ExpandedState, Problem
+from soluzion_server.soluzion_types import OperatorElement, Param, Role
+
+
+class EncodedPayload(dict):
+    """
+    A response that never changes, with its JSON encoded once for the plain WebSocket endpoint. Socket.IO
+    encodes it like any other dict
+    """
+
+    def __init__(self, payload: dict[str, Any]):
+        super().__init__(payload)
+        self.json = json.dumps(payload, separators=(",", ":"))
+
+
+@dataclass
+class ProblemMetadata:
+    """
+    Everything about a problem that doesn't change while it's played, worked out once by the warm-up
+    """
+
+    roles: list[Role]
+    role_list: EncodedPayload  # Response to list_roles
+    option_list: EncodedPayload  # Response to list_options
+    info: EncodedPayload  # Response to info
+    params: list[list[Param]]  # Parameters of each operator
+    initial_state: Optional[
+        ExpandedState
+    ]  # Initial state of games started without args
+    initial_message: Optional[str]
+    initial_serialized: Optional[str]
+    initial_operators: dict[frozenset[int], list[OperatorElement]]
+    """Operators available in the initial state, for no roles and each single role"""
+
+
+_metadata: dict[int, ProblemMetadata] = {}
+
+
+def set_metadata(problem: Problem, metadata: ProblemMetadata):
+    _metadata[id(problem)] = metadata
+
+
+def get_metadata(problem: Problem) -> Optional[ProblemMetadata]:
+    """
+    :return: the problem's metadata, or None if it wasn't warmed up
+    """
+    return _metadata.get(id(problem))
+
+
+def forget_metadata(problem: Problem):
+    _metadata.pop(id(problem), None)
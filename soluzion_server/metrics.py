@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import threading
+from collections import defaultdict
+
+from flask import Flask, jsonify
+
+_counters: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+_lock = threading.Lock()
+
+
+def increment(name: str, label: str = "", amount: int = 1):
+    """
+    Adds to a counter, kept separately for each label, like the event it counts
+    """
+    with _lock:
+        _counters[name][label] += amount
+
+
+def snapshot() -> dict[str, dict[str, int]]:
+    """
+    Gets the current value of every counter, by name and then label
+    """
+    with _lock:
+        return {name: dict(labels) for name, labels in _counters.items()}
+
+
+def configure_metrics_handlers(app: Flask):
+    """
+    Add the HTTP endpoint reporting the server's counters
+    """
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        return jsonify({"counters": snapshot()}), 200
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Any, Callable, Hashable, Optional
+
+from soluzion_server.soluzion_types import ServerToClient
+
+READY_WAIT = 0.5
+"""Seconds the sender waits at most for a client to catch up, before checking whether it was closed"""
+
+
+def collapse_key(event: str, data: Any) -> Optional[Hashable]:
+    """
+    Gets what an event supersedes: a queued event with the same key is outdated once it's sent, like an
+    older list of operators or snapshot of the same room
+    :return: the key, or None if every event of its kind matters
+    """
+    if event == ServerToClient.OPERATORS_AVAILABLE.value:
+        return event
+    if event == ServerToClient.ROOM_CHANGED.value and isinstance(data, dict):
+        return event, data.get("room")
+    return None
+
+
+class _Entry:
+    __slots__ = ("key", "payload", "live")
+
+    def __init__(self, key: Optional[Hashable], payload: Any):
+        self.key = key
+        self.payload = payload
+        self.live = True
+
+
+class OutboundQueue:
+    """
+    Bounded queue of the events waiting to be written to one client, drained by a sender thread of its
+    own so handlers never wait on the client's socket. An event replaces any queued one it makes
+    outdated, so a client that falls behind skips straight to the latest operators and room snapshots
+    """
+
+    def __init__(
+        self,
+        name: str,
+        write: Callable[[Any], None],
+        ready: Callable[[float], bool],
+        limit: int,
+    ):
+        """
+        :param write: sends one payload to the client
+        :param ready: waits up to the given seconds for the client to be able to take another payload
+        without it piling up further down, returning whether it can
+        :param limit: number of events the client may fall behind by
+        """
+        self.write = write
+        self.ready = ready
+        self.limit = limit
+
+        self.entries: deque[_Entry] = deque()
+        self.keys: dict[Hashable, _Entry] = {}
+        self.size = 0
+        self.closed = False
+        self.condition = threading.Condition()
+
+        self.thread = threading.Thread(
+            target=self._run, name=f"sender-{name}", daemon=True
+        )
+        self.thread.start()
+
+    def put(self, key: Optional[Hashable], payload: Any) -> bool:
+        """
+        Queues a payload for the client
+        :param key: collapse key of the event, see collapse_key
+        :return: False if the client has fallen too far behind to keep up, only once, as the queue is
+        closed then
+        """
+        with self.condition:
+            if self.closed:
+                return True
+
+            stale = self.keys.pop(key, None) if key is not None else None
+            if stale is not None:
+                stale.live = False
+                self.size -= 1
+            elif self.size >= self.limit:
+                # Closed so a client being disconnected only overflows once
+                self._close()
+                return False
+
+            entry = _Entry(key, payload)
+            self.entries.append(entry)
+            if key is not None:
+                self.keys[key] = entry
+            self.size += 1
+            self.condition.notify()
+            return True
+
+    def close(self):
+        with self.condition:
+            self._close()
+
+    def _close(self):
+        self.closed = True
+        self.entries.clear()
+        self.keys.clear()
+        self.condition.notify()
+
+    def _next(self) -> Optional[_Entry]:
+        with self.condition:
+            while not self.closed:
+                while self.entries and not self.entries[0].live:
+                    self.entries.popleft()
+                if self.entries:
+                    break
+                self.condition.wait()
+            else:
+                return None
+
+        # Events keep collapsing while they wait for the client
+        while not self.ready(READY_WAIT):
+            if self.closed:
+                return None
+
+        with self.condition:
+            while self.entries and not self.entries[0].live:
+                self.entries.popleft()
+            if self.closed or not self.entries:
+                return None
+            entry = self.entries.popleft()
+            if entry.key is not None:
+                del self.keys[entry.key]
+            self.size -= 1
+            return entry
+
+    def _run(self):
+        while not self.closed:
+            entry = self._next()
+            if entry is None:
+                continue
+            try:
+                self.write(entry.payload)
+            except Exception as e:
+                print(f"Unable to send to {self.thread.name}: {e}")
@@ -0,0 +1,385 @@
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import os
+import pickle
+import time
+from multiprocessing.connection import Connection, wait
+from typing import Any, Optional
+
+import numpy as np
+
+import soluzion_server.globals as server_globals
+from soluzion_server.state_cache import FingerprintIndex
+from soluzion_server.state_graph import (
+    StateGraph,
+    StateSpaceTooLarge,
+    expand_state,
+    goal_distances,
+    initial_state,
+    pack_applicable,
+)
+from soluzion_server.state_interning import state_fingerprint
+
+
+class ExploreError(Exception):
+    pass
+
+
+def owner_of(fingerprint: bytes, workers: int) -> int:
+    """
+    Gets the worker whose partition of the state space a fingerprint falls in
+    """
+    return int.from_bytes(fingerprint[:4], "little") % workers
+
+
+def _explore_worker(
+    worker_no: int,
+    workers: int,
+    problem_path: str,
+    inboxes: list,
+    conn: Connection,
+    batch_size: int,
+):
+    """
+    Owns the states whose fingerprints fall in one partition. Each level, it expands its frontier and
+    sends the states it discovers to their owners' inboxes in batches, then takes in the batches sent
+    to it to build its next frontier. Commands come from explore_parallel over the pipe
+    """
+    from soluzion_server.problem_loading import load_problem
+
+    problem = load_problem(problem_path)
+    role_count = len(getattr(problem, "ROLES", None) or [])
+    inbox = inboxes[worker_no]
+
+    index: dict[bytes, int] = {}
+    states = []
+    frontier: list[int] = []
+    discovered: list[tuple[bytes, Any]] = []
+
+    goal: list[bool] = []
+    applicable: list[bool] = []
+    offsets = [0]
+    edge_operators: list[int] = []
+    edge_owners: list[int] = []
+    edge_targets: list[bytes] = []
+
+    def discover(fingerprint: bytes, state):
+        if fingerprint not in index:
+            index[fingerprint] = len(states)
+            states.append(state)
+            frontier.append(len(states) - 1)
+
+    def expand() -> list[int]:
+        outgoing = [[] for _ in range(workers)]
+        sent = [0] * workers
+        seen = set()
+
+        def send(owner: int):
+            inboxes[owner].put(pickle.dumps(outgoing[owner], pickle.HIGHEST_PROTOCOL))
+            outgoing[owner] = []
+            sent[owner] += 1
+
+        # Frontier nodes are numbered consecutively, so the edges stay in node order
+        nodes = frontier.copy()
+        frontier.clear()
+        for node in nodes:
+            is_goal, layers, children = expand_state(problem, states[node], role_count)
+            goal.append(is_goal)
+            applicable.extend(layers)
+
+            for op_no, child in children:
+                fingerprint = state_fingerprint(child, problem)
+                owner = owner_of(fingerprint, workers)
+                edge_operators.append(op_no)
+                edge_owners.append(owner)
+                edge_targets.append(fingerprint)
+
+                if owner == worker_no:
+                    if fingerprint not in index:
+                        discovered.append((fingerprint, child))
+                elif fingerprint not in seen:
+                    seen.add(fingerprint)
+                    outgoing[owner].append((fingerprint, child))
+                    if len(outgoing[owner]) >= batch_size:
+                        send(owner)
+
+            offsets.append(len(edge_operators))
+
+        for owner in range(workers):
+            if outgoing[owner]:
+                send(owner)
+        return sent
+
+    def receive(batches: int) -> tuple[int, int]:
+        for fingerprint, state in discovered:
+            discover(fingerprint, state)
+        discovered.clear()
+        for _ in range(batches):
+            for fingerprint, state in pickle.loads(inbox.get()):
+                discover(fingerprint, state)
+        return len(frontier), len(states)
+
+    def collect() -> dict:
+        return {
+            "fingerprints": b"".join(index),
+            "states": states,
+            "goal": np.array(goal, dtype=bool),
+            "applicable": np.array(applicable, dtype=bool).reshape(
+                len(goal), len(problem.OPERATORS), role_count + 1
+            ),
+            "offsets": np.array(offsets, dtype=np.int64),
+            "operators": np.array(edge_operators, dtype=np.int16),
+            "owners": np.array(edge_owners, dtype=np.int32),
+            "targets": b"".join(edge_targets),
+        }
+
+    def resolve(fingerprints: bytes) -> np.ndarray:
+        return np.array(
+            [index[fingerprints[i : i + 16]] for i in range(0, len(fingerprints), 16)],
+            dtype=np.int32,
+        )
+
+    commands = {
+        "expand": expand,
+        "receive": receive,
+        "collect": collect,
+        "resolve": resolve,
+    }
+
+    while True:
+        command, *args = conn.recv()
+        if command == "stop":
+            return
+        try:
+            conn.send((True, commands[command](*args)))
+        except Exception as e:
+            conn.send((False, f"{type(e).__name__}: {e}"))
+
+
+class _Workers:
+    """
+    Worker processes for one exploration, with their command pipes and inboxes
+    """
+
+    def __init__(self, problem_path: str, workers: int, batch_size: int):
+        context = multiprocessing.get_context("spawn")
+        self.inboxes = [context.Queue() for _ in range(workers)]
+        self.connections: list[Connection] = []
+        self.processes = []
+
+        for worker_no in range(workers):
+            conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_explore_worker,
+                args=(
+                    worker_no,
+                    workers,
+                    problem_path,
+                    self.inboxes,
+                    child_conn,
+                    batch_size,
+                ),
+                daemon=True,
+            )
+            process.start()
+            self.connections.append(conn)
+            self.processes.append(process)
+
+    def call(self, commands: list[tuple]) -> list:
+        """
+        Sends one command to each worker, and waits for all of their replies
+        """
+        for conn, command in zip(self.connections, commands):
+            conn.send(command)
+
+        replies = {}
+        sentinels = {process.sentinel: i for i, process in enumerate(self.processes)}
+        pending = {conn: i for i, conn in enumerate(self.connections)}
+        while pending:
+            for ready in wait([*pending, *sentinels]):
+                if ready in sentinels:
+                    # A worker dying leaves the others waiting on its batches forever
+                    raise ExploreError(f"worker {sentinels[ready]} exited")
+                ok, value = ready.recv()
+                if not ok:
+                    raise ExploreError(value)
+                replies[pending.pop(ready)] = value
+        return [replies[i] for i in range(len(self.connections))]
+
+    def broadcast(self, *command) -> list:
+        return self.call([command] * len(self.connections))
+
+    def close(self):
+        for conn in self.connections:
+            try:
+                conn.send(("stop",))
+            except OSError:
+                pass
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+
+def explore_parallel(
+    problem_path: str, workers: int, state_limit: int, batch_size: int = 1024
+) -> Optional[StateGraph]:
+    """
+    Explores every state reachable from the problem's initial state, with the state space hash
+    partitioned between worker processes that expand their own partition one level at a time
+    :param problem_path: problem file for the workers to load, the same as the loaded problem
+    :param state_limit: number of states to give up after
+    :param batch_size: number of states sent between workers at once
+    :return: the graph, or None if exploring failed
+    :raises StateSpaceTooLarge: if there are more states than the limit
+    """
+    start_time = time.perf_counter()
+    problem = server_globals.PROBLEM
+    pool = _Workers(problem_path, workers, batch_size)
+
+    try:
+        initial = initial_state(problem)
+        fingerprint = state_fingerprint(initial, problem)
+        expected = [0] * workers
+        expected[owner_of(fingerprint, workers)] = 1
+        pool.inboxes[owner_of(fingerprint, workers)].put(
+            pickle.dumps([(fingerprint, initial)])
+        )
+
+        while True:
+            replies = pool.call([("receive", batches) for batches in expected])
+            if sum(total for _, total in replies) > state_limit:
+                raise StateSpaceTooLarge(state_limit)
+            if sum(frontier for frontier, _ in replies) == 0:
+                break
+
+            sent = pool.broadcast("expand")
+            expected = [
+                sum(counts[owner] for counts in sent) for owner in range(workers)
+            ]
+
+        parts = pool.broadcast("collect")
+
+        # Edges point at fingerprints until their owners resolve them to node numbers
+        counts = [len(part["goal"]) for part in parts]
+        bases = np.cumsum([0, *counts])
+        targets = [np.empty(len(part["operators"]), dtype=np.int32) for part in parts]
+        fingerprints = [np.frombuffer(part["targets"], dtype="V16") for part in parts]
+        masks = [
+            [part["owners"] == owner for part in parts] for owner in range(workers)
+        ]
+        resolved = pool.call(
+            [
+                (
+                    "resolve",
+                    b"".join(
+                        fingerprints[w][masks[owner][w]].tobytes()
+                        for w in range(workers)
+                    ),
+                )
+                for owner in range(workers)
+            ]
+        )
+        for owner, nodes in enumerate(resolved):
+            start = 0
+            for w in range(workers):
+                end = start + int(np.count_nonzero(masks[owner][w]))
+                targets[w][masks[owner][w]] = nodes[start:end] + bases[owner]
+                start = end
+    except (ExploreError, OSError, pickle.PicklingError) as e:
+        print(f"Unable to precompute the state space: {e}")
+        return None
+    finally:
+        pool.close()
+
+    edge_counts = np.cumsum([0, *(len(part["operators"]) for part in parts)])
+    offsets = np.concatenate(
+        [part["offsets"][:-1] + edge_counts[w] for w, part in enumerate(parts)]
+        + [[edge_counts[-1]]]
+    ).astype(np.int64)
+    edge_targets = np.concatenate(targets)
+    goal = np.concatenate([part["goal"] for part in parts])
+    all_fingerprints = b"".join(part["fingerprints"] for part in parts)
+
+    graph = StateGraph(
+        [state for part in parts for state in part["states"]],
+        FingerprintIndex.build(
+            [all_fingerprints[i : i + 16] for i in range(0, len(all_fingerprints), 16)],
+            np.arange(len(goal), dtype=np.int32),
+        ),
+        offsets,
+        np.concatenate([part["operators"] for part in parts]),
+        edge_targets,
+        pack_applicable(np.concatenate([part["applicable"] for part in parts])),
+        goal,
+        goal_distances(offsets, edge_targets, goal),
+        len(problem.OPERATORS),
+    )
+
+    elapsed = time.perf_counter() - start_time
+    print(
+        f"Precomputed state space of {len(graph)} states and {len(edge_targets)} transitions "
+        f"in {elapsed:.2f}s with {workers} processes ({len(graph) / elapsed:.0f} states/s)"
+    )
+
+    return graph
+
+
+def main():
+    """
+    soluzion_server explore: precomputes a problem's state graph into the cache, so servers started
+    with --precompute-graph load it instead of exploring
+    """
+    from soluzion_server.problem_loading import load_problem
+    from soluzion_server.state_cache import configure_problem_cache, get_problem_cache
+    from soluzion_server.state_graph import explore_state_space
+
+    parser = argparse.ArgumentParser(
+        prog="soluzion_server explore",
+        description="Explore a problem's reachable states and cache the graph",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "problem_path", type=str, help="Path to the Soluzion problem file"
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="number of processes to explore with",
+    )
+    parser.add_argument(
+        "--state-limit",
+        type=int,
+        default=10_000_000,
+        help="number of states to give up after",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=os.path.join(os.path.expanduser("~"), ".cache", "soluzion_server"),
+        help="directory to save the graph in",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="explore without saving the graph"
+    )
+    args = parser.parse_args()
+
+    problem = load_problem(args.problem_path)
+    try:
+        graph = explore_state_space(args.state_limit, args.workers)
+    except StateSpaceTooLarge:
+        print(f"State space has more than {args.state_limit} states")
+        exit(1)
+    if graph is None:
+        exit(1)
+
+    if not args.no_cache:
+        configure_problem_cache(args.cache_dir, problem.__file__)
+        cache = get_problem_cache()
+        if cache is not None:
+            graph.save(cache.file("graph"))
+            print(f"Saved the state graph to {cache.path}")
@@ -0,0 +1,452 @@
+from __future__ import annotations
+
+import itertools
+import multiprocessing
+import pickle
+import queue
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Collection, Optional
+
+from soluzion_server import metrics
+from soluzion_server.problem_loading import module_sources
+from soluzion_server.soluzion_expanded import ExpandedState, Problem
+
+HOST_START_TIMEOUT = 30.0
+"""Seconds a freshly spawned host may take to load its problem"""
+
+
+class ProblemHostError(Exception):
+    """A problem host crashed, hung or couldn't load its problem"""
+
+
+@dataclass
+class StateView:
+    """
+    Everything the server needs to know about a state, worked out in the host that made it so the server
+    never runs problem code for it
+    """
+
+    state: bytes  # Pickled state, sent back to the host for the next move
+    message: str
+    serialized: Optional[str]
+    goal: bool
+    goal_message: Optional[str]
+    operators: dict[frozenset[int], list[tuple[int, str]]]
+    """Numbers and names of the applicable operators, by the role sets of the game's players"""
+
+    applied: Optional[str] = None  # Name of the operator that led to the state
+    transitions: list[str] = field(default_factory=list)
+
+    def load_state(self) -> ExpandedState:
+        return pickle.loads(self.state)
+
+
+# region Host process
+
+
+def _view(
+    problem: Problem,
+    state: ExpandedState,
+    role_sets: Collection[frozenset[int]],
+    applied: Optional[str] = None,
+    transitions: Optional[list[str]] = None,
+) -> tuple:
+    from soluzion_server.engine import serialize_state
+
+    goal = state.is_goal()
+    return (
+        pickle.dumps(state, pickle.HIGHEST_PROTOCOL),
+        f"{state}",
+        serialize_state(state),
+        goal,
+        state.goal_message() if goal else None,
+        {role_set: _operators(problem, state, role_set) for role_set in role_sets},
+        applied,
+        transitions or [],
+    )
+
+
+def _operators(
+    problem: Problem, state: ExpandedState, roles: frozenset[int]
+) -> list[tuple[int, str]]:
+    from soluzion_server.engine import is_operator_applicable
+    from soluzion_server.soluzion_expanded import operator_name
+
+    return [
+        (op_no, operator_name(operator, state))
+        for op_no, operator in enumerate(problem.OPERATORS)
+        if is_operator_applicable(operator, state, roles)
+    ]
+
+
+def _start(
+    problem: Problem,
+    args: Optional[dict[str, Any]],
+    role_sets: Collection[frozenset[int]],
+) -> tuple:
+    from soluzion_server.engine import initial_game_state
+
+    return _view(problem, initial_game_state(problem, args), role_sets)
+
+
+def _apply(
+    problem: Problem,
+    state: bytes,
+    op_no: int,
+    args: Optional[list[Any]],
+    role_sets: Collection[frozenset[int]],
+) -> tuple:
+    from soluzion_server.engine import transition_messages
+    from soluzion_server.soluzion_expanded import operator_name
+
+    old_state = pickle.loads(state)
+    operator = problem.OPERATORS[op_no]
+    if operator.params is None or args is None:
+        new_state = operator.apply(old_state)
+    else:
+        new_state = operator.transf(old_state, args)
+
+    return _view(
+        problem,
+        new_state,
+        role_sets,
+        operator_name(operator, old_state),
+        transition_messages(old_state, new_state, operator, problem),
+    )
+
+
+def _applicable(
+    problem: Problem, state: bytes, roles: frozenset[int]
+) -> list[tuple[int, str]]:
+    return _operators(problem, pickle.loads(state), roles)
+
+
+_REQUESTS: dict[str, Callable[..., Any]] = {
+    "start": _start,
+    "apply": _apply,
+    "operators": _applicable,
+}
+
+
+def _encode(replies: list[tuple[int, bool, Any]]) -> bytes:
+    try:
+        return pickle.dumps(replies, pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        pass
+
+    # Only the replies that can't be pickled fail, not the whole batch
+    encodable = []
+    for request_id, ok, value in replies:
+        try:
+            pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            ok, value = False, RuntimeError(f"Unable to send the result back: {e!r}")
+        encodable.append((request_id, ok, value))
+    return pickle.dumps(encodable, pickle.HIGHEST_PROTOCOL)
+
+
+def _host_main(connection, problem_path: str, module_name: str, source: Optional[str]):
+    """
+    Runs in the host process: loads the problem, then answers batches of requests with one batch of
+    replies each, until the server closes the connection
+    """
+    from soluzion_server.problem_loading import load_problem
+
+    try:
+        problem = load_problem(problem_path, module_name, source)
+    except BaseException as e:
+        connection.send_bytes(_encode([(0, False, repr(e))]))
+        return
+    connection.send_bytes(_encode([(0, True, None)]))
+
+    while True:
+        try:
+            batch = pickle.loads(connection.recv_bytes())
+        except (EOFError, OSError):
+            return
+
+        replies = []
+        for request_id, kind, args in batch:
+            try:
+                replies.append((request_id, True, _REQUESTS[kind](problem, *args)))
+            except Exception as e:
+                replies.append((request_id, False, e))
+        connection.send_bytes(_encode(replies))
+
+
+# endregion
+
+# region Server side
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class ProblemHost:
+    """
+    A subprocess running the code of one problem for the rooms pinned to it, so problem callbacks run on
+    their own core. Requests queued while the host is busy are sent together as one batch
+    """
+
+    _numbers = itertools.count(1)
+
+    def __init__(self, problem: Problem, timeout: float):
+        """
+        :param timeout: seconds a request may take before the host is considered hung
+        """
+        self.name = f"{problem.__name__}-{next(self._numbers)}"
+        self.timeout = timeout
+        self.alive = True
+        self.failure: Optional[str] = None
+        self.ready = threading.Event()
+
+        self._ids = itertools.count(1)
+        self._pending: dict[int, _Call] = {}
+        self._outbox: queue.SimpleQueue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+
+        # Spawned like the solver's workers, forking a server with running threads isn't safe
+        context = multiprocessing.get_context("spawn")
+        self._connection, child = context.Pipe()
+        module_name = problem.__name__
+        self._process = context.Process(
+            target=_host_main,
+            args=(
+                child,
+                problem.__file__,
+                module_name,
+                module_sources.get(module_name),
+            ),
+            name=f"problem-host-{self.name}",
+            daemon=True,
+        )
+        self._process.start()
+        child.close()
+
+        threading.Thread(
+            target=self._send, name=f"host-send-{self.name}", daemon=True
+        ).start()
+        threading.Thread(
+            target=self._receive, name=f"host-receive-{self.name}", daemon=True
+        ).start()
+
+    def call(self, kind: str, *args) -> Any:
+        """
+        Runs a request in the host and waits for its result
+        :raises ProblemHostError: if the host failed, before or while handling it
+        :raises Exception: whatever the problem code raised
+        """
+        if not self.ready.wait(HOST_START_TIMEOUT):
+            self.fail(f"didn't load its problem within {HOST_START_TIMEOUT:.0f}s")
+
+        call = _Call()
+        with self._lock:
+            if not self.alive:
+                raise ProblemHostError(self.failure)
+            request_id = next(self._ids)
+            self._pending[request_id] = call
+        self._outbox.put((request_id, kind, args))
+
+        if not call.done.wait(self.timeout):
+            self.fail(f"didn't answer {kind} within {self.timeout}s")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def _send(self):
+        while True:
+            batch = [self._outbox.get()]
+            while True:
+                try:
+                    batch.append(self._outbox.get_nowait())
+                except queue.Empty:
+                    break
+
+            if None in batch:
+                return
+            try:
+                self._connection.send_bytes(
+                    pickle.dumps(batch, pickle.HIGHEST_PROTOCOL)
+                )
+            except Exception as e:
+                self.fail(f"couldn't be sent a request: {e!r}")
+                return
+            metrics.increment("problem_host_batches")
+
+    def _receive(self):
+        try:
+            while True:
+                replies = pickle.loads(self._connection.recv_bytes())
+                for request_id, ok, value in replies:
+                    if request_id == 0:
+                        if not ok:
+                            self.fail(f"couldn't load its problem: {value}")
+                            return
+                        self.ready.set()
+                        continue
+
+                    with self._lock:
+                        call = self._pending.pop(request_id, None)
+                    if call is None:
+                        continue
+                    if ok:
+                        call.result = value
+                    else:
+                        call.error = value
+                    call.done.set()
+        except Exception as e:
+            self._process.join(0.1)
+            exit_code = self._process.exitcode
+            self.fail(
+                f"crashed with exit code {exit_code}"
+                if exit_code is not None
+                else f"stopped answering: {e!r}"
+            )
+
+    def fail(self, reason: str):
+        """
+        Kills the host and fails every request waiting on it, then tells the failure handler so the
+        rooms pinned to it can be ended
+        """
+        with self._lock:
+            if not self.alive:
+                return
+            self.alive = False
+            self.failure = f"Problem host {self.name} {reason}"
+            pending, self._pending = self._pending, {}
+
+        print(self.failure)
+        metrics.increment("problem_host_failures")
+        self._stop()
+
+        error = ProblemHostError(self.failure)
+        for call in pending.values():
+            call.error = error
+            call.done.set()
+
+        if _failure_handler is not None:
+            threading.Thread(
+                target=_failure_handler, args=(self, self.failure), daemon=True
+            ).start()
+
+    def close(self):
+        """
+        Stops a host that's no longer needed
+        """
+        with self._lock:
+            if not self.alive:
+                return
+            self.alive = False
+            self.failure = f"Problem host {self.name} was closed"
+        self._stop()
+
+    def _stop(self):
+        self.ready.set()
+        self._outbox.put(None)
+        if self._process.is_alive():
+            self._process.kill()
+        self._connection.close()
+
+
+class ProblemHostPool:
+    """
+    The hosts running one problem. Each new game is pinned to the next host in turn, and a host that
+    failed is replaced by a fresh one when its turn comes
+    """
+
+    def __init__(self, problem: Problem, count: int, timeout: float):
+        self.problem = problem
+        self.timeout = timeout
+        self.hosts: list[Optional[ProblemHost]] = [None] * count
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """
+        Spawns every host now, instead of when a game is first pinned to it
+        """
+        with self._lock:
+            for slot, host in enumerate(self.hosts):
+                if host is None:
+                    self.hosts[slot] = ProblemHost(self.problem, self.timeout)
+
+    def assign(self) -> ProblemHost:
+        """
+        Picks the host to pin a new game to
+        """
+        with self._lock:
+            slot = next(self._turn) % len(self.hosts)
+            host = self.hosts[slot]
+            if host is None or not host.alive:
+                host = self.hosts[slot] = ProblemHost(self.problem, self.timeout)
+            return host
+
+    def close(self):
+        with self._lock:
+            for host in self.hosts:
+                if host is not None:
+                    host.close()
+            self.hosts = [None] * len(self.hosts)
+
+
+_host_count = 0
+_host_timeout = 5.0
+_pools: dict[int, ProblemHostPool] = {}
+"""Host pools by id of the problem module"""
+_pools_lock = threading.Lock()
+
+_failure_handler: Optional[Callable[[ProblemHost, str], None]] = None
+
+
+def configure_problem_hosts(count: int, timeout: float):
+    """
+    Runs the code of every problem in its own pool of subprocess hosts, instead of in the server
+    :param count: number of hosts per problem, or 0 to run problem code in the server
+    :param timeout: seconds a request may take before its host is considered hung
+    """
+    global _host_count, _host_timeout
+    _host_count = count
+    _host_timeout = timeout
+
+
+def configure_host_failures(handler: Callable[[ProblemHost, str], None]):
+    """
+    Sets what is done about the games pinned to a host that failed, called with the host and the reason
+    """
+    global _failure_handler
+    _failure_handler = handler
+
+
+def get_host_pool(problem: Problem) -> Optional[ProblemHostPool]:
+    """
+    :return: the hosts of a problem, None if problem code runs in the server
+    """
+    if _host_count <= 0:
+        return None
+    with _pools_lock:
+        pool = _pools.get(id(problem))
+        if pool is None:
+            pool = _pools[id(problem)] = ProblemHostPool(
+                problem, _host_count, _host_timeout
+            )
+        return pool
+
+
+def release_host_pool(problem: Problem):
+    """
+    Stops the hosts of a problem that is no longer played
+    """
+    with _pools_lock:
+        pool = _pools.pop(id(problem), None)
+    if pool is not None:
+        pool.close()
+
+
+# endregion
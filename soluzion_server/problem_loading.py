@@ -4,10 +4,24 @@ from importlib.util import spec_from_file_location, module_from_spec
 
 import soluzion_server.globals as server_globals
 
+module_sources: dict[str, str] = {}
+"""Source each loaded module was run from by module name, which outlives later edits to its file"""
 
-def load_problem(problem_path: str):
+
+def problem_module_name(path: str, version: int = 1) -> str:
+    """
+    Gets the name a version of a problem file's module is registered under in sys.modules, prefixed so a
+    problem named like another module, such as random.py, doesn't replace it for the whole server
+    """
+    name = os.path.splitext(os.path.basename(path))[0]
+    return f"soluzion_problem_{name}_{version}"
+
+
+def load_problem(problem_path: str, module_name: str = None, source: str = None):
     """
     Loads the Soluzion problem passed in the cli args
+    :param module_name: name to register the module under, the first version's problem_module_name if None
+    :param source: code to run in place of the file's current contents
     :return: the Soluzion problem module
     """
     if not problem_path.endswith(".py"):
@@ -24,24 +38,27 @@ def load_problem(problem_path: str):
     if dir_name not in sys.path:
         sys.path.insert(0, dir_name)
 
-    problem = server_globals.PROBLEM = load_module(problem_path)
+    problem = server_globals.PROBLEM = load_module(problem_path, module_name, source)
 
     print(f"Successfully loaded Soluzion Problem {problem_path}")
 
     return problem
 
 
-def load_module(path: str):
+def load_module(path: str, module_name: str = None, source: str = None):
     """
     Loads a python module from a file, adjusting the working directory as needed
     :param path: path to python file
+    :param module_name: name to register the module under, the first version's problem_module_name if None
+    :param source: code to run in place of the file's current contents
     :return: the loaded module
     """
 
     original_cwd = os.getcwd()
     full_path = os.path.abspath(path)
 
-    module_name = os.path.splitext(os.path.basename(full_path))[0]
+    if module_name is None:
+        module_name = problem_module_name(full_path)
 
     try:
         # Change working dir name in case they do any relative file imports
@@ -51,8 +68,20 @@ def load_module(path: str):
 
         module = module_from_spec(spec)
 
-        spec.loader.exec_module(module)
+        if source is None:
+            with open(full_path, encoding="utf-8") as file:
+                source = file.read()
+
+        # Registered so states can be pickled to and from worker processes
+        sys.modules[module_name] = module
+
+        try:
+            exec(compile(source, full_path, "exec"), module.__dict__)
+        except BaseException:
+            del sys.modules[module_name]
+            raise
 
+        module_sources[module_name] = source
         return module
 
     finally:
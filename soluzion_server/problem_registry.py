@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from typing import Optional
+
+import soluzion_server.globals as server_globals
+from soluzion_server.globals import room_sessions
+from soluzion_server.metadata import forget_metadata
+from soluzion_server.problem_hosts import release_host_pool
+from soluzion_server.problem_loading import (
+    load_module,
+    module_sources,
+    problem_module_name,
+)
+from soluzion_server.soluzion_expanded import Problem
+from soluzion_server.solver import release_solver
+from soluzion_server.warmup import warm_up
+
+
+class ProblemRegistry:
+    """
+    Every problem the server hosts by name, the name of its file. Problems other than the default one are
+    only loaded once a room first plays them. When a problem's file changes, new games get a new version
+    of it while running games keep the version they started with
+    """
+
+    def __init__(self):
+        self.paths: dict[str, str] = {}
+        self.modules: dict[str, Problem] = {}
+        """Latest version of each loaded problem"""
+
+        self.default: Optional[str] = None
+        self.superseded: list[tuple[Problem, float]] = []
+        """Older versions that running games may still be playing, with when they were replaced"""
+
+        self._names: dict[int, str] = {}
+        self._versions: dict[str, int] = {}
+        self._loaded_mtimes: dict[str, Optional[float]] = {}
+        self._lock = threading.Lock()
+
+    def _loaded(self, name: str, problem: Problem, mtime: Optional[float]):
+        self.modules[name] = problem
+        self._names[id(problem)] = name
+        self._loaded_mtimes[name] = mtime
+        self._versions.setdefault(name, 1)
+
+    def add(self, path: str, module: Optional[Problem] = None) -> str:
+        """
+        Hosts the problem in a file, as the default one if it's the first
+        :param module: the problem if it's already loaded
+        :return: the problem's name
+        """
+        path = os.path.abspath(path)
+        name = os.path.splitext(os.path.basename(path))[0]
+
+        with self._lock:
+            if name in self.paths and self.paths[name] != path:
+                raise ValueError(
+                    f"Problems {self.paths[name]} and {path} have the same name"
+                )
+            self.paths[name] = path
+            if module is not None:
+                self._loaded(name, module, _mtime(path))
+            if self.default is None:
+                self.default = name
+        return name
+
+    def add_directory(self, directory: str) -> list[str]:
+        """
+        Hosts every problem file in a directory. Files that never mention OPERATORS are taken to be helper
+        modules rather than problems
+        :return: the names of the problems
+        """
+        names = []
+        for file_name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, file_name)
+            if not file_name.endswith(".py") or file_name.startswith("_"):
+                continue
+            with open(path, encoding="utf-8", errors="replace") as file:
+                if "OPERATORS" not in file.read():
+                    continue
+            names.append(self.add(path))
+        return names
+
+    def names(self) -> list[str]:
+        return sorted(self.paths)
+
+    def get(self, name: Optional[str] = None) -> Problem:
+        """
+        Gets a problem, loading it if no room has played it yet
+        :param name: the default problem if None
+        :raises KeyError: if no problem has the name
+        :raises Exception: whatever loading or warming up the problem raised
+        """
+        with self._lock:
+            name = self.default if name is None else name
+            problem = self.modules.get(name)
+            if problem is not None:
+                return problem
+
+            path = self.paths[name]
+            if os.path.dirname(path) not in sys.path:
+                sys.path.insert(0, os.path.dirname(path))
+            mtime = _mtime(path)
+            problem = _load_problem_module(path, None)
+            try:
+                warm_up(problem, self.names())
+            except Exception:
+                sys.modules.pop(problem.__name__, None)
+                raise
+
+            print(f"Successfully loaded Soluzion Problem {path}")
+            self._loaded(name, problem, mtime)
+            return problem
+
+    def name_of(self, problem: Problem) -> Optional[str]:
+        return self._names.get(id(problem))
+
+    def reload_changed(self) -> list[str]:
+        """
+        Loads a new version of each loaded problem whose file changed, alongside the current one. A version
+        that fails to load or warm up leaves the current one in place until the file changes again
+        :return: names of the problems with a new version
+        """
+        with self._lock:
+            changed = [
+                (name, self.paths[name], mtime)
+                for name in self.modules
+                if (mtime := _mtime(self.paths[name])) != self._loaded_mtimes[name]
+            ]
+
+        reloaded = []
+        for name, path, mtime in changed:
+            version = self._versions[name] + 1
+            try:
+                # Its own module name, so states of both versions can be pickled to the solver
+                problem = _load_problem_module(path, problem_module_name(path, version))
+                try:
+                    warm_up(problem, self.names())
+                except Exception:
+                    sys.modules.pop(problem.__name__, None)
+                    module_sources.pop(problem.__name__, None)
+                    raise
+            except BaseException as e:
+                print(f"Keeping the running version of {name}, the new one failed: {e}")
+                with self._lock:
+                    self._loaded_mtimes[name] = mtime
+                continue
+
+            with self._lock:
+                self.superseded.append((self.modules[name], time.monotonic()))
+                self._loaded(name, problem, mtime)
+                self._versions[name] = version
+                if name == self.default:
+                    server_globals.PROBLEM = problem
+            print(f"Reloaded Soluzion Problem {path} as version {version}")
+            reloaded.append(name)
+        return reloaded
+
+    def unload_unused(self, in_use: set[int], grace: float) -> list[Problem]:
+        """
+        Forgets the older versions no running game plays anymore
+        :param in_use: ids of the problem modules running games play
+        :param grace: seconds a version is kept after it's replaced, for games just starting with it
+        :return: the versions unloaded
+        """
+        now = time.monotonic()
+        with self._lock:
+            unused = [
+                problem
+                for problem, replaced in self.superseded
+                if id(problem) not in in_use and now - replaced > grace
+            ]
+            self.superseded = [
+                entry for entry in self.superseded if entry[0] not in unused
+            ]
+            for problem in unused:
+                del self._names[id(problem)]
+                if sys.modules.get(problem.__name__) is problem:
+                    del sys.modules[problem.__name__]
+                module_sources.pop(problem.__name__, None)
+                forget_metadata(problem)
+        return unused
+
+
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def _load_problem_module(path: str, module_name: Optional[str]) -> Problem:
+    problem = load_module(path, module_name)
+    if not hasattr(problem, "OPERATORS"):
+        sys.modules.pop(problem.__name__, None)
+        raise ValueError(f"{path} isn't a Soluzion problem")
+    return problem
+
+
+_registry = ProblemRegistry()
+
+
+def get_problem_registry() -> ProblemRegistry:
+    return _registry
+
+
+def register_problems(default: Problem, paths: list[str]):
+    """
+    Hosts the loaded default problem, then the problem files and directories of problem files given
+    """
+    _registry.add(default.__file__, default)
+    for path in paths:
+        if os.path.isdir(path):
+            _registry.add_directory(path)
+        else:
+            _registry.add(path if path.endswith(".py") else path + ".py")
+
+
+def watch_problems(interval: float):
+    """
+    Checks the files of the loaded problems for changes every interval seconds, reloading them, and
+    unloads older versions once their last game has ended
+    """
+
+    def watch():
+        while True:
+            time.sleep(interval)
+            _registry.reload_changed()
+
+            in_use = {
+                id(room.game.problem)
+                for room in list(room_sessions.values())
+                if room.game is not None
+            }
+            for problem in _registry.unload_unused(in_use, interval):
+                release_solver(problem)
+                release_host_pool(problem)
+                print(f"Unloaded {problem.__name__}, its last game has ended")
+
+    threading.Thread(target=watch, name="problem-watcher", daemon=True).start()
@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import argparse
+import contextlib
+import os
+import random
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from soluzion_server.soluzion_expanded import Problem
+
+ROOT = "playout"
+"""Frame the time spent outside of problem code is put under"""
+
+
+@dataclass
+class CallbackStats:
+    calls: int = 0
+    seconds: float = 0.0  # Including the other callbacks it called
+
+
+class _Frame:
+    __slots__ = ("name", "start", "children", "code", "frame", "traced")
+
+    def __init__(self, name: str, start: float, code: Any = None, frame: Any = None):
+        self.name = name
+        self.start = start
+        self.children = 0.0
+        self.code = (
+            code  # Code of the wrapped callback, so the tracer doesn't record it twice
+        )
+        self.frame = frame  # Python frame running it, for functions of the problem file
+        self.traced = frame is not None
+
+
+class CallbackProfile:
+    """
+    Times the callbacks a problem's author wrote, keeping the time of each stack of nested callbacks for
+    a flame graph
+    """
+
+    def __init__(self, problem_file: Optional[str] = None):
+        """
+        :param problem_file: also record every function of this file the callbacks call, in the flame graph
+        """
+        self.stats: dict[str, CallbackStats] = {}
+        self.folded: Counter[str] = Counter()
+        """Seconds spent in each stack of frames itself, by the frames joined with ;"""
+
+        self.problem_file = problem_file
+        self._stack: list[_Frame] = []
+
+    def wrap(self, name: str, callback: Callable) -> Callable:
+        """
+        Makes a callback count its calls and time into the profile
+        """
+        name = name.replace(";", ",")
+        stats = self.stats.setdefault(name, CallbackStats())
+        code = getattr(getattr(callback, "__func__", callback), "__code__", None)
+
+        def timed(*args, **kwargs):
+            self._enter(name, code)
+            try:
+                return callback(*args, **kwargs)
+            finally:
+                stats.calls += 1
+                stats.seconds += self._exit()
+
+        return timed
+
+    def _enter(self, name: str, code: Any = None, frame: Any = None):
+        self._stack.append(_Frame(name, time.perf_counter(), code, frame))
+
+    def _exit(self) -> float:
+        entry = self._stack.pop()
+        seconds = time.perf_counter() - entry.start
+        if self._stack:
+            self._stack[-1].children += seconds
+        path = ";".join([ROOT, *(frame.name for frame in self._stack), entry.name])
+        self.folded[path] += seconds - entry.children
+        return seconds
+
+    def _trace(self, frame, event: str, arg):
+        # Only functions of the problem's own file, called while a callback runs
+        if not self._stack:
+            return
+        top = self._stack[-1]
+        code = frame.f_code
+        if event == "call" and code.co_filename == self.problem_file:
+            if top.code is code and top.frame is None:
+                top.frame = frame  # The callback itself, already timed by its wrapper
+                return
+            # co_qualname is only there from Python 3.11
+            name = getattr(code, "co_qualname", code.co_name)
+            self._enter(name.replace(";", ","), frame=frame)
+        elif event == "return" and top.traced and top.frame is frame:
+            self._exit()
+
+    def run(self, playouts: Callable[[], None]) -> float:
+        """
+        :return: seconds the playouts took in all
+        """
+        if self.problem_file is not None:
+            sys.setprofile(self._trace)
+        start = time.perf_counter()
+        try:
+            playouts()
+        finally:
+            sys.setprofile(None)
+        total = time.perf_counter() - start
+
+        self.folded[ROOT] += total - sum(self.folded.values())
+        return total
+
+    def table(self, total: float, limit: int = 30) -> str:
+        """
+        :param total: seconds the playouts took, to show each callback's share of
+        :param limit: number of the slowest callbacks to list
+        """
+        width = max([len("callback"), *map(len, self.stats)])
+        lines = [
+            f"{'callback':<{width}}  {'calls':>9}  {'total ms':>10}  {'per call us':>11}  {'share':>6}"
+        ]
+        called = [(name, stats) for name, stats in self.stats.items() if stats.calls]
+        for name, stats in sorted(called, key=lambda item: -item[1].seconds)[:limit]:
+            lines.append(
+                f"{name:<{width}}  {stats.calls:>9}  {stats.seconds * 1000:>10.1f}  "
+                f"{stats.seconds / stats.calls * 1e6:>11.2f}  {stats.seconds / total:>6.1%}"
+            )
+        return "\n".join(lines)
+
+    def write_folded(self, path: str):
+        """
+        Writes the stacks in the folded format flamegraph.pl and speedscope read, in microseconds
+        """
+        with open(path, "w") as file:
+            for stack, seconds in sorted(self.folded.items()):
+                if seconds > 0:
+                    file.write(f"{stack} {round(seconds * 1e6)}\n")
+
+
+def instrument(problem: Problem, state_class: type, profile: CallbackProfile):
+    """
+    Replaces the problem's callbacks with timed ones: each operator's precondition, transformation and
+    name, the state's is_goal, __str__, serialize and goal_message, and the transitions
+    """
+    for op_no, operator in enumerate(problem.OPERATORS):
+        label = f"{op_no} {operator.name}"
+        operator.is_applicable = profile.wrap(
+            f"{label}: precondition", operator.is_applicable
+        )
+        operator.apply = profile.wrap(f"{label}: transformation", operator.apply)
+        if callable(getattr(operator, "get_name", None)):
+            operator.get_name = profile.wrap(f"{label}: get_name", operator.get_name)
+
+    for method in ["is_goal", "__str__", "serialize", "goal_message"]:
+        if callable(getattr(state_class, method, None)):
+            setattr(
+                state_class,
+                method,
+                profile.wrap(f"State.{method}", getattr(state_class, method)),
+            )
+
+    if getattr(problem, "TRANSITIONS", None):
+        problem.TRANSITIONS = [
+            (
+                profile.wrap(f"transition {i}: condition", condition),
+                (
+                    profile.wrap(f"transition {i}: message", action)
+                    if callable(action)
+                    else action
+                ),
+            )
+            for i, (condition, action) in enumerate(problem.TRANSITIONS)
+        ]
+
+
+def playout(problem: Problem, rng: random.Random, max_steps: int) -> int:
+    """
+    Plays random moves until a goal, doing for every move what the server does: listing each role's
+    operators with their names, describing and serializing the state, and checking transitions
+    :return: number of moves made
+    """
+    from soluzion_server.engine import (
+        initial_game_state,
+        is_operator_applicable,
+        serialize_state,
+        transition_messages,
+    )
+    from soluzion_server.soluzion_expanded import operator_name
+
+    role_count = len(getattr(problem, "ROLES", None) or [])
+    role_sets = [{role} for role in range(role_count)] or [set()]
+    state = initial_game_state(problem, None)
+    turn = 0
+
+    for step in range(max_steps):
+        f"{state}"
+        serialize_state(state)
+        if state.is_goal():
+            state.goal_message()
+            return step
+
+        available = [
+            [
+                op_no
+                for op_no, operator in enumerate(problem.OPERATORS)
+                if is_operator_applicable(operator, state, roles)
+            ]
+            for roles in role_sets
+        ]
+        for op_nos in available:
+            for op_no in op_nos:
+                operator_name(problem.OPERATORS[op_no], state)
+
+        # Players take turns, but one that can't move is skipped
+        for offset in range(len(role_sets)):
+            choices = [
+                op_no
+                for op_no in available[(turn + offset) % len(role_sets)]
+                if not problem.OPERATORS[op_no].params
+            ]
+            if choices:
+                turn = (turn + offset + 1) % len(role_sets)
+                break
+        else:
+            return step
+
+        operator = problem.OPERATORS[rng.choice(choices)]
+        new_state = operator.apply(state)
+        transition_messages(state, new_state, operator, problem)
+        state = new_state
+
+    return max_steps
+
+
+def main():
+    """
+    soluzion_server profile: plays random games of a problem, timing each callback its author wrote, and
+    prints a table of them and writes a flame graph of their stacks
+    """
+    from soluzion_server.engine import initial_game_state
+    from soluzion_server.problem_loading import load_problem
+
+    parser = argparse.ArgumentParser(
+        prog="soluzion_server profile",
+        description="Find the slow parts of a problem's code",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "problem_path", type=str, help="Path to the Soluzion problem file"
+    )
+    parser.add_argument(
+        "-n", "--playouts", type=int, default=100, help="number of games to play"
+    )
+    parser.add_argument(
+        "--max-steps", type=int, default=1000, help="moves to stop a game after"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument(
+        "-o",
+        "--folded",
+        type=str,
+        default=None,
+        help="file to write the folded stacks for a flame graph to, PROBLEM.folded if not given",
+    )
+    parser.add_argument(
+        "--top", type=int, default=30, help="number of the slowest callbacks to list"
+    )
+    parser.add_argument(
+        "--frames",
+        action="store_true",
+        help="also put the problem file's own functions called by the callbacks in the flame graph, "
+        "which slows them down",
+    )
+    args = parser.parse_args()
+
+    problem = load_problem(args.problem_path)
+    profile = CallbackProfile(problem.__file__ if args.frames else None)
+    instrument(problem, type(initial_game_state(problem, None)), profile)
+
+    rng = random.Random(args.seed)
+    moves = 0
+
+    def playouts():
+        nonlocal moves
+        # What the problem prints would bury the table
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            for _ in range(args.playouts):
+                moves += playout(problem, rng, args.max_steps)
+
+    total = profile.run(playouts)
+
+    print(
+        f"{args.playouts} playouts of {moves} moves in {total:.2f}s "
+        f"({moves / total if total else 0:.0f} moves/s)"
+    )
+    print(profile.table(total, args.top))
+
+    name = os.path.splitext(os.path.basename(args.problem_path))[0]
+    folded = args.folded or f"{name}.folded"
+    profile.write_folded(folded)
+    print(
+        f"Wrote the callback stacks to {folded}, for flamegraph.pl or speedscope",
+        file=sys.stderr,
+    )
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from flask import request
+
+from soluzion_server import metrics
+from soluzion_server.globals import error_response
+from soluzion_server.soluzion_types import ClientToServer, ServerError
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    rate: float  # Events allowed per second
+    burst: float  # Events allowed at once, after being idle
+
+
+DEFAULT_RATE_LIMITS: dict[ClientToServer, RateLimit] = {
+    ClientToServer.LIST_ROOMS: RateLimit(5, 10),
+    ClientToServer.SET_ROLES: RateLimit(5, 10),
+    ClientToServer.OPERATOR_CHOSEN: RateLimit(20, 40),
+    ClientToServer.HINT: RateLimit(1, 3),
+    ClientToServer.SOLVE: RateLimit(1, 3),
+    ClientToServer.BEST_MOVE: RateLimit(1, 3),
+}
+
+
+class TokenBucket:
+    """
+    Allows events at a steady rate, with bursts of up to its capacity after some quiet
+    """
+
+    def __init__(self, limit: RateLimit, now: float):
+        self.limit = limit
+        self.tokens = limit.burst
+        self.updated = now
+
+    def refill(self, now: float) -> bool:
+        """
+        :return: whether an event can be allowed
+        """
+        elapsed = now - self.updated
+        self.tokens = min(self.limit.burst, self.tokens + elapsed * self.limit.rate)
+        self.updated = now
+        return self.tokens >= 1
+
+
+_limits: dict[ClientToServer, RateLimit] = dict(DEFAULT_RATE_LIMITS)
+_global_bucket: Optional[TokenBucket] = None
+_buckets: dict[str, dict[ClientToServer, TokenBucket]] = {}
+"""Each client's buckets, by sid and then event"""
+_lock = threading.Lock()
+
+
+def configure_rate_limits(
+    limits: dict[ClientToServer, RateLimit], global_rate: Optional[float]
+):
+    """
+    Sets the rate each client may send the limited events at, and the rate all clients together may send
+    them at
+    :param limits: limits replacing the defaults, by event, where a rate of 0 lifts the limit
+    :param global_rate: events per second for the whole server, or None for no global budget
+    """
+    global _global_bucket
+    for event, limit in limits.items():
+        if limit.rate > 0:
+            _limits[event] = limit
+        else:
+            _limits.pop(event, None)
+    _global_bucket = (
+        TokenBucket(RateLimit(global_rate, global_rate), time.monotonic())
+        if global_rate
+        else None
+    )
+
+
+def parse_rate_limit(text: str) -> tuple[ClientToServer, RateLimit]:
+    """
+    Reads a limit given as EVENT=RATE or EVENT=RATE/BURST, like list_rooms=5/10
+    """
+    event, _, limit = text.partition("=")
+    rate, _, burst = limit.partition("/")
+    try:
+        rate = float(rate)
+        return ClientToServer(event), RateLimit(rate, float(burst) if burst else rate)
+    except ValueError:
+        raise ValueError(f"Expected EVENT=RATE[/BURST], got {text!r}")
+
+
+def allow(sid: str, event: ClientToServer) -> bool:
+    """
+    Takes a token for the event from the client's bucket and the global one, if both have one
+    """
+    limit = _limits.get(event)
+    if limit is None:
+        return True
+
+    now = time.monotonic()
+    with _lock:
+        buckets = _buckets.setdefault(sid, {})
+        bucket = buckets.get(event)
+        if bucket is None:
+            bucket = buckets[event] = TokenBucket(limit, now)
+
+        if not bucket.refill(now):
+            metrics.increment("rate_limited_client", event.value)
+            return False
+        if _global_bucket is not None and not _global_bucket.refill(now):
+            metrics.increment("rate_limited_global", event.value)
+            return False
+
+        bucket.tokens -= 1
+        if _global_bucket is not None:
+            _global_bucket.tokens -= 1
+        return True
+
+
+def forget_client(sid: str):
+    """
+    Drops the buckets of a client that disconnected
+    """
+    with _lock:
+        _buckets.pop(sid, None)
+
+
+def rate_limited(event: ClientToServer) -> Callable:
+    """
+    Makes a handler reply with a RateLimited error instead of running, when its sender is over the limit
+    for the event
+    """
+
+    def decorator(handler: Callable) -> Callable:
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            if not allow(request.sid, event):
+                return error_response(
+                    ServerError.RATE_LIMITED, f"Too many {event.value} events"
+                )
+            return handler(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -1,42 +1,71 @@
-from importlib.metadata import version
-
 from flask import request
-from flask_socketio import emit, SocketIO, join_room, leave_room
+from flask_socketio import emit, SocketIO, join_room, leave_room, close_room
 
+from soluzion_server.bots import is_bot, new_bot_sid
+from soluzion_server.engine import serialize_state, spectator_channel
 from soluzion_server.globals import *
 from soluzion_server.globals import RoomSession, PlayerSession
+from soluzion_server.metadata import ProblemMetadata
+from soluzion_server.problem_registry import get_problem_registry
+from soluzion_server.rate_limiting import forget_client, rate_limited
+from soluzion_server.scheduling import Priority, scheduled
 from soluzion_server.soluzion_types import *
+from soluzion_server.type_codecs import decode, encode
+from soluzion_server.warmup import warmed_up
+
+
+def remove_spectators(room: RoomSession):
+    """
+    Stops everyone watching a room that is being deleted
+    """
+    for sid in room.spectator_sids:
+        player = connected_players.get(sid)
+        if player is not None:
+            player.spectating = None
+    room.spectator_sids.clear()
+    close_room(spectator_channel(room.id))
 
 
 def on_room_changed(room: RoomSession):
+    # Bots can't play on their own, so they leave with the last person
+    if all(is_bot(sid) for sid in room.player_sids):
+        for sid in room.player_sids:
+            del connected_players[sid]
+        room.player_sids.clear()
+
     if len(room.player_sids) == 0:
         if room.game is not None:
             print(f"Everyone has left the game in room {room.id}, deleting")
             room.game = None
             del room_sessions[room.id]
+            remove_spectators(room)
             emit(
                 ServerToClient.ROOM_DELETED.value,
-                RoomDeleted(room.id).to_dict(),
+                encode(RoomDeleted(room.id)),
                 broadcast=True,
             )
     elif room.owner_sid not in room.player_sids:
-        room.owner_sid = room.player_sids[0]
+        room.owner_sid = next(sid for sid in room.player_sids if not is_bot(sid))
 
     emit(ServerToClient.ROOM_CHANGED.value, room.to_dict(), broadcast=True)
 
 
+def sender_metadata(sid: str) -> ProblemMetadata:
+    """
+    Gets the metadata of the problem played in the sender's room, or of the default problem if they
+    aren't in one
+    """
+    room = current_room(sid)
+    registry = get_problem_registry()
+    problem = registry.get(None if room is None else room.problem)
+    return warmed_up(problem, registry.names)
+
+
 def configure_room_handlers(socketio: SocketIO):
     @socketio.on(ClientToServer.INFO.value)
+    @scheduled(Priority.LOBBY)
     def info(data):
-        return Info(
-            getattr(PROBLEM, "PROBLEM_AUTHORS", []),
-            getattr(PROBLEM, "PROBLEM_CREATION_DATE", ""),
-            getattr(PROBLEM, "PROBLEM_DESC", ""),
-            getattr(PROBLEM, "PROBLEM_NAME", ""),
-            getattr(PROBLEM, "PROBLEM_VERSION", ""),
-            version("soluzion_server"),
-            getattr(PROBLEM, "SOLUZION_VERSION", ""),
-        ).to_dict()
+        return sender_metadata(request.sid).info
 
     @socketio.on(SharedEvent.CONNECT.value)
     def handle_connect():
@@ -48,7 +77,7 @@ def configure_room_handlers(socketio: SocketIO):
 
         emit(
             ServerToClient.YOUR_SID.value,
-            YourSid(request.sid).to_dict(),
+            encode(YourSid(request.sid)),
             to=request.sid,
         )
 
@@ -63,25 +92,47 @@ def configure_room_handlers(socketio: SocketIO):
         on_leave_room({})
 
         del connected_players[request.sid]
+        forget_client(request.sid)
 
     @socketio.on(ClientToServer.CREATE_ROOM.value)
+    @scheduled(Priority.ROOM)
     def on_create_room(data):
-        event = CreateRoom.from_dict(data)
+        event = decode(CreateRoom, data)
 
         if event.room in room_sessions:
             return error_response(ServerError.ROOM_ALREADY_EXISTS)
 
-        room_sessions[event.room] = RoomSession(event.room, request.sid, [], None)
+        # Loaded now so a broken problem fails here rather than when the game starts
+        registry = get_problem_registry()
+        try:
+            registry.get(event.problem)
+        except KeyError:
+            return error_response(
+                ServerError.UNKNOWN_PROBLEM, f"No problem named {event.problem}"
+            )
+        except Exception as e:
+            return error_response(
+                ServerError.UNKNOWN_PROBLEM, f"Unable to load {event.problem}: {e}"
+            )
+
+        room_sessions[event.room] = RoomSession(
+            event.room,
+            request.sid,
+            [],
+            None,
+            problem=event.problem or registry.default,
+        )
 
         emit(
             ServerToClient.ROOM_CREATED.value,
-            RoomCreated(request.sid, event.room).to_dict(),
+            encode(RoomCreated(request.sid, event.room)),
             broadcast=True,
         )
 
     @socketio.on(ClientToServer.DELETE_ROOM.value)
+    @scheduled(Priority.ROOM)
     def on_create_room(data):
-        event = DeleteRoom.from_dict(data)
+        event = decode(DeleteRoom, data)
 
         if event.room not in room_sessions:
             return error_response(ServerError.CANT_DELETE_ROOM, "Room does not exist")
@@ -95,30 +146,38 @@ def configure_room_handlers(socketio: SocketIO):
         #     return error_response(ServerError.CANT_DELETE_ROOM, "You are not the owner")
 
         del room_sessions[event.room]
+        remove_spectators(room)
 
         emit(
             ServerToClient.ROOM_DELETED.value,
-            RoomDeleted(event.room).to_dict(),
+            encode(RoomDeleted(event.room)),
             broadcast=True,
         )
 
     @socketio.on(ClientToServer.JOIN_ROOM.value)
+    @scheduled(Priority.ROOM)
     def on_join_room(data):
         print("Join room is ", data)
-        event = JoinRoom.from_dict(data)
+        event = decode(JoinRoom, data)
 
         if event.room not in room_sessions:
             return error_response(ServerError.CANT_JOIN_ROOM, "Room Does Not Exist")
 
         player: PlayerSession = current_player(request.sid)
 
-        if player.room is not None:
+        if player.room is not None or player.spectating is not None:
             return error_response(ServerError.CANT_JOIN_ROOM, "Already in another Room")
 
         room: RoomSession = room_sessions[event.room]
 
         player.room = room.id
         player.name = event.username
+        player.representations = set(
+            StateRepresentation
+            if event.representations is None
+            else event.representations
+        )
+        player.step_events = bool(event.step_events)
 
         join_room(room.id)
         room.player_sids.append(request.sid)
@@ -128,33 +187,127 @@ def configure_room_handlers(socketio: SocketIO):
 
         emit(
             ServerToClient.ROOM_JOINED.value,
-            RoomJoined(event.username).to_dict(),
+            encode(RoomJoined(event.username)),
             to=room.id,
         )
         on_room_changed(room)
 
+    @socketio.on(ClientToServer.SPECTATE.value)
+    @scheduled(Priority.ROOM)
+    def on_spectate(data):
+        event = decode(Spectate, data)
+
+        if event.room not in room_sessions:
+            return error_response(ServerError.CANT_JOIN_ROOM, "Room Does Not Exist")
+
+        player: PlayerSession = current_player(request.sid)
+
+        if player.room is not None or player.spectating is not None:
+            return error_response(ServerError.CANT_JOIN_ROOM, "Already in another Room")
+
+        room: RoomSession = room_sessions[event.room]
+
+        # Spectators aren't players, so they have no roles and are never offered operators
+        player.spectating = room.id
+        join_room(spectator_channel(room.id))
+        room.spectator_sids.append(request.sid)
+
+        # Catch up on a game that's already going
+        if room.game is not None:
+            state, view = room.game.current_state, room.game.view
+            emit(
+                ServerToClient.GAME_STARTED.value,
+                encode(
+                    GameStarted(view.message, view.serialized)
+                    if view is not None
+                    else GameStarted(f"{state}", serialize_state(state))
+                ),
+            )
+
     @socketio.on(ClientToServer.LEAVE_ROOM.value)
+    @scheduled(Priority.ROOM)
     def on_leave_room(data):
         room = current_room(request.sid)
         player: PlayerSession = current_player(request.sid)
 
+        # Both kinds of membership are cleaned up, so none is left behind for a disconnected client
+        stopped_spectating = player is not None and player.spectating is not None
+        if stopped_spectating:
+            spectated = room_sessions.get(player.spectating)
+            if spectated is not None and request.sid in spectated.spectator_sids:
+                spectated.spectator_sids.remove(request.sid)
+            leave_room(spectator_channel(player.spectating))
+            player.spectating = None
+
         if room is None or player.room is None:
-            return error_response(ServerError.NOT_IN_A_ROOM)
+            return (
+                None
+                if stopped_spectating
+                else error_response(ServerError.NOT_IN_A_ROOM)
+            )
 
         username = player.name
         player.room = None
         player.name = None
         player.role = None
+        player.representations = set(StateRepresentation)
+        player.step_events = False
 
         leave_room(room.id)
         room.player_sids.remove(request.sid)
 
-        emit(ServerToClient.ROOM_LEFT.value, RoomLeft(username).to_dict(), to=room.id)
+        emit(ServerToClient.ROOM_LEFT.value, encode(RoomLeft(username)), to=room.id)
+        on_room_changed(room)
+
+    @socketio.on(ClientToServer.ADD_BOT.value)
+    @scheduled(Priority.ROOM)
+    def on_add_bot(data):
+        event = decode(AddBot, data)
+        room = current_room(request.sid)
+
+        if room is None:
+            return error_response(ServerError.NOT_IN_A_ROOM)
+
+        sid = new_bot_sid()
+        username = event.username or sid
+        connected_players[sid] = PlayerSession(
+            sid,
+            username,
+            room.id,
+            set(map(int, event.roles or [])),
+            set(),
+            event.policy or BotPolicy.RANDOM,
+        )
+        room.player_sids.append(sid)
+
+        emit(
+            ServerToClient.ROOM_JOINED.value,
+            encode(RoomJoined(username)),
+            to=room.id,
+        )
+        on_room_changed(room)
+
+    @socketio.on(ClientToServer.REMOVE_BOT.value)
+    @scheduled(Priority.ROOM)
+    def on_remove_bot(data):
+        event = decode(RemoveBot, data)
+        room = current_room(request.sid)
+
+        if room is None:
+            return error_response(ServerError.NOT_IN_A_ROOM)
+        if event.sid not in room.player_sids or not is_bot(event.sid):
+            return error_response(ServerError.NO_SUCH_BOT)
+
+        username = connected_players.pop(event.sid).name
+        room.player_sids.remove(event.sid)
+
+        emit(ServerToClient.ROOM_LEFT.value, encode(RoomLeft(username)), to=room.id)
         on_room_changed(room)
 
     @socketio.on(ClientToServer.SET_NAME.value)
+    @scheduled(Priority.LOBBY)
     def on_set_name(data):
-        event = SetName.from_dict(data)
+        event = decode(SetName, data)
         player: PlayerSession = current_player(request.sid)
         player.name = event.name
 
@@ -165,8 +318,10 @@ def configure_room_handlers(socketio: SocketIO):
             on_room_changed(room)
 
     @socketio.on(ClientToServer.SET_ROLES.value)
+    @rate_limited(ClientToServer.SET_ROLES)
+    @scheduled(Priority.ROOM)
     def on_set_roles(data):
-        event = SetRoles.from_dict(data)
+        event = decode(SetRoles, data)
         room = current_room(request.sid)
         player = current_player(request.sid)
 
@@ -178,34 +333,25 @@ def configure_room_handlers(socketio: SocketIO):
 
         emit(
             ServerToClient.ROLES_CHANGED.value,
-            RolesChanged(list(player.roles), player.name).to_dict(),
+            encode(RolesChanged(list(player.roles), player.name)),
             to=room.id,
         )
 
         on_room_changed(room)
 
     @socketio.on(ClientToServer.LIST_ROOMS.value)
+    @rate_limited(ClientToServer.LIST_ROOMS)
+    @scheduled(Priority.LOBBY)
     def on_list_rooms(data):
-        return ListRooms(
-            [RoomElement.from_dict(room.to_dict()) for room in room_sessions.values()]
-        ).to_dict()
+        # Each room's payload already has the shape of a RoomElement, no need to decode it again
+        return {"rooms": [room.to_dict() for room in room_sessions.values()]}
 
     @socketio.on(ClientToServer.LIST_ROLES.value)
+    @scheduled(Priority.LOBBY)
     def on_list_rooms(data):
-        if not hasattr(PROBLEM, "ROLES"):
-            return ListRoles([]).to_dict()
-        try:
-            return ListRoles(
-                [RoleElement.from_dict(role) for role in PROBLEM.ROLES or []]
-            ).to_dict()
-        except Error:
-            return error_response(ServerError.INVALID_ROLES)
+        return sender_metadata(request.sid).role_list
 
     @socketio.on(ClientToServer.LIST_OPTIONS.value)
+    @scheduled(Priority.LOBBY)
     def on_list_options(data):
-        if not hasattr(PROBLEM, "OPTIONS"):
-            return ListOptions([]).to_dict()
-        try:
-            return {"options": PROBLEM.OPTIONS or []}
-        except Error:
-            return error_response(ServerError.INVALID_ROLES)
+        return sender_metadata(request.sid).option_list
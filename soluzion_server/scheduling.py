@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import functools
+import itertools
+import queue
+import threading
+import time
+from enum import IntEnum
+from typing import Any, Callable, Optional
+
+from flask import copy_current_request_context, request
+
+from soluzion_server import metrics
+from soluzion_server.globals import error_response
+from soluzion_server.soluzion_types import ServerError
+
+
+class Priority(IntEnum):
+    """
+    Order handlers are run in while the server is busy, lowest first
+    """
+
+    GAME = 0  # Moves in a running game
+    ROOM = 1  # Changes to rooms and their players
+    LOBBY = 2  # Lobby and metadata queries, shed under overload
+    SEARCH = 3  # Hints, solutions and best moves, which hold a worker for seconds, shed under overload
+
+
+class _Job:
+    __slots__ = ("run", "queued", "done", "result", "error", "lock", "state")
+
+    def __init__(self, run: Callable[[], Any]):
+        self.run = run
+        self.queued = time.monotonic()
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.lock = threading.Lock()
+        self.state = _QUEUED
+
+    def claim(self, state: object) -> bool:
+        """
+        Moves a queued job to started or cancelled, whichever the worker or the waiter does first
+        :return: whether the job was still queued
+        """
+        with self.lock:
+            if self.state is not _QUEUED:
+                return False
+            self.state = state
+            return True
+
+
+class EventScheduler:
+    """
+    Runs handlers on a fixed set of worker threads in order of priority, so moves in games are handled
+    first however much else is waiting. Lobby requests that wait longer than the shedding threshold are
+    answered with an Overloaded error instead of being handled, without waiting any longer for a worker
+    """
+
+    def __init__(self, workers: int, shed_after: float):
+        """
+        :param shed_after: seconds a lobby request may wait before it's shed
+        """
+        self.shed_after = shed_after
+        self.queue: queue.PriorityQueue[tuple[int, int, _Job]] = queue.PriorityQueue()
+        self.order = itertools.count()
+        self.local = threading.local()
+
+        for number in range(workers):
+            threading.Thread(
+                target=self._work, name=f"handler-{number}", daemon=True
+            ).start()
+
+    def run(self, priority: Priority, event: str, handler: Callable[[], Any]) -> Any:
+        """
+        Runs a handler once a worker gets to it, and waits for its result
+        """
+        # Handlers calling other handlers already hold a worker
+        if getattr(self.local, "worker", False):
+            return handler()
+
+        job = _Job(handler)
+        self.queue.put((priority, next(self.order), job))
+        if priority >= Priority.LOBBY:
+            # Games keeping every worker busy would otherwise hold lobby requests up without end
+            if not job.done.wait(self.shed_after) and job.claim(_CANCELLED):
+                job.result = _SHED
+            else:
+                job.done.wait()
+        else:
+            job.done.wait()
+
+        if job.error is not None:
+            raise job.error
+        if job.result is _SHED:
+            metrics.increment("shed", event)
+            return error_response(
+                ServerError.OVERLOADED, f"The server is too busy for {event}"
+            )
+        return job.result
+
+    def _work(self):
+        self.local.worker = True
+        while True:
+            priority, _, job = self.queue.get()
+            # Its sender already got an Overloaded error
+            if not job.claim(_STARTED):
+                continue
+            try:
+                if (
+                    priority >= Priority.LOBBY
+                    and time.monotonic() - job.queued > self.shed_after
+                ):
+                    job.result = _SHED
+                else:
+                    job.result = job.run()
+            except BaseException as e:
+                job.error = e
+            finally:
+                job.done.set()
+
+
+_SHED = object()
+_QUEUED, _STARTED, _CANCELLED = object(), object(), object()
+
+_scheduler: EventScheduler | None = None
+
+
+def configure_scheduler(workers: int, shed_after: float):
+    """
+    Sets up the threads handlers are run on, or runs them straight away if there are none
+    """
+    global _scheduler
+    _scheduler = EventScheduler(workers, shed_after) if workers > 0 else None
+
+
+def scheduled(priority: Priority) -> Callable:
+    """
+    Makes a handler wait for its turn on the scheduler's workers, behind any handlers of a higher priority
+    """
+
+    def decorator(handler: Callable) -> Callable:
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            if _scheduler is None:
+                return handler(*args, **kwargs)
+
+            # The worker needs the request to know who sent the event
+            run = copy_current_request_context(lambda: handler(*args, **kwargs))
+            event = getattr(request, "event", None) or {}
+            return _scheduler.run(priority, event.get("message", handler.__name__), run)
+
+        return wrapper
+
+    return decorator
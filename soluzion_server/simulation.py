@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import multiprocessing
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Optional
+
+import soluzion_server.globals as server_globals
+from soluzion_server.soluzion_types import BotPolicy
+from soluzion_server.solver import _load_worker_problem, search
+from soluzion_server.adversarial import search_best_move
+
+
+@dataclass
+class GameRecord:
+    game: int
+    steps: int
+    outcome: str
+    """One of goal, stuck if nobody had an applicable operator, step_limit or error"""
+
+    message: Optional[str]
+    """Goal message, or the error for games that raised one"""
+
+    seconds: float
+
+
+@dataclass
+class SimulationSettings:
+    policy: BotPolicy = BotPolicy.RANDOM
+    max_steps: int = 1000
+    seed: int = 0
+    move_time_limit: float = 0.1
+    """Seconds per move for the best policy"""
+
+    max_nodes: int = 200_000
+    """Node budget of each search for the plan policy"""
+
+    args: Optional[dict] = None
+    """Passed to the State() constructor, like start_game's args"""
+
+
+def play_game(game_no: int, settings: SimulationSettings) -> GameRecord:
+    """
+    Plays one game to the end with every role taken by a simulated player, through the same game
+    session logic the server uses
+    """
+    from soluzion_server.engine import (
+        advance_game,
+        game_applicable_operators,
+        is_game_over,
+        new_game,
+    )
+
+    problem = server_globals.PROBLEM
+    rng = random.Random(settings.seed * 1_000_003 + game_no)
+    role_count = len(getattr(problem, "ROLES", None) or [])
+    players = {f"player-{i}": {i} for i in range(role_count)} or {"player-0": set()}
+
+    start = time.perf_counter()
+    game = new_game(f"simulation-{game_no}", "player-0", players, settings.args)
+    plan: list[int] = []
+    turn = 0
+
+    def record(outcome: str, message: Optional[str] = None) -> GameRecord:
+        return GameRecord(
+            game_no, game.step, outcome, message, time.perf_counter() - start
+        )
+
+    try:
+        while not is_game_over(game):
+            if game.step >= settings.max_steps:
+                return record("step_limit")
+
+            # Players take turns, but one that can't move is skipped
+            for offset in range(len(players)):
+                roles = list(players.values())[(turn + offset) % len(players)]
+                op_nos = [
+                    op_no
+                    for op_no in game_applicable_operators(game, roles)
+                    if not problem.OPERATORS[op_no].params
+                ]
+                if op_nos:
+                    turn = (turn + offset + 1) % len(players)
+                    break
+            else:
+                return record("stuck")
+
+            op_no = None
+            if settings.policy == BotPolicy.PLAN:
+                if not plan or plan[0] not in op_nos:
+                    result = search(game.current_state, settings.max_nodes, 3600)
+                    plan = list(result.operators or [])
+                if plan and plan[0] in op_nos:
+                    op_no = plan.pop(0)
+            elif settings.policy == BotPolicy.BEST:
+                op_no = search_best_move(
+                    game.current_state, settings.move_time_limit, roles
+                ).op_no
+
+            if op_no not in op_nos:
+                op_no = rng.choice(op_nos)
+
+            advance_game(game, op_no, None)
+    except Exception as e:
+        return record("error", f"{type(e).__name__}: {e}")
+
+    return record("goal", game.current_state.goal_message())
+
+
+def _play_games(game_nos: range, settings: SimulationSettings) -> list[GameRecord]:
+    return [play_game(game_no, settings) for game_no in game_nos]
+
+
+def simulate(
+    problem_path: str,
+    games: int,
+    settings: SimulationSettings,
+    workers: int = 1,
+    chunk_size: int = 50,
+) -> list[GameRecord]:
+    """
+    Plays many games without any clients, split between worker processes
+    :param problem_path: problem file for the workers to load, the same as the loaded problem
+    :return: a record of each game, in order
+    """
+    if workers <= 1:
+        return _play_games(range(games), settings)
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_load_worker_problem,
+        initargs=(problem_path,),
+    ) as executor:
+        chunks = [
+            executor.submit(
+                _play_games, range(start, min(start + chunk_size, games)), settings
+            )
+            for start in range(0, games, chunk_size)
+        ]
+        return [record for chunk in chunks for record in chunk.result()]
+
+
+def main():
+    """
+    soluzion_server simulate: plays many games of a problem with simulated players, and reports each
+    game's length, outcome and time
+    """
+    from soluzion_server.problem_loading import load_problem
+
+    parser = argparse.ArgumentParser(
+        prog="soluzion_server simulate",
+        description="Play games of a problem without clients",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "problem_path", type=str, help="Path to the Soluzion problem file"
+    )
+    parser.add_argument("-g", "--games", type=int, default=100, help="number of games")
+    parser.add_argument(
+        "--policy",
+        type=str,
+        default=BotPolicy.RANDOM.value,
+        choices=[policy.value for policy in BotPolicy],
+        help="how the simulated players pick operators",
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=1, help="number of processes"
+    )
+    parser.add_argument(
+        "--max-steps", type=int, default=1000, help="steps to give up a game after"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument(
+        "--move-time-limit",
+        type=float,
+        default=0.1,
+        help="seconds per move for the best policy",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=str,
+        default="-",
+        help="CSV file to write each game to, - for stdout",
+    )
+    args = parser.parse_args()
+
+    problem = load_problem(args.problem_path)
+    settings = SimulationSettings(
+        BotPolicy(args.policy), args.max_steps, args.seed, args.move_time_limit
+    )
+
+    start = time.perf_counter()
+    records = simulate(problem.__file__, args.games, settings, args.workers)
+    elapsed = time.perf_counter() - start
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+    writer = csv.DictWriter(output, fieldnames=list(GameRecord.__dataclass_fields__))
+    writer.writeheader()
+    writer.writerows(asdict(record) for record in records)
+    if output is not sys.stdout:
+        output.close()
+
+    if not records:
+        return
+
+    steps = [record.steps for record in records]
+    outcomes = Counter(record.outcome for record in records)
+    print(
+        f"{len(records)} games in {elapsed:.2f}s ({len(records) / elapsed:.1f} games/s), "
+        f"steps mean {statistics.mean(steps):.1f} min {min(steps)} max {max(steps)}, "
+        + ", ".join(f"{outcome} {count}" for outcome, count in outcomes.most_common()),
+        file=sys.stderr,
+    )
@@ -23,10 +23,20 @@ class ExpandedState(Basic_State):
         :return:
         """
         try:
-            return json.dumps(self)
+            return json.dumps(self.__dict__)
         except Exception:
             return "{}"
 
+    @classmethod
+    def deserialize(cls, serialized: str):
+        """
+        Rebuilds a state from the string serialize returned
+        :return:
+        """
+        state = cls.__new__(cls)
+        state.__dict__.update(json.loads(serialized))
+        return state
+
 
 class ExpandedOperator(Basic_Operator):
     params: list[dict[str, Any]]
@@ -46,6 +56,18 @@ class ExpandedOperator(Basic_Operator):
         return self.name
 
 
+def operator_name(operator: ExpandedOperator, state: ExpandedState):
+    """
+    Gets the display name of an operator, supporting dynamic names
+    """
+    # noinspection PyArgumentList
+    return (
+        operator.get_name(state)
+        if hasattr(operator, "get_name") and callable(operator.get_name)
+        else operator.name
+    )
+
+
 class Problem:
     OPERATORS: list[ExpandedOperator]
     INITIAL_STATE: Optional[ExpandedState]
@@ -57,6 +79,10 @@ class Problem:
             (str | Callable[[ExpandedState, ExpandedState, ExpandedOperator], str]),
         ]
     ]
+    STATE_FINGERPRINT: Optional[Callable[[ExpandedState], str | bytes]]
+    HEURISTIC: Optional[Callable[[ExpandedState], float]]
+    EVALUATE: Optional[Callable[[ExpandedState], float]]
+    DESERIALIZE: Optional[Callable[[str], ExpandedState]]
 
     # noinspection PyPep8Naming
     def State(
@@ -68,8 +68,11 @@ class SharedEvent(Enum):
 
 
 class ClientToServer(Enum):
+    ADD_BOT = "add_bot"
+    BEST_MOVE = "best_move"
     CREATE_ROOM = "create_room"
     DELETE_ROOM = "delete_room"
+    HINT = "hint"
     INFO = "info"
     JOIN_ROOM = "join_room"
     LEAVE_ROOM = "leave_room"
@@ -77,27 +80,37 @@ class ClientToServer(Enum):
     LIST_ROLES = "list_roles"
     LIST_ROOMS = "list_rooms"
     OPERATOR_CHOSEN = "operator_chosen"
+    REMOVE_BOT = "remove_bot"
     SET_NAME = "set_name"
     SET_ROLES = "set_roles"
+    SOLVE = "solve"
+    SPECTATE = "spectate"
     START_GAME = "start_game"
 
 
 class CreateRoom:
     """Request for the server to create a new room"""
 
+    problem: Optional[str]
+    """Name of the hosted problem to play in the room, the server's default problem if absent"""
+
     room: str
 
-    def __init__(self, room: str) -> None:
+    def __init__(self, problem: Optional[str], room: str) -> None:
+        self.problem = problem
         self.room = room
 
     @staticmethod
     def from_dict(obj: Any) -> 'CreateRoom':
         assert isinstance(obj, dict)
+        problem = from_union([from_none, from_str], obj.get("problem"))
         room = from_str(obj.get("room"))
-        return CreateRoom(room)
+        return CreateRoom(problem, room)
 
     def to_dict(self) -> dict:
         result: dict = {}
+        if self.problem is not None:
+            result["problem"] = from_union([from_none, from_str], self.problem)
         result["room"] = from_str(self.room)
         return result
 
@@ -122,26 +135,50 @@ class DeleteRoom:
         return result
 
 
+class StateRepresentation(Enum):
+    """"message" is the state's __str__ text, "state" is its serialized form"""
+
+    MESSAGE = "message"
+    STATE = "state"
+
+
 class JoinRoom:
     """Request for the sender to join an existing room, optionally setting a username"""
 
+    representations: Optional[List[StateRepresentation]]
+    """Representations of the state to receive in game_started and operator_applied, both if
+    absent
+    """
     room: str
+    step_events: Optional[bool]
+    """Receive a single step event for each operator applied, instead of transition,
+    operator_applied, game_ended and operators_available
+    """
+
     username: Optional[str]
 
-    def __init__(self, room: str, username: Optional[str]) -> None:
+    def __init__(self, representations: Optional[List[StateRepresentation]], room: str, step_events: Optional[bool], username: Optional[str]) -> None:
+        self.representations = representations
         self.room = room
+        self.step_events = step_events
         self.username = username
 
     @staticmethod
     def from_dict(obj: Any) -> 'JoinRoom':
         assert isinstance(obj, dict)
+        representations = from_union([lambda x: from_list(StateRepresentation, x), from_none], obj.get("representations"))
         room = from_str(obj.get("room"))
+        step_events = from_union([from_none, from_bool], obj.get("step_events"))
         username = from_union([from_none, from_str], obj.get("username"))
-        return JoinRoom(room, username)
+        return JoinRoom(representations, room, step_events, username)
 
     def to_dict(self) -> dict:
         result: dict = {}
+        if self.representations is not None:
+            result["representations"] = from_union([lambda x: from_list(lambda x: to_enum(StateRepresentation, x), x), from_none], self.representations)
         result["room"] = from_str(self.room)
+        if self.step_events is not None:
+            result["step_events"] = from_union([from_none, from_bool], self.step_events)
         result["username"] = from_union([from_none, from_str], self.username)
         return result
 
@@ -233,13 +270,110 @@ class StartGame:
         return result
 
 
+class BotPolicy(Enum):
+    """How a bot picks its operators. "random" picks any applicable operator, "plan" follows the
+    shortest path to a goal, and "best" uses the game tree search of best_move
+    """
+
+    BEST = "best"
+    PLAN = "plan"
+    RANDOM = "random"
+
+
+class AddBot:
+    """Request for a bot player, played by the server, to join the sender's room"""
+
+    policy: Optional[BotPolicy]
+    """How the bot picks its operators, "random" if absent"""
+
+    roles: Optional[List[float]]
+    """Roles for the bot to play"""
+
+    username: Optional[str]
+
+    def __init__(self, policy: Optional[BotPolicy], roles: Optional[List[float]], username: Optional[str]) -> None:
+        self.policy = policy
+        self.roles = roles
+        self.username = username
+
+    @staticmethod
+    def from_dict(obj: Any) -> 'AddBot':
+        assert isinstance(obj, dict)
+        policy = from_union([BotPolicy, from_none], obj.get("policy"))
+        roles = from_union([lambda x: from_list(from_float, x), from_none], obj.get("roles"))
+        username = from_union([from_none, from_str], obj.get("username"))
+        return AddBot(policy, roles, username)
+
+    def to_dict(self) -> dict:
+        result: dict = {}
+        if self.policy is not None:
+            result["policy"] = from_union([lambda x: to_enum(BotPolicy, x), from_none], self.policy)
+        if self.roles is not None:
+            result["roles"] = from_union([lambda x: from_list(to_float, x), from_none], self.roles)
+        if self.username is not None:
+            result["username"] = from_union([from_none, from_str], self.username)
+        return result
+
+
+class RemoveBot:
+    """Request to remove a bot player from the sender's room"""
+
+    sid: str
+    """Sid of the bot, as listed in the room's players"""
+
+    def __init__(self, sid: str) -> None:
+        self.sid = sid
+
+    @staticmethod
+    def from_dict(obj: Any) -> 'RemoveBot':
+        assert isinstance(obj, dict)
+        sid = from_str(obj.get("sid"))
+        return RemoveBot(sid)
+
+    def to_dict(self) -> dict:
+        result: dict = {}
+        result["sid"] = from_str(self.sid)
+        return result
+
+
+class Spectate:
+    """Request for the sender to watch the games in a room without playing, until they leave_room"""
+
+    room: str
+
+    def __init__(self, room: str) -> None:
+        self.room = room
+
+    @staticmethod
+    def from_dict(obj: Any) -> 'Spectate':
+        assert isinstance(obj, dict)
+        room = from_str(obj.get("room"))
+        return Spectate(room)
+
+    def to_dict(self) -> dict:
+        result: dict = {}
+        result["room"] = from_str(self.room)
+        return result
+
+
 class ClientToServerEvents:
+    add_bot: AddBot
+    """Request for a bot player, played by the server, to join the sender's room"""
+
+    best_move: Dict[str, Any]
+    """Request the best operator for the sender's roles in the current state of their game, from a
+    game tree search
+    """
+
     create_room: CreateRoom
     """Request for the server to create a new room"""
 
     delete_room: DeleteRoom
     """Request for the server to delete an empty room"""
 
+    hint: Dict[str, Any]
+    """Request the next operator on the way to a goal from the current state of the sender's game"""
+
     info: Dict[str, Any]
     """Get information about the problem and the server"""
 
@@ -261,18 +395,30 @@ class ClientToServerEvents:
     operator_chosen: OperatorChosen
     """Request for a specific operator to be replied within the sender's game session"""
 
+    remove_bot: RemoveBot
+    """Request to remove a bot player from the sender's room"""
+
     set_name: SetName
     """Request to set the sender's username"""
 
     set_roles: SetRoles
     """Request to set the sender's roles"""
 
+    solve: Dict[str, Any]
+    """Request a sequence of operators leading from the current state of the sender's game to a goal"""
+
+    spectate: Spectate
+    """Request for the sender to watch the games in a room without playing, until they leave_room"""
+
     start_game: StartGame
     """Request to start the game for the sender's current room"""
 
-    def __init__(self, create_room: CreateRoom, delete_room: DeleteRoom, info: Dict[str, Any], join_room: JoinRoom, leave_room: Dict[str, Any], list_options: Dict[str, Any], list_roles: Dict[str, Any], list_rooms: Dict[str, Any], operator_chosen: OperatorChosen, set_name: SetName, set_roles: SetRoles, start_game: StartGame) -> None:
+    def __init__(self, add_bot: AddBot, best_move: Dict[str, Any], create_room: CreateRoom, delete_room: DeleteRoom, hint: Dict[str, Any], info: Dict[str, Any], join_room: JoinRoom, leave_room: Dict[str, Any], list_options: Dict[str, Any], list_roles: Dict[str, Any], list_rooms: Dict[str, Any], operator_chosen: OperatorChosen, remove_bot: RemoveBot, set_name: SetName, set_roles: SetRoles, solve: Dict[str, Any], spectate: Spectate, start_game: StartGame) -> None:
+        self.add_bot = add_bot
+        self.best_move = best_move
         self.create_room = create_room
         self.delete_room = delete_room
+        self.hint = hint
         self.info = info
         self.join_room = join_room
         self.leave_room = leave_room
@@ -280,15 +426,21 @@ class ClientToServerEvents:
         self.list_roles = list_roles
         self.list_rooms = list_rooms
         self.operator_chosen = operator_chosen
+        self.remove_bot = remove_bot
         self.set_name = set_name
         self.set_roles = set_roles
+        self.solve = solve
+        self.spectate = spectate
         self.start_game = start_game
 
     @staticmethod
     def from_dict(obj: Any) -> 'ClientToServerEvents':
         assert isinstance(obj, dict)
+        add_bot = AddBot.from_dict(obj.get("add_bot"))
+        best_move = from_dict(lambda x: x, obj.get("best_move"))
         create_room = CreateRoom.from_dict(obj.get("create_room"))
         delete_room = DeleteRoom.from_dict(obj.get("delete_room"))
+        hint = from_dict(lambda x: x, obj.get("hint"))
         info = from_dict(lambda x: x, obj.get("info"))
         join_room = JoinRoom.from_dict(obj.get("join_room"))
         leave_room = from_dict(lambda x: x, obj.get("leave_room"))
@@ -296,15 +448,21 @@ class ClientToServerEvents:
         list_roles = from_dict(lambda x: x, obj.get("list_roles"))
         list_rooms = from_dict(lambda x: x, obj.get("list_rooms"))
         operator_chosen = OperatorChosen.from_dict(obj.get("operator_chosen"))
+        remove_bot = RemoveBot.from_dict(obj.get("remove_bot"))
         set_name = SetName.from_dict(obj.get("set_name"))
         set_roles = SetRoles.from_dict(obj.get("set_roles"))
+        solve = from_dict(lambda x: x, obj.get("solve"))
+        spectate = Spectate.from_dict(obj.get("spectate"))
         start_game = StartGame.from_dict(obj.get("start_game"))
-        return ClientToServerEvents(create_room, delete_room, info, join_room, leave_room, list_options, list_roles, list_rooms, operator_chosen, set_name, set_roles, start_game)
+        return ClientToServerEvents(add_bot, best_move, create_room, delete_room, hint, info, join_room, leave_room, list_options, list_roles, list_rooms, operator_chosen, remove_bot, set_name, set_roles, solve, spectate, start_game)
 
     def to_dict(self) -> dict:
         result: dict = {}
+        result["add_bot"] = to_class(AddBot, self.add_bot)
+        result["best_move"] = from_dict(lambda x: x, self.best_move)
         result["create_room"] = to_class(CreateRoom, self.create_room)
         result["delete_room"] = to_class(DeleteRoom, self.delete_room)
+        result["hint"] = from_dict(lambda x: x, self.hint)
         result["info"] = from_dict(lambda x: x, self.info)
         result["join_room"] = to_class(JoinRoom, self.join_room)
         result["leave_room"] = from_dict(lambda x: x, self.leave_room)
@@ -312,8 +470,11 @@ class ClientToServerEvents:
         result["list_roles"] = from_dict(lambda x: x, self.list_roles)
         result["list_rooms"] = from_dict(lambda x: x, self.list_rooms)
         result["operator_chosen"] = to_class(OperatorChosen, self.operator_chosen)
+        result["remove_bot"] = to_class(RemoveBot, self.remove_bot)
         result["set_name"] = to_class(SetName, self.set_name)
         result["set_roles"] = to_class(SetRoles, self.set_roles)
+        result["solve"] = from_dict(lambda x: x, self.solve)
+        result["spectate"] = to_class(Spectate, self.spectate)
         result["start_game"] = to_class(StartGame, self.start_game)
         return result
 
@@ -324,15 +485,19 @@ class Info:
     problem_desc: str
     problem_name: str
     problem_version: str
+    problems: Optional[List[str]]
+    """Names of every problem the server hosts, any of which can be played in a new room"""
+
     server_version: str
     soluzion_version: str
 
-    def __init__(self, problem_authors: List[str], problem_creation_date: str, problem_desc: str, problem_name: str, problem_version: str, server_version: str, soluzion_version: str) -> None:
+    def __init__(self, problem_authors: List[str], problem_creation_date: str, problem_desc: str, problem_name: str, problem_version: str, problems: Optional[List[str]], server_version: str, soluzion_version: str) -> None:
         self.problem_authors = problem_authors
         self.problem_creation_date = problem_creation_date
         self.problem_desc = problem_desc
         self.problem_name = problem_name
         self.problem_version = problem_version
+        self.problems = problems
         self.server_version = server_version
         self.soluzion_version = soluzion_version
 
@@ -344,9 +509,10 @@ class Info:
         problem_desc = from_str(obj.get("problem_desc"))
         problem_name = from_str(obj.get("problem_name"))
         problem_version = from_str(obj.get("problem_version"))
+        problems = from_union([lambda x: from_list(from_str, x), from_none], obj.get("problems"))
         server_version = from_str(obj.get("server_version"))
         soluzion_version = from_str(obj.get("soluzion_version"))
-        return Info(problem_authors, problem_creation_date, problem_desc, problem_name, problem_version, server_version, soluzion_version)
+        return Info(problem_authors, problem_creation_date, problem_desc, problem_name, problem_version, problems, server_version, soluzion_version)
 
     def to_dict(self) -> dict:
         result: dict = {}
@@ -355,6 +521,8 @@ class Info:
         result["problem_desc"] = from_str(self.problem_desc)
         result["problem_name"] = from_str(self.problem_name)
         result["problem_version"] = from_str(self.problem_version)
+        if self.problems is not None:
+            result["problems"] = from_union([lambda x: from_list(from_str, x), from_none], self.problems)
         result["server_version"] = from_str(self.server_version)
         result["soluzion_version"] = from_str(self.soluzion_version)
         return result
@@ -499,12 +667,16 @@ class RoomElement:
     in_game: bool
     owner: str
     players: List[RoomPlayer]
+    problem: Optional[str]
+    """Name of the problem played in the room"""
+
     room: str
 
-    def __init__(self, in_game: bool, owner: str, players: List[RoomPlayer], room: str) -> None:
+    def __init__(self, in_game: bool, owner: str, players: List[RoomPlayer], problem: Optional[str], room: str) -> None:
         self.in_game = in_game
         self.owner = owner
         self.players = players
+        self.problem = problem
         self.room = room
 
     @staticmethod
@@ -513,14 +685,17 @@ class RoomElement:
         in_game = from_bool(obj.get("in_game"))
         owner = from_str(obj.get("owner"))
         players = from_list(RoomPlayer.from_dict, obj.get("players"))
+        problem = from_union([from_none, from_str], obj.get("problem"))
         room = from_str(obj.get("room"))
-        return RoomElement(in_game, owner, players, room)
+        return RoomElement(in_game, owner, players, problem, room)
 
     def to_dict(self) -> dict:
         result: dict = {}
         result["in_game"] = from_bool(self.in_game)
         result["owner"] = from_str(self.owner)
         result["players"] = from_list(lambda x: to_class(RoomPlayer, x), self.players)
+        if self.problem is not None:
+            result["problem"] = from_union([from_none, from_str], self.problem)
         result["room"] = from_str(self.room)
         return result
 
@@ -543,33 +718,144 @@ class ListRooms:
         return result
 
 
+class PlanOperator:
+    name: str
+    op_no: float
+
+    def __init__(self, name: str, op_no: float) -> None:
+        self.name = name
+        self.op_no = op_no
+
+    @staticmethod
+    def from_dict(obj: Any) -> 'PlanOperator':
+        assert isinstance(obj, dict)
+        name = from_str(obj.get("name"))
+        op_no = from_float(obj.get("op_no"))
+        return PlanOperator(name, op_no)
+
+    def to_dict(self) -> dict:
+        result: dict = {}
+        result["name"] = from_str(self.name)
+        result["op_no"] = to_float(self.op_no)
+        return result
+
+
+class Hint:
+    distance: Optional[float]
+    """Number of operators between the state and the nearest goal, null if no goal can be reached"""
+
+    operator: Optional[PlanOperator]
+    """Next operator to apply, null if the state is a goal or no goal can be reached"""
+
+    def __init__(self, distance: Optional[float], operator: Optional[PlanOperator]) -> None:
+        self.distance = distance
+        self.operator = operator
+
+    @staticmethod
+    def from_dict(obj: Any) -> 'Hint':
+        assert isinstance(obj, dict)
+        distance = from_union([from_none, from_float], obj.get("distance"))
+        operator = from_union([PlanOperator.from_dict, from_none], obj.get("operator"))
+        return Hint(distance, operator)
+
+    def to_dict(self) -> dict:
+        result: dict = {}
+        result["distance"] = from_union([from_none, to_float], self.distance)
+        result["operator"] = from_union([lambda x: to_class(PlanOperator, x), from_none], self.operator)
+        return result
+
+
+class Solve:
+    operators: Optional[List[PlanOperator]]
+    """Operators leading to the nearest goal, null if no goal can be reached"""
+
+    def __init__(self, operators: Optional[List[PlanOperator]]) -> None:
+        self.operators = operators
+
+    @staticmethod
+    def from_dict(obj: Any) -> 'Solve':
+        assert isinstance(obj, dict)
+        operators = from_union([lambda x: from_list(PlanOperator.from_dict, x), from_none], obj.get("operators"))
+        return Solve(operators)
+
+    def to_dict(self) -> dict:
+        result: dict = {}
+        result["operators"] = from_union([lambda x: from_list(lambda x: to_class(PlanOperator, x), x), from_none], self.operators)
+        return result
+
+
+class BestMove:
+    depth: float
+    """Number of moves ahead the search looked"""
+
+    operator: Optional[PlanOperator]
+    """Best operator to apply, null if the sender has no move"""
+
+    score: Optional[float]
+    """Score of the position after the move for the sender, from a win at 1000000 to a loss at
+    -1000000. Null if the search didn't complete any depth
+    """
+
+    def __init__(self, depth: float, operator: Optional[PlanOperator], score: Optional[float]) -> None:
+        self.depth = depth
+        self.operator = operator
+        self.score = score
+
+    @staticmethod
+    def from_dict(obj: Any) -> 'BestMove':
+        assert isinstance(obj, dict)
+        depth = from_float(obj.get("depth"))
+        operator = from_union([PlanOperator.from_dict, from_none], obj.get("operator"))
+        score = from_union([from_none, from_float], obj.get("score"))
+        return BestMove(depth, operator, score)
+
+    def to_dict(self) -> dict:
+        result: dict = {}
+        result["depth"] = to_float(self.depth)
+        result["operator"] = from_union([lambda x: to_class(PlanOperator, x), from_none], self.operator)
+        result["score"] = from_union([from_none, to_float], self.score)
+        return result
+
+
 class ClientToServerResponse:
+    best_move: BestMove
+    hint: Hint
     info: Info
     list_options: ListOptions
     list_roles: ListRoles
     list_rooms: ListRooms
+    solve: Solve
 
-    def __init__(self, info: Info, list_options: ListOptions, list_roles: ListRoles, list_rooms: ListRooms) -> None:
+    def __init__(self, best_move: BestMove, hint: Hint, info: Info, list_options: ListOptions, list_roles: ListRoles, list_rooms: ListRooms, solve: Solve) -> None:
+        self.best_move = best_move
+        self.hint = hint
         self.info = info
         self.list_options = list_options
         self.list_roles = list_roles
         self.list_rooms = list_rooms
+        self.solve = solve
 
     @staticmethod
     def from_dict(obj: Any) -> 'ClientToServerResponse':
         assert isinstance(obj, dict)
+        best_move = BestMove.from_dict(obj.get("best_move"))
+        hint = Hint.from_dict(obj.get("hint"))
         info = Info.from_dict(obj.get("info"))
         list_options = ListOptions.from_dict(obj.get("list_options"))
         list_roles = ListRoles.from_dict(obj.get("list_roles"))
         list_rooms = ListRooms.from_dict(obj.get("list_rooms"))
-        return ClientToServerResponse(info, list_options, list_roles, list_rooms)
+        solve = Solve.from_dict(obj.get("solve"))
+        return ClientToServerResponse(best_move, hint, info, list_options, list_roles, list_rooms, solve)
 
     def to_dict(self) -> dict:
         result: dict = {}
+        result["best_move"] = to_class(BestMove, self.best_move)
+        result["hint"] = to_class(Hint, self.hint)
         result["info"] = to_class(Info, self.info)
         result["list_options"] = to_class(ListOptions, self.list_options)
         result["list_roles"] = to_class(ListRoles, self.list_roles)
         result["list_rooms"] = to_class(ListRooms, self.list_rooms)
+        result["solve"] = to_class(Solve, self.solve)
         return result
 
 
@@ -603,12 +889,16 @@ class Room:
     in_game: bool
     owner: str
     players: List[RoomPlayerClass]
+    problem: Optional[str]
+    """Name of the problem played in the room"""
+
     room: str
 
-    def __init__(self, in_game: bool, owner: str, players: List[RoomPlayerClass], room: str) -> None:
+    def __init__(self, in_game: bool, owner: str, players: List[RoomPlayerClass], problem: Optional[str], room: str) -> None:
         self.in_game = in_game
         self.owner = owner
         self.players = players
+        self.problem = problem
         self.room = room
 
     @staticmethod
@@ -617,14 +907,17 @@ class Room:
         in_game = from_bool(obj.get("in_game"))
         owner = from_str(obj.get("owner"))
         players = from_list(RoomPlayerClass.from_dict, obj.get("players"))
+        problem = from_union([from_none, from_str], obj.get("problem"))
         room = from_str(obj.get("room"))
-        return Room(in_game, owner, players, room)
+        return Room(in_game, owner, players, problem, room)
 
     def to_dict(self) -> dict:
         result: dict = {}
         result["in_game"] = from_bool(self.in_game)
         result["owner"] = from_str(self.owner)
         result["players"] = from_list(lambda x: to_class(RoomPlayerClass, x), self.players)
+        if self.problem is not None:
+            result["problem"] = from_union([from_none, from_str], self.problem)
         result["room"] = from_str(self.room)
         return result
 
@@ -666,6 +959,7 @@ class ServerToClient(Enum):
     ROOM_DELETED = "room_deleted"
     ROOM_JOINED = "room_joined"
     ROOM_LEFT = "room_left"
+    STEP = "step"
     TRANSITION = "transition"
     YOUR_SID = "your_sid"
 
@@ -693,26 +987,30 @@ class GameEnded:
 class GameStarted:
     """The game has been started for the current client's room"""
 
-    message: str
-    """new state's __str__ message"""
+    message: Optional[str]
+    """new state's __str__ message, null unless the client requested the "message"
+    representation
+    """
 
     state: Optional[str]
-    """JSON representation of new state"""
+    """JSON representation of new state, null unless the client requested the "state"
+    representation
+    """
 
-    def __init__(self, message: str, state: Optional[str]) -> None:
+    def __init__(self, message: Optional[str], state: Optional[str]) -> None:
         self.message = message
         self.state = state
 
     @staticmethod
     def from_dict(obj: Any) -> 'GameStarted':
         assert isinstance(obj, dict)
-        message = from_str(obj.get("message"))
+        message = from_union([from_none, from_str], obj.get("message"))
         state = from_union([from_none, from_str], obj.get("state"))
         return GameStarted(message, state)
 
     def to_dict(self) -> dict:
         result: dict = {}
-        result["message"] = from_str(self.message)
+        result["message"] = from_union([from_none, from_str], self.message)
         result["state"] = from_union([from_none, from_str], self.state)
         return result
 
@@ -746,14 +1044,18 @@ class OperatorAppliedOperator:
 class OperatorApplied:
     """An operator was applied for the current client's game, transforming the state"""
 
-    message: str
-    """new state's __str__ output"""
+    message: Optional[str]
+    """new state's __str__ output, null unless the client requested the "message"
+    representation
+    """
 
     operator: OperatorAppliedOperator
     state: Optional[str]
-    """JSON representation of new state"""
+    """JSON representation of new state, null unless the client requested the "state"
+    representation
+    """
 
-    def __init__(self, message: str, operator: OperatorAppliedOperator, state: Optional[str]) -> None:
+    def __init__(self, message: Optional[str], operator: OperatorAppliedOperator, state: Optional[str]) -> None:
         self.message = message
         self.operator = operator
         self.state = state
@@ -761,14 +1063,14 @@ class OperatorApplied:
     @staticmethod
     def from_dict(obj: Any) -> 'OperatorApplied':
         assert isinstance(obj, dict)
-        message = from_str(obj.get("message"))
+        message = from_union([from_none, from_str], obj.get("message"))
         operator = OperatorAppliedOperator.from_dict(obj.get("operator"))
         state = from_union([from_none, from_str], obj.get("state"))
         return OperatorApplied(message, operator, state)
 
     def to_dict(self) -> dict:
         result: dict = {}
-        result["message"] = from_str(self.message)
+        result["message"] = from_union([from_none, from_str], self.message)
         result["operator"] = to_class(OperatorAppliedOperator, self.operator)
         result["state"] = from_union([from_none, from_str], self.state)
         return result
@@ -914,12 +1216,16 @@ class RoomChanged:
     in_game: bool
     owner: str
     players: List[RoomChangedPlayer]
+    problem: Optional[str]
+    """Name of the problem played in the room"""
+
     room: str
 
-    def __init__(self, in_game: bool, owner: str, players: List[RoomChangedPlayer], room: str) -> None:
+    def __init__(self, in_game: bool, owner: str, players: List[RoomChangedPlayer], problem: Optional[str], room: str) -> None:
         self.in_game = in_game
         self.owner = owner
         self.players = players
+        self.problem = problem
         self.room = room
 
     @staticmethod
@@ -928,14 +1234,17 @@ class RoomChanged:
         in_game = from_bool(obj.get("in_game"))
         owner = from_str(obj.get("owner"))
         players = from_list(RoomChangedPlayer.from_dict, obj.get("players"))
+        problem = from_union([from_none, from_str], obj.get("problem"))
         room = from_str(obj.get("room"))
-        return RoomChanged(in_game, owner, players, room)
+        return RoomChanged(in_game, owner, players, problem, room)
 
     def to_dict(self) -> dict:
         result: dict = {}
         result["in_game"] = from_bool(self.in_game)
         result["owner"] = from_str(self.owner)
         result["players"] = from_list(lambda x: to_class(RoomChangedPlayer, x), self.players)
+        if self.problem is not None:
+            result["problem"] = from_union([from_none, from_str], self.problem)
         result["room"] = from_str(self.room)
         return result
 
@@ -1024,6 +1333,64 @@ class RoomLeft:
         return result
 
 
+class Step:
+    """Everything one operator application produced in the current client's game, sent in place of
+    transition, operator_applied, game_ended and operators_available to clients that joined with
+    step_events
+    """
+
+    game_ended: Optional[str]
+    """Goal message if the operator ended the game, null otherwise"""
+
+    message: Optional[str]
+    """new state's __str__ output, null unless the client requested the "message" representation"""
+
+    operator: OperatorAppliedOperator
+    operators: List[OperatorElement]
+    """Operators now available to the client"""
+
+    state: Optional[str]
+    """JSON representation of new state, null unless the client requested the "state" representation"""
+
+    step: float
+    """Number of operators applied in the game so far, including this one"""
+
+    transitions: List[str]
+    """Messages of the transitions the operator triggered, in order"""
+
+    def __init__(self, game_ended: Optional[str], message: Optional[str], operator: OperatorAppliedOperator, operators: List[OperatorElement], state: Optional[str], step: float, transitions: List[str]) -> None:
+        self.game_ended = game_ended
+        self.message = message
+        self.operator = operator
+        self.operators = operators
+        self.state = state
+        self.step = step
+        self.transitions = transitions
+
+    @staticmethod
+    def from_dict(obj: Any) -> 'Step':
+        assert isinstance(obj, dict)
+        game_ended = from_union([from_none, from_str], obj.get("game_ended"))
+        message = from_union([from_none, from_str], obj.get("message"))
+        operator = OperatorAppliedOperator.from_dict(obj.get("operator"))
+        operators = from_list(OperatorElement.from_dict, obj.get("operators"))
+        state = from_union([from_none, from_str], obj.get("state"))
+        step = from_float(obj.get("step"))
+        transitions = from_list(from_str, obj.get("transitions"))
+        return Step(game_ended, message, operator, operators, state, step, transitions)
+
+    def to_dict(self) -> dict:
+        result: dict = {}
+        result["game_ended"] = from_union([from_none, from_str], self.game_ended)
+        result["message"] = from_union([from_none, from_str], self.message)
+        result["operator"] = to_class(OperatorAppliedOperator, self.operator)
+        result["operators"] = from_list(lambda x: to_class(OperatorElement, x), self.operators)
+        result["state"] = from_union([from_none, from_str], self.state)
+        result["step"] = to_float(self.step)
+        result["transitions"] = from_list(from_str, self.transitions)
+        return result
+
+
 class Transition:
     """A transition event has occurred for the current client's game"""
 
@@ -1095,13 +1462,19 @@ class ServerToClientEvents:
     room_left: RoomLeft
     """A user has left the current client's room"""
 
+    step: Step
+    """Everything one operator application produced in the current client's game, sent in place of
+    transition, operator_applied, game_ended and operators_available to clients that joined with
+    step_events
+    """
+
     transition: Transition
     """A transition event has occurred for the current client's game"""
 
     your_sid: YourSid
     """Inform the client of its sid"""
 
-    def __init__(self, game_ended: GameEnded, game_started: GameStarted, operator_applied: OperatorApplied, operators_available: OperatorsAvailable, roles_changed: RolesChanged, room_changed: RoomChanged, room_created: RoomCreated, room_deleted: RoomDeleted, room_joined: RoomJoined, room_left: RoomLeft, transition: Transition, your_sid: YourSid) -> None:
+    def __init__(self, game_ended: GameEnded, game_started: GameStarted, operator_applied: OperatorApplied, operators_available: OperatorsAvailable, roles_changed: RolesChanged, room_changed: RoomChanged, room_created: RoomCreated, room_deleted: RoomDeleted, room_joined: RoomJoined, room_left: RoomLeft, step: Step, transition: Transition, your_sid: YourSid) -> None:
         self.game_ended = game_ended
         self.game_started = game_started
         self.operator_applied = operator_applied
@@ -1112,6 +1485,7 @@ class ServerToClientEvents:
         self.room_deleted = room_deleted
         self.room_joined = room_joined
         self.room_left = room_left
+        self.step = step
         self.transition = transition
         self.your_sid = your_sid
 
@@ -1128,9 +1502,10 @@ class ServerToClientEvents:
         room_deleted = RoomDeleted.from_dict(obj.get("room_deleted"))
         room_joined = RoomJoined.from_dict(obj.get("room_joined"))
         room_left = RoomLeft.from_dict(obj.get("room_left"))
+        step = Step.from_dict(obj.get("step"))
         transition = Transition.from_dict(obj.get("transition"))
         your_sid = YourSid.from_dict(obj.get("your_sid"))
-        return ServerToClientEvents(game_ended, game_started, operator_applied, operators_available, roles_changed, room_changed, room_created, room_deleted, room_joined, room_left, transition, your_sid)
+        return ServerToClientEvents(game_ended, game_started, operator_applied, operators_available, roles_changed, room_changed, room_created, room_deleted, room_joined, room_left, step, transition, your_sid)
 
     def to_dict(self) -> dict:
         result: dict = {}
@@ -1144,6 +1519,7 @@ class ServerToClientEvents:
         result["room_deleted"] = to_class(RoomDeleted, self.room_deleted)
         result["room_joined"] = to_class(RoomJoined, self.room_joined)
         result["room_left"] = to_class(RoomLeft, self.room_left)
+        result["step"] = to_class(Step, self.step)
         result["transition"] = to_class(Transition, self.transition)
         result["your_sid"] = to_class(YourSid, self.your_sid)
         return result
@@ -1156,9 +1532,16 @@ class ServerError(Enum):
     GAME_NOT_STARTED = "GameNotStarted"
     INVALID_OPERATOR = "InvalidOperator"
     INVALID_ROLES = "InvalidRoles"
+    INVALID_STATE = "InvalidState"
     NOT_IN_A_ROOM = "NotInARoom"
+    NO_SUCH_BOT = "NoSuchBot"
+    OVERLOADED = "Overloaded"
+    PROBLEM_HOST_FAILED = "ProblemHostFailed"
+    RATE_LIMITED = "RateLimited"
     RESPONSE_TIMEOUT = "ResponseTimeout"
     ROOM_ALREADY_EXISTS = "RoomAlreadyExists"
+    SEARCH_BUDGET_EXCEEDED = "SearchBudgetExceeded"
+    UNKNOWN_PROBLEM = "UnknownProblem"
 
 
 class Error:
@@ -1337,6 +1720,30 @@ def player_to_dict(x: Player) -> Any:
     return to_class(Player, x)
 
 
+def state_representation_from_dict(s: Any) -> StateRepresentation:
+    return StateRepresentation(s)
+
+
+def state_representation_to_dict(x: StateRepresentation) -> Any:
+    return to_enum(StateRepresentation, x)
+
+
+def bot_policy_from_dict(s: Any) -> BotPolicy:
+    return BotPolicy(s)
+
+
+def bot_policy_to_dict(x: BotPolicy) -> Any:
+    return to_enum(BotPolicy, x)
+
+
+def plan_operator_from_dict(s: Any) -> PlanOperator:
+    return PlanOperator.from_dict(s)
+
+
+def plan_operator_to_dict(x: PlanOperator) -> Any:
+    return to_class(PlanOperator, x)
+
+
 def server_to_client_from_dict(s: Any) -> ServerToClient:
     return ServerToClient(s)
 
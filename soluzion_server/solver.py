@@ -0,0 +1,493 @@
+from __future__ import annotations
+
+import atexit
+import heapq
+import itertools
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Collection, Iterator, Optional
+
+import soluzion_server.globals as server_globals
+from soluzion_server.adversarial import MoveResult, search_best_move
+from soluzion_server.problem_loading import module_sources
+from soluzion_server.soluzion_expanded import ExpandedState, Problem, operator_name
+from soluzion_server.state_cache import (
+    FingerprintIndex,
+    fingerprint_keys,
+    get_problem_cache,
+    read_arrays,
+    write_arrays,
+)
+from soluzion_server.state_interning import state_fingerprint
+
+
+@dataclass
+class SearchResult:
+    operators: Optional[list[int]]
+    """Operator numbers leading from the searched state to a goal, None if no goal was found"""
+
+    names: Optional[list[str]]
+    """Display names of the operators, for the state each is applied to"""
+
+    fingerprints: Optional[list[bytes]]
+    """Fingerprints of the states each operator is applied to"""
+
+    exhausted: bool = False
+    """Whether the node or time budget ran out before the search finished"""
+
+    expanded: int = 0
+
+
+def successors(
+    problem: Problem, state: ExpandedState
+) -> Iterator[tuple[int, ExpandedState]]:
+    """
+    Generates the states reachable with one operator, skipping operators that need parameters
+    """
+    for op_no, operator in enumerate(problem.OPERATORS):
+        if operator.params:
+            continue
+        try:
+            if operator.is_applicable(state):
+                yield op_no, operator.apply(state)
+        except Exception as e:
+            print(f"Operator {op_no} failed during search: {e}")
+
+
+def search(state: ExpandedState, max_nodes: int, time_limit: float) -> SearchResult:
+    """
+    Finds the shortest sequence of operators from the state to a goal, with A* if the problem defines a
+    HEURISTIC, and breadth-first search otherwise
+    :param max_nodes: maximum number of states to expand
+    :param time_limit: maximum number of seconds to search for
+    """
+    problem = server_globals.PROBLEM
+    heuristic = getattr(problem, "HEURISTIC", None)
+    if not callable(heuristic):
+        heuristic = None
+
+    deadline = time.monotonic() + time_limit
+    start = state_fingerprint(state, problem)
+    parents: dict[bytes, Optional[tuple[bytes, int]]] = {start: None}
+    expanded = 0
+
+    def found(goal: bytes):
+        # Walk back up to the start, then replay forwards to get the names along the way
+        operators = []
+        fingerprint = goal
+        while parents[fingerprint] is not None:
+            fingerprint, op_no = parents[fingerprint]
+            operators.append(op_no)
+        operators.reverse()
+
+        names, fingerprints = [], []
+        current = state
+        for op_no in operators:
+            operator = problem.OPERATORS[op_no]
+            names.append(operator_name(operator, current))
+            fingerprints.append(state_fingerprint(current, problem))
+            current = operator.apply(current)
+
+        return SearchResult(operators, names, fingerprints, False, expanded)
+
+    def exhausted():
+        return expanded >= max_nodes or (
+            expanded % 64 == 0 and time.monotonic() > deadline
+        )
+
+    if state.is_goal():
+        return found(start)
+
+    if heuristic is None:
+        frontier = deque([(state, start)])
+        while frontier:
+            if exhausted():
+                return SearchResult(None, None, None, True, expanded)
+            current, current_fingerprint = frontier.popleft()
+            expanded += 1
+
+            for op_no, child in successors(problem, current):
+                fingerprint = state_fingerprint(child, problem)
+                if fingerprint in parents:
+                    continue
+                parents[fingerprint] = (current_fingerprint, op_no)
+                if child.is_goal():
+                    return found(fingerprint)
+                frontier.append((child, fingerprint))
+    else:
+        counter = itertools.count()
+        costs = {start: 0}
+        frontier = [(heuristic(state), next(counter), 0, state, start)]
+        while frontier:
+            _, _, cost, current, current_fingerprint = heapq.heappop(frontier)
+            if cost > costs[current_fingerprint]:
+                continue
+            if current.is_goal():
+                return found(current_fingerprint)
+            if exhausted():
+                return SearchResult(None, None, None, True, expanded)
+            expanded += 1
+
+            for op_no, child in successors(problem, current):
+                fingerprint = state_fingerprint(child, problem)
+                if cost + 1 >= costs.get(fingerprint, float("inf")):
+                    continue
+                costs[fingerprint] = cost + 1
+                parents[fingerprint] = (current_fingerprint, op_no)
+                heapq.heappush(
+                    frontier,
+                    (
+                        cost + 1 + heuristic(child),
+                        next(counter),
+                        cost + 1,
+                        child,
+                        fingerprint,
+                    ),
+                )
+
+    return SearchResult(None, None, None, False, expanded)
+
+
+def _load_worker_problem(
+    problem_path: str, module_name: Optional[str] = None, source: Optional[str] = None
+):
+    from soluzion_server.problem_loading import load_problem
+
+    # The same code under the same name as in the server, so states pickle between them even after the
+    # file was edited
+    load_problem(problem_path, module_name, source)
+
+
+class SolutionTable:
+    """
+    Search results saved in the problem cache. The file is memory mapped, so it's shared with other
+    server processes and survives restarts
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._arrays: Optional[dict[str, Any]] = None
+        self._index: Optional[FingerprintIndex] = None
+        self._mapped = False
+
+    def _map(self) -> Optional[FingerprintIndex]:
+        # Mapped on the first lookup rather than at startup, which would import numpy before serving
+        if not self._mapped:
+            self._mapped = True
+            self._arrays = read_arrays(self.path)
+            if self._arrays is not None:
+                import numpy as np
+
+                keys = self._arrays["keys"]
+                self._index = FingerprintIndex(keys, np.arange(len(keys)))
+        return self._index
+
+    def __len__(self):
+        index = self._map()
+        return 0 if index is None else len(index)
+
+    def _result(self, i: int) -> SearchResult:
+        arrays = self._arrays
+        if not arrays["solved"][i]:
+            return SearchResult(None, None, None)
+
+        start, end = arrays["offsets"][i], arrays["offsets"][i + 1]
+        name_offsets = arrays["name_offsets"][start : end + 1]
+        names = arrays["names"]
+        return SearchResult(
+            arrays["operators"][start:end].tolist(),
+            [
+                names[a:b].tobytes().decode()
+                for a, b in zip(name_offsets[:-1], name_offsets[1:])
+            ],
+            None,
+        )
+
+    def get(self, fingerprint: bytes) -> Optional[SearchResult]:
+        index = self._map()
+        if index is None:
+            return None
+        i = index.get(fingerprint)
+        return None if i is None else self._result(i)
+
+    def results(self) -> dict[bytes, SearchResult]:
+        index = self._map()
+        if index is None:
+            return {}
+        return {
+            key.astype(">u8").tobytes(): self._result(i)
+            for i, key in enumerate(index.keys)
+        }
+
+    @staticmethod
+    def write(path: str, results: dict[bytes, SearchResult]):
+        import numpy as np
+
+        fingerprints = sorted(results)
+        solved, offsets, operators, name_offsets, names = [], [0], [], [0], []
+        for fingerprint in fingerprints:
+            result = results[fingerprint]
+            solved.append(result.operators is not None)
+            for op_no, name in zip(result.operators or [], result.names or []):
+                operators.append(op_no)
+                names.append(name.encode())
+                name_offsets.append(name_offsets[-1] + len(names[-1]))
+            offsets.append(len(operators))
+
+        write_arrays(
+            path,
+            {
+                "keys": fingerprint_keys(fingerprints),
+                "solved": np.array(solved, dtype=bool),
+                "offsets": np.array(offsets, dtype=np.int64),
+                "operators": np.array(operators, dtype=np.int16),
+                "name_offsets": np.array(name_offsets, dtype=np.int64),
+                "names": np.frombuffer(b"".join(names), dtype=np.uint8),
+            },
+        )
+
+
+class Solver:
+    """
+    Runs searches in a pool of worker processes, caching the results per state fingerprint
+    """
+
+    def __init__(
+        self,
+        problem_path: str,
+        workers: int,
+        max_nodes: int,
+        time_limit: float,
+        move_time_limit: float = 2.0,
+        cache_size: int = 100_000,
+        flush_interval: float = 30.0,
+        problem: Optional[Problem] = None,
+        cached: bool = True,
+    ):
+        """
+        :param problem: the loaded problem, the default one if None
+        :param cached: whether to save results in the problem cache, which only holds the default problem's
+        """
+        self.problem_path = problem_path
+        self.problem = problem if problem is not None else server_globals.PROBLEM
+        self.workers = workers
+        self.max_nodes = max_nodes
+        self.time_limit = time_limit
+        self.move_time_limit = move_time_limit
+        self.cache_size = cache_size
+
+        self._executor: ProcessPoolExecutor | None = None
+        self._cache: OrderedDict[bytes, SearchResult] = OrderedDict()
+        self._pending: dict[bytes, Future] = {}
+        self._lock = threading.Lock()
+
+        self.flush_interval = flush_interval
+        self._table: SolutionTable | None = None
+        self._unsaved: dict[bytes, SearchResult] = {}
+        self._last_flush = time.monotonic()
+
+        cache = get_problem_cache() if cached else None
+        if cache is not None:
+            self._table = SolutionTable(cache.file("solutions"))
+            atexit.register(self.flush)
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            module_name = getattr(self.problem, "__name__", None)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_load_worker_problem,
+                initargs=(
+                    self.problem_path,
+                    module_name,
+                    module_sources.get(module_name),
+                ),
+            )
+        return self._executor
+
+    def _wait(self, future: Future, time_limit: float) -> Optional[Any]:
+        """
+        Waits for a job submitted to the pool
+        :return: its result, or None if it failed or didn't finish in time
+        """
+        try:
+            # Leave time for a freshly spawned worker to load the problem
+            return future.result(timeout=time_limit + 10)
+        except FutureTimeoutError:
+            return None
+        except BrokenProcessPool:
+            print("A solver worker crashed, restarting the pool")
+            with self._lock:
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            return None
+        except Exception as e:
+            print(f"Search failed: {e}")
+            return None
+
+    def best_move(
+        self, state: ExpandedState, roles: Collection[int] | None
+    ) -> Optional[MoveResult]:
+        """
+        Runs a game tree search for the best move from the state, waiting for the result
+        :return: the move, or None if the search failed
+        """
+        with self._lock:
+            future = self._pool().submit(
+                search_best_move, state, self.move_time_limit, roles
+            )
+        return self._wait(future, self.move_time_limit)
+
+    def _store(self, fingerprint: bytes, result: SearchResult):
+        # Results cut short by the budget aren't kept, the next search may have more time, like when the
+        # pool isn't as busy
+        if not result.exhausted:
+            self._cache[fingerprint] = result
+            self._cache.move_to_end(fingerprint)
+            if self._table is not None:
+                self._unsaved[fingerprint] = result
+
+        # Every state along a solution has the rest of the solution as its own
+        if result.operators is not None and result.fingerprints is not None:
+            for i, step in enumerate(result.fingerprints[1:], 1):
+                self._cache[step] = SearchResult(
+                    result.operators[i:],
+                    result.names[i:],
+                    result.fingerprints[i:],
+                )
+                if self._table is not None:
+                    self._unsaved[step] = self._cache[step]
+
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def solve(self, state: ExpandedState) -> SearchResult:
+        """
+        Searches for a solution from the state, waiting for the result
+        """
+        fingerprint = state_fingerprint(state, self.problem)
+
+        with self._lock:
+            result = self._cache.get(fingerprint)
+            if result is not None:
+                self._cache.move_to_end(fingerprint)
+                return result
+
+            if self._table is not None:
+                result = self._table.get(fingerprint)
+                if result is not None:
+                    self._cache[fingerprint] = result
+                    return result
+
+            future = self._pending.get(fingerprint)
+            if future is None:
+                future = self._pool().submit(
+                    search, state, self.max_nodes, self.time_limit
+                )
+                self._pending[fingerprint] = future
+
+        try:
+            result = self._wait(future, self.time_limit)
+        finally:
+            with self._lock:
+                self._pending.pop(fingerprint, None)
+
+        if result is None:
+            return SearchResult(None, None, None, True)
+
+        with self._lock:
+            self._store(fingerprint, result)
+            flush = (
+                self._unsaved
+                and time.monotonic() - self._last_flush > self.flush_interval
+            )
+        if flush:
+            self.flush()
+        return result
+
+    def flush(self):
+        """
+        Merges the results found since the last flush into the solution table file
+        """
+        with self._lock:
+            if self._table is None or not self._unsaved:
+                return
+            unsaved, self._unsaved = self._unsaved, {}
+            self._last_flush = time.monotonic()
+
+            # Reread the file, another server process may have added to it in the meantime
+            results = SolutionTable(self._table.path).results()
+            results.update(unsaved)
+            try:
+                SolutionTable.write(self._table.path, results)
+            except OSError as e:
+                print(f"Unable to save solver results: {e}")
+                return
+            self._table = SolutionTable(self._table.path)
+
+
+_solver: Solver | None = None
+_problem_solvers: dict[int, Solver] = {}
+"""Solvers of the hosted problems other than the default one, by id of the problem module"""
+_problem_solvers_lock = threading.Lock()
+
+
+def configure_solver(
+    problem_path: str,
+    workers: int,
+    max_nodes: int,
+    time_limit: float,
+    move_time_limit: float = 2.0,
+):
+    global _solver
+    _solver = Solver(problem_path, workers, max_nodes, time_limit, move_time_limit)
+
+
+def get_solver(problem: Optional[Problem] = None) -> Solver | None:
+    """
+    :param problem: problem to search, the default one if None. Other problems, and other versions of the
+    default one, get a solver of their own with the same settings, whose worker processes are only started
+    by their first search
+    """
+    if problem is None:
+        problem = server_globals.PROBLEM
+    if _solver is None or problem is _solver.problem:
+        return _solver
+
+    with _problem_solvers_lock:
+        solver = _problem_solvers.get(id(problem))
+        if solver is None:
+            solver = _problem_solvers[id(problem)] = Solver(
+                problem.__file__,
+                _solver.workers,
+                _solver.max_nodes,
+                _solver.time_limit,
+                _solver.move_time_limit,
+                problem=problem,
+                cached=False,
+            )
+        return solver
+
+
+def release_solver(problem: Problem):
+    """
+    Stops the worker processes of a problem that is no longer played
+    """
+    with _problem_solvers_lock:
+        solver = _problem_solvers.pop(id(problem), None)
+    if solver is None and _solver is not None and problem is _solver.problem:
+        solver = _solver
+    if solver is None:
+        return
+    with solver._lock:
+        if solver._executor is not None:
+            solver._executor.shutdown(wait=False, cancel_futures=True)
+            solver._executor = None
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import contextlib
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from importlib.abc import MetaPathFinder
+from typing import Callable, Iterator, Optional
+
+
+@dataclass
+class ImportTime:
+    name: str
+    seconds: float  # Including the modules it imported
+    own_seconds: float  # Excluding the modules it imported
+
+
+class StartupProfile:
+    """
+    Times each module imported while the server starts, like python -X importtime, along with the phases
+    of startup
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.imports: list[ImportTime] = []
+        self.phases: list[tuple[str, float]] = []
+        self._children = threading.local()
+        self._finder = _ImportTimer(self)
+
+    def start(self):
+        sys.meta_path.insert(0, self._finder)
+
+    def stop(self):
+        if self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def timed_exec(self, name: str, execute: Callable[[], None]):
+        stack = getattr(self._children, "stack", None)
+        if stack is None:
+            stack = self._children.stack = []
+
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            execute()
+        finally:
+            seconds = time.perf_counter() - start
+            children = stack.pop()
+            if stack:
+                stack[-1] += seconds
+            self.imports.append(ImportTime(name, seconds, seconds - children))
+
+    def report(self, limit: int = 30) -> str:
+        """
+        :param limit: number of the slowest imports to list
+        """
+        total = time.perf_counter() - self.started
+        importing = sum(entry.own_seconds for entry in self.imports)
+        lines = [
+            f"Started in {total * 1000:.1f}ms, {importing * 1000:.1f}ms of it importing "
+            f"{len(self.imports)} modules",
+            "  "
+            + ", ".join(
+                f"{name} {seconds * 1000:.1f}ms" for name, seconds in self.phases
+            ),
+            f"  {'cumulative':>10}  {'self':>8}  module",
+        ]
+        for entry in sorted(self.imports, key=lambda entry: -entry.seconds)[:limit]:
+            lines.append(
+                f"  {entry.seconds * 1000:>8.1f}ms  {entry.own_seconds * 1000:>6.1f}ms  {entry.name}"
+            )
+        return "\n".join(lines)
+
+
+class _ImportTimer(MetaPathFinder):
+    """
+    Finds modules with the finders after it, and wraps their loaders to time executing the module
+    """
+
+    def __init__(self, profile: StartupProfile):
+        self.profile = profile
+
+    def find_spec(self, name, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, name, self.profile)
+        return spec
+
+
+class _TimedLoader:
+    def __init__(self, loader, name: str, profile: StartupProfile):
+        self._loader = loader
+        self._name = name
+        self._profile = profile
+
+    def __getattr__(self, name: str):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._profile.timed_exec(self._name, lambda: self._loader.exec_module(module))
+
+
+_profile: Optional[StartupProfile] = None
+
+
+def start_startup_profile() -> StartupProfile:
+    """
+    Starts timing imports, if they aren't already being timed
+    """
+    global _profile
+    if _profile is None:
+        _profile = StartupProfile()
+        _profile.start()
+    return _profile
+
+
+def get_startup_profile() -> Optional[StartupProfile]:
+    return _profile
+
+
+def startup_phase(name: str) -> contextlib.AbstractContextManager:
+    """
+    Times a phase of startup, if startup is being profiled
+    """
+    return contextlib.nullcontext() if _profile is None else _profile.phase(name)
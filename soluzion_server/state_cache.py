@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import shutil
+from typing import Optional
+
+CACHE_VERSION = 2
+
+_HEADER_SIZE = 8
+_ALIGNMENT = 64
+
+
+def write_arrays(path: str, arrays: dict[str, np.ndarray]):
+    """
+    Writes arrays to a single file that can be memory mapped with read_arrays.
+    The file is replaced atomically, so readers never see a partial write
+    """
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = -(-offset // _ALIGNMENT) * _ALIGNMENT
+        layout[name] = {
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset,
+        }
+        offset += array.nbytes
+
+    header = json.dumps(layout).encode()
+    data_start = -(-(_HEADER_SIZE + len(header)) // _ALIGNMENT) * _ALIGNMENT
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(len(header).to_bytes(_HEADER_SIZE, "little"))
+        file.write(header)
+        for name, array in arrays.items():
+            file.seek(data_start + layout[name]["offset"])
+            file.write(array.tobytes())
+        file.truncate(data_start + offset)
+    os.replace(temp_path, path)
+
+
+def read_arrays(path: str) -> Optional[dict[str, np.ndarray]]:
+    """
+    Memory maps the arrays in a file written by write_arrays.
+    The pages are shared between every process mapping the same file
+    :return: read only arrays, or None if the file doesn't exist or is damaged
+    """
+    try:
+        with open(path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # Only once there's something to read, so servers without a cache never load numpy
+        import numpy as np
+
+        header_length = int.from_bytes(mapped[:_HEADER_SIZE], "little")
+        layout = json.loads(mapped[_HEADER_SIZE : _HEADER_SIZE + header_length])
+        data_start = -(-(_HEADER_SIZE + header_length) // _ALIGNMENT) * _ALIGNMENT
+
+        arrays = {}
+        for name, entry in layout.items():
+            dtype = np.dtype(entry["dtype"])
+            count = int(np.prod(entry["shape"], dtype=np.int64))
+            arrays[name] = np.frombuffer(
+                mapped, dtype, count, data_start + entry["offset"]
+            ).reshape(entry["shape"])
+        return arrays
+    except (OSError, ValueError) as e:
+        if not isinstance(e, FileNotFoundError):
+            print(f"Ignoring unreadable cache file {path}: {e}")
+        return None
+
+
+def fingerprint_keys(fingerprints: list[bytes]) -> np.ndarray:
+    """
+    Converts 16 byte fingerprints to rows of two integers, which sort the same way as the bytes
+    """
+    import numpy as np
+
+    return (
+        np.frombuffer(b"".join(fingerprints), dtype=">u8")
+        .astype(np.uint64)
+        .reshape(-1, 2)
+    )
+
+
+class FingerprintIndex:
+    """
+    Maps state fingerprints to integers with a sorted array, so it can be memory mapped
+    """
+
+    def __init__(self, keys: np.ndarray, values: np.ndarray):
+        self.keys = keys
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    @staticmethod
+    def build(fingerprints: list[bytes], values: np.ndarray) -> FingerprintIndex:
+        import numpy as np
+
+        keys = fingerprint_keys(fingerprints)
+        order = np.lexsort((keys[:, 1], keys[:, 0]))
+        return FingerprintIndex(keys[order], values[order])
+
+    def get(self, fingerprint: bytes) -> Optional[int]:
+        high = int.from_bytes(fingerprint[:8], "big")
+        low = int.from_bytes(fingerprint[8:16], "big")
+
+        i = int(self.keys[:, 0].searchsorted(self.keys.dtype.type(high)))
+        while i < len(self.keys) and self.keys[i, 0] == high:
+            if self.keys[i, 1] == low:
+                return int(self.values[i])
+            i += 1
+        return None
+
+
+class ProblemCache:
+    """
+    Cache directory for one version of a problem file. Caches of earlier versions of the same file are
+    deleted, so editing the problem invalidates everything derived from it
+    """
+
+    def __init__(self, cache_dir: str, problem_path: str):
+        problem_path = os.path.abspath(problem_path)
+        with open(problem_path, "rb") as file:
+            source_hash = hashlib.sha256(file.read()).hexdigest()[:16]
+
+        name = os.path.splitext(os.path.basename(problem_path))[0]
+        path_hash = hashlib.sha256(problem_path.encode()).hexdigest()[:8]
+        prefix = f"{name}-{path_hash}-"
+
+        self.path = os.path.join(cache_dir, f"{prefix}{source_hash}-v{CACHE_VERSION}")
+        os.makedirs(self.path, exist_ok=True)
+
+        for entry in os.listdir(cache_dir):
+            stale = os.path.join(cache_dir, entry)
+            if entry.startswith(prefix) and stale != self.path:
+                print(f"Removing outdated problem cache {stale}")
+                shutil.rmtree(stale, ignore_errors=True)
+
+    def file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+
+_cache: ProblemCache | None = None
+
+
+def configure_problem_cache(cache_dir: str, problem_path: str):
+    global _cache
+    try:
+        _cache = ProblemCache(cache_dir, problem_path)
+    except OSError as e:
+        print(f"Unable to use cache directory {cache_dir}: {e}")
+        _cache = None
+
+
+def get_problem_cache() -> ProblemCache | None:
+    return _cache
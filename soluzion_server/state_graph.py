@@ -0,0 +1,409 @@
+from __future__ import annotations
+
+import os
+import pickle
+import time
+from typing import Callable, Collection, Optional
+
+import soluzion_server.globals as server_globals
+from soluzion_server.soluzion_expanded import ExpandedState, Problem, operator_name
+from soluzion_server.solver import SearchResult
+from soluzion_server.state_cache import (
+    FingerprintIndex,
+    get_problem_cache,
+    read_arrays,
+    write_arrays,
+)
+from soluzion_server.state_interning import state_fingerprint
+
+
+class StateSpaceTooLarge(Exception):
+    """More states are reachable than the limit exploring stops at"""
+
+
+class StateGraph:
+    """
+    The reachable state space of a problem, stored as compact arrays indexed by node number.
+    Transitions are in CSR form: the edges leaving node n are offsets[n] to offsets[n + 1]
+    """
+
+    def __init__(
+        self,
+        states: list[ExpandedState] | Callable[[], list[ExpandedState]],
+        index: FingerprintIndex,
+        offsets: np.ndarray,
+        operators: np.ndarray,
+        targets: np.ndarray,
+        applicable: np.ndarray,
+        goal: np.ndarray,
+        distance: np.ndarray,
+        operator_count: int,
+    ):
+        self._states = states
+
+        self.index = index
+        """Node number of each state fingerprint"""
+
+        self.offsets = offsets
+        self.operators = operators
+        """Operator number of each edge"""
+
+        self.targets = targets
+        """Node number each edge leads to"""
+
+        self.applicable = applicable
+        """Bitmap of applicable operators, packed per node, with shape (roles + 1, nodes, bytes).
+        Layer 0 is for players without roles, and layer r + 1 is for role r"""
+
+        self.goal = goal
+        self.distance = distance
+        """Number of operators to the nearest goal, or -1 if none can be reached"""
+
+        self.operator_count = operator_count
+
+    def __len__(self):
+        return len(self.goal)
+
+    @property
+    def states(self) -> list[ExpandedState]:
+        """One shared instance of the state at each node, loaded on first use if the graph was cached"""
+        if callable(self._states):
+            self._states = self._states()
+        return self._states
+
+    def save(self, path: str):
+        """
+        Saves the graph to the problem cache, as a memory mappable array file and a pickle of the states
+        """
+        try:
+            with open(f"{path}.states.tmp", "wb") as file:
+                pickle.dump(self.states, file, pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            print(f"Unable to cache the state graph, states can't be pickled: {e}")
+            return
+
+        import numpy as np
+
+        os.replace(f"{path}.states.tmp", f"{path}.states")
+        write_arrays(
+            path,
+            {
+                "keys": self.index.keys,
+                "key_nodes": self.index.values,
+                "offsets": self.offsets,
+                "operators": self.operators,
+                "targets": self.targets,
+                "applicable": self.applicable,
+                "goal": self.goal,
+                "distance": self.distance,
+                "operator_count": np.array([self.operator_count]),
+            },
+        )
+
+    @staticmethod
+    def load(path: str) -> Optional[StateGraph]:
+        """
+        Memory maps a graph saved with save, the states are only unpickled once they're needed
+        """
+        arrays = read_arrays(path)
+        if arrays is None or not os.path.exists(f"{path}.states"):
+            return None
+
+        def load_states():
+            with open(f"{path}.states", "rb") as file:
+                return pickle.load(file)
+
+        return StateGraph(
+            load_states,
+            FingerprintIndex(arrays["keys"], arrays["key_nodes"]),
+            arrays["offsets"],
+            arrays["operators"],
+            arrays["targets"],
+            arrays["applicable"],
+            arrays["goal"],
+            arrays["distance"],
+            int(arrays["operator_count"][0]),
+        )
+
+    def node_of(self, state: ExpandedState, problem: Problem) -> Optional[int]:
+        """
+        Looks up the node of a state, None if it's outside the graph
+        :param problem: problem the graph was explored for
+        """
+        try:
+            return self.index.get(state_fingerprint(state, problem))
+        except Exception:
+            return None
+
+    def successor(self, node: int, op_no: int) -> Optional[int]:
+        """
+        Gets the node an operator leads to, None if it isn't applicable or needs parameters
+        """
+        import numpy as np
+
+        start, end = self.offsets[node], self.offsets[node + 1]
+        (edges,) = np.nonzero(self.operators[start:end] == op_no)
+        return int(self.targets[start + edges[0]]) if len(edges) > 0 else None
+
+    def _layers(self, roles: Collection[int] | None) -> Optional[list[int]]:
+        if roles is None or len(roles) == 0:
+            return [0]
+        layers = [int(role) + 1 for role in roles]
+        if not all(0 < layer < self.applicable.shape[0] for layer in layers):
+            return None
+        return layers
+
+    def applicable_operators(
+        self, node: int, roles: Collection[int] | None
+    ) -> Optional[list[int]]:
+        """
+        Gets the numbers of the operators applicable for any of the roles,
+        None if the roles aren't part of the problem
+        """
+        layers = self._layers(roles)
+        if layers is None:
+            return None
+        import numpy as np
+
+        bits = np.bitwise_or.reduce(self.applicable[layers, node], axis=0)
+        return np.flatnonzero(np.unpackbits(bits, count=self.operator_count)).tolist()
+
+    def is_applicable(
+        self, node: int, op_no: int, roles: Collection[int] | None
+    ) -> Optional[bool]:
+        layers = self._layers(roles)
+        if layers is None:
+            return None
+        import numpy as np
+
+        byte, bit = divmod(op_no, 8)
+        return bool(np.any(self.applicable[layers, node, byte] & (0x80 >> bit)))
+
+    def plan(self, node: int) -> SearchResult:
+        """
+        Follows the distances down to the nearest goal
+        """
+        import numpy as np
+
+        if self.distance[node] < 0:
+            return SearchResult(None, None, None)
+
+        operators, names = [], []
+        problem = _graph_problem or server_globals.PROBLEM
+        while self.distance[node] > 0:
+            start, end = self.offsets[node], self.offsets[node + 1]
+            closer = np.flatnonzero(
+                self.distance[self.targets[start:end]] == self.distance[node] - 1
+            )
+            op_no = int(self.operators[start + closer[0]])
+            operators.append(op_no)
+            names.append(operator_name(problem.OPERATORS[op_no], self.states[node]))
+            node = int(self.targets[start + closer[0]])
+
+        return SearchResult(operators, names, None)
+
+
+def initial_state(problem: Problem) -> ExpandedState:
+    if getattr(problem, "INITIAL_STATE", None) is not None:
+        return problem.INITIAL_STATE
+    return problem.State()
+
+
+def expand_state(
+    problem: Problem, state: ExpandedState, role_count: int
+) -> tuple[bool, list[bool], list[tuple[int, ExpandedState]]]:
+    """
+    Evaluates everything the graph stores about one state
+    :return: whether it's a goal, the applicability of each operator for each layer flattened in
+    (operator, layer) order, and the (op_no, state) transitions out of it
+    """
+    operators = problem.OPERATORS
+    is_goal = bool(state.is_goal())
+    applicable = []
+    children = []
+
+    for op_no, operator in enumerate(operators):
+        # Same as is_operator_applicable, nothing is applicable at a goal
+        layers = [False] * (role_count + 1)
+        if not is_goal:
+            layers[0] = bool(operator.is_applicable(state))
+            for role in range(role_count):
+                layers[role + 1] = bool(operator.is_applicable(state, role))
+        applicable.extend(layers)
+
+        # Transitions with parameters depend on the arguments, so they aren't precomputed
+        if any(layers) and not operator.params:
+            children.append((op_no, operator.apply(state)))
+
+    return is_goal, applicable, children
+
+
+def explore(problem: Problem, state_limit: int) -> Optional[StateGraph]:
+    """
+    Explores every state reachable from the problem's initial state
+    :param state_limit: number of states to give up after
+    :return: the graph, or None if exploring failed
+    :raises StateSpaceTooLarge: if there are more states than the limit
+    """
+    start_time = time.perf_counter()
+
+    operators = problem.OPERATORS
+    role_count = len(getattr(problem, "ROLES", None) or [])
+
+    initial = initial_state(problem)
+    states = [initial]
+    index = {state_fingerprint(initial, problem): 0}
+    offsets, edge_operators, edge_targets = [0], [], []
+    applicable: list[bool] = []
+    goal: list[bool] = []
+
+    try:
+        node = 0
+        while node < len(states):
+            is_goal, layers, children = expand_state(problem, states[node], role_count)
+            goal.append(is_goal)
+            applicable.extend(layers)
+
+            for op_no, child in children:
+                fingerprint = state_fingerprint(child, problem)
+                target = index.get(fingerprint)
+                if target is None:
+                    if len(states) >= state_limit:
+                        raise StateSpaceTooLarge(state_limit)
+                    target = index[fingerprint] = len(states)
+                    states.append(child)
+
+                edge_operators.append(op_no)
+                edge_targets.append(target)
+
+            offsets.append(len(edge_operators))
+            node += 1
+    except StateSpaceTooLarge:
+        raise
+    except Exception as e:
+        print(f"Unable to precompute the state space: {e}")
+        return None
+
+    import numpy as np
+
+    graph = StateGraph(
+        states,
+        FingerprintIndex.build(list(index), np.array(list(index.values()), np.int32)),
+        np.array(offsets, dtype=np.int64),
+        np.array(edge_operators, dtype=np.int16),
+        np.array(edge_targets, dtype=np.int32),
+        pack_applicable(
+            np.array(applicable, dtype=bool).reshape(
+                len(states), len(operators), role_count + 1
+            )
+        ),
+        np.array(goal, dtype=bool),
+        goal_distances(np.array(offsets), np.array(edge_targets), np.array(goal)),
+        len(operators),
+    )
+
+    print(
+        f"Precomputed state space of {len(graph)} states and {len(edge_targets)} transitions "
+        f"in {time.perf_counter() - start_time:.2f}s"
+    )
+
+    return graph
+
+
+def pack_applicable(applicable: np.ndarray) -> np.ndarray:
+    """
+    Packs applicability with shape (nodes, operators, layers) into the bitmap layout StateGraph uses
+    """
+    import numpy as np
+
+    return np.packbits(applicable.transpose(2, 0, 1), axis=2)
+
+
+def goal_distances(
+    offsets: np.ndarray, targets: np.ndarray, goal: np.ndarray
+) -> np.ndarray:
+    """
+    Breadth-first search backwards from every goal at once
+    :return: number of operators from each node to its nearest goal, -1 if none can be reached
+    """
+    import numpy as np
+
+    distance = np.full(len(goal), -1, dtype=np.int32)
+    distance[goal] = 0
+
+    sources = np.repeat(np.arange(len(goal)), np.diff(offsets))
+    frontier = goal.copy()
+    level = 0
+
+    while True:
+        reached = np.unique(sources[frontier[targets] & (distance[sources] < 0)])
+        if len(reached) == 0:
+            return distance
+        level += 1
+        distance[reached] = level
+        frontier[:] = False
+        frontier[reached] = True
+
+
+_graph: StateGraph | None = None
+_graph_problem: Problem | None = None
+
+
+def explore_state_space(state_limit: int, workers: int = 1) -> Optional[StateGraph]:
+    """
+    Explores the loaded problem's state space, split across worker processes if there's more than one
+    :return: the graph, or None if exploring failed
+    :raises StateSpaceTooLarge: if there are more states than the limit
+    """
+    if workers <= 1:
+        return explore(server_globals.PROBLEM, state_limit)
+
+    from soluzion_server.parallel_explore import explore_parallel
+
+    return explore_parallel(server_globals.PROBLEM.__file__, workers, state_limit)
+
+
+def precompute_state_graph(state_limit: int, workers: int = 1):
+    """
+    Loads the state graph from the problem cache, or explores it and caches it
+    """
+    global _graph, _graph_problem
+    _graph_problem = server_globals.PROBLEM
+    cache = get_problem_cache()
+
+    if cache is not None:
+        _graph = StateGraph.load(cache.file("graph"))
+        if _graph is not None:
+            print(f"Loaded cached state space of {len(_graph)} states")
+            return
+
+        # Don't explore again on every restart if the graph was already too large
+        try:
+            with open(cache.file("graph.too-large")) as file:
+                if state_limit <= int(file.read()):
+                    print(f"State space has more than {state_limit} states")
+                    return
+        except (OSError, ValueError):
+            pass
+
+    try:
+        _graph = explore_state_space(state_limit, workers)
+    except StateSpaceTooLarge:
+        print(f"State space has more than {state_limit} states, not precomputing it")
+        # Only a graph too large is remembered, other failures may not happen on the next start
+        if cache is not None:
+            with open(cache.file("graph.too-large"), "w") as file:
+                file.write(str(state_limit))
+        return
+
+    if cache is not None and _graph is not None:
+        _graph.save(cache.file("graph"))
+
+
+def get_state_graph(problem: Problem | None = None) -> StateGraph | None:
+    """
+    :param problem: only get the graph if it's this problem's
+    """
+    if problem is not None and problem is not _graph_problem:
+        return None
+    return _graph
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import weakref
+from typing import Any
+
+import soluzion_server.globals as server_globals
+
+
+def state_fingerprint(state: Any, problem: Any = None) -> bytes:
+    """
+    Gets a fingerprint identifying a state, which is stable across rooms and server processes.
+    Problems can define STATE_FINGERPRINT(state) returning a str or bytes, otherwise the state's __str__
+    text is used, the same as Basic_State.__hash__
+    :param problem: problem the state belongs to, the default one if None
+    :return: 16 byte digest
+    """
+    if problem is None:
+        problem = server_globals.PROBLEM
+    custom = getattr(problem, "STATE_FINGERPRINT", None)
+    key = custom(state) if callable(custom) else str(state)
+    if isinstance(key, str):
+        key = key.encode()
+    return hashlib.blake2b(key, digest_size=16).digest()
+
+
+class StateInterner:
+    """
+    Table of states that are currently held by any game, so identical states can share one instance.
+    Entries are weak references, and are evicted once no game holds the state anymore
+    """
+
+    def __init__(self):
+        self._states: weakref.WeakValueDictionary[bytes, Any] = (
+            weakref.WeakValueDictionary()
+        )
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._states)
+
+    def intern(self, state: Any, problem: Any = None) -> Any:
+        """
+        Gets the shared instance for a state, registering this one if it's the first of its kind
+        :param problem: problem the state belongs to, whose fingerprint is used, the default one if None
+        """
+        try:
+            fingerprint = state_fingerprint(state, problem)
+        except Exception:
+            return state
+
+        with self._lock:
+            existing = self._states.get(fingerprint)
+
+            if existing is not None:
+                # Fingerprints are only a lookup key, the problem's __eq__ has the final say
+                if type(existing) is type(state) and existing == state:
+                    self.hits += 1
+                    return existing
+                return state
+
+            try:
+                self._states[fingerprint] = state
+            except TypeError:
+                # States using __slots__ without __weakref__ can't be interned
+                return state
+
+            self.misses += 1
+            return state
+
+
+intern_table: StateInterner | None = None
+
+
+def enable_state_interning():
+    global intern_table
+    intern_table = StateInterner()
+
+
+def intern_state(state: Any, problem: Any = None) -> Any:
+    """
+    Gets the shared instance for a state if interning is enabled, or the state itself otherwise
+    :param problem: problem the state belongs to, the default one if None
+    """
+    if intern_table is None:
+        return state
+    return intern_table.intern(state, problem)
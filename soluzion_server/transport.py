@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from flask_socketio import SocketIO
+
+from soluzion_server.bots import is_bot, schedule_bot_move
+from soluzion_server.engine import OutboundEvent
+from soluzion_server.globals import current_game
+from soluzion_server.soluzion_types import ServerToClient
+
+_socketio: SocketIO | None = None
+"""Server to send events through, which works outside of a client's request, like for bots"""
+
+
+def configure_transport(socketio: SocketIO):
+    global _socketio
+    _socketio = socketio
+
+
+def deliver(events: list[OutboundEvent]):
+    """
+    Sends the events from the game engine to their recipients. Bots have no socket, so the operators
+    available to them are handed to their policy to pick a move instead
+    """
+    for event in events:
+        if (
+            event.event == ServerToClient.OPERATORS_AVAILABLE
+            and isinstance(event.to, str)
+            and is_bot(event.to)
+        ):
+            game = current_game(event.to)
+            if game is not None:
+                schedule_bot_move(
+                    game,
+                    event.to,
+                    [int(operator["op_no"]) for operator in event.data["operators"]],
+                )
+            continue
+
+        _socketio.emit(event.event.value, event.data, to=event.to)
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class CodecError(ValueError):
+    """A payload didn't match its type"""
+
+
+def _invalid(where: str, value: Any):
+    raise CodecError(f"{where}: unexpected {type(value).__name__} {value!r:.100}")
+
+
+_codecs: dict[tuple[type, bool, bool], Callable] = {}
+_lock = threading.RLock()
+
+
+def _codec(cls: type, trusted: bool, decode: bool) -> Callable:
+    key = (cls, trusted, decode)
+    codec = _codecs.get(key)
+    if codec is not None:
+        return codec
+
+    # The compiler is only loaded once a payload needs it, it isn't needed to start
+    from soluzion_server.codec_compiler import (
+        UnsupportedCode,
+        compile_decoder,
+        compile_encoder,
+    )
+
+    with _lock:
+        codec = _codecs.get(key)
+        if codec is None:
+            try:
+                codec = (compile_decoder if decode else compile_encoder)(cls, trusted)
+            except UnsupportedCode:
+                # Whatever quicktype generated that isn't understood here still works, just slower
+                codec = cls.from_dict if decode else cls.to_dict
+            _codecs[key] = codec
+    return codec
+
+
+def decoder(cls: type[T], trusted: bool = False) -> Callable[[Any], T]:
+    """
+    Gets the compiled from_dict of a soluzion_types class
+    :param trusted: skip checking the payload, for ones the server produced itself
+    """
+    return _codec(cls, trusted, True)
+
+
+def encoder(cls: type[T], trusted: bool = True) -> Callable[[T], dict]:
+    """
+    Gets the compiled to_dict of a soluzion_types class
+    :param trusted: skip checking the object's fields, which the server builds itself
+    """
+    return _codec(cls, trusted, False)
+
+
+def decode(cls: type[T], data: Any, trusted: bool = False) -> T:
+    """
+    Reads a payload into a soluzion_types class, like cls.from_dict but without its exception-driven
+    unions and intermediate calls
+    :param trusted: skip checking the payload, for ones the server produced itself
+    :raises CodecError: if a checked payload doesn't match the type
+    """
+    return _codec(cls, trusted, True)(data)
+
+
+def encode(obj: Any, trusted: bool = True) -> dict:
+    """
+    Turns a soluzion_types object into its payload, like obj.to_dict()
+    :param trusted: skip checking the object's fields, which the server builds itself
+    :raises CodecError: if a checked object doesn't match its type
+    """
+    return _codec(type(obj), trusted, False)(obj)
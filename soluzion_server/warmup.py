@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Callable, Optional
+
+from soluzion_server.engine import is_operator_applicable, serialize_state
+from soluzion_server.metadata import (
+    EncodedPayload,
+    ProblemMetadata,
+    get_metadata,
+    set_metadata,
+)
+from soluzion_server.soluzion_expanded import Problem, operator_name
+from soluzion_server.soluzion_types import (
+    Info,
+    ListOptions,
+    ListRoles,
+    OperatorElement,
+    Param,
+    Role,
+    RoleElement,
+)
+from soluzion_server.state_graph import initial_state
+from soluzion_server.state_interning import intern_state
+from soluzion_server.type_codecs import decode, encode
+
+
+class WarmUpError(Exception):
+    """A problem failed one of the warm-up phases"""
+
+    def __init__(self, phase: str, error: Exception):
+        super().__init__(f"{phase} failed: {error!r}")
+        self.phase = phase
+
+
+def warm_up(problem: Problem, problems: list[str]) -> ProblemMetadata:
+    """
+    Works out and validates everything about a problem that would otherwise be computed on the first
+    requests and moves, timing each phase
+    :param problems: names of every hosted problem, for the info response
+    :raises WarmUpError: naming the phase that failed
+    """
+    timings: list[tuple[str, float]] = []
+
+    def phase(name: str, compute: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            result = compute()
+        except Exception as e:
+            raise WarmUpError(name, e) from e
+        timings.append((name, time.perf_counter() - start))
+        return result
+
+    roles = phase("roles", lambda: [decode(Role, role) for role in _roles_of(problem)])
+    role_list = phase(
+        "role list",
+        lambda: EncodedPayload(
+            encode(
+                ListRoles([decode(RoleElement, role) for role in _roles_of(problem)])
+            )
+        ),
+    )
+    option_list = phase("options", lambda: EncodedPayload(_option_list(problem)))
+    params = phase(
+        "operator params",
+        lambda: [
+            [decode(Param, param) for param in (operator.params or [])]
+            for operator in problem.OPERATORS
+        ],
+    )
+    info = phase("info", lambda: EncodedPayload(_info(problem, problems)))
+
+    state = phase(
+        "initial state", lambda: intern_state(initial_state(problem), problem)
+    )
+    message = phase("initial message", lambda: f"{state}")
+    serialized = phase("initial serialization", lambda: serialize_state(state))
+    initial_operators = phase(
+        "initial operators",
+        lambda: {
+            frozenset(role_set): [
+                OperatorElement(operator_name(operator, state), op_no, params[op_no])
+                for op_no, operator in enumerate(problem.OPERATORS)
+                if is_operator_applicable(operator, state, role_set)
+            ]
+            for role_set in [(), *((role,) for role in range(len(roles)))]
+        },
+    )
+
+    metadata = ProblemMetadata(
+        roles,
+        role_list,
+        option_list,
+        info,
+        params,
+        state,
+        message,
+        serialized,
+        initial_operators,
+    )
+    set_metadata(problem, metadata)
+
+    total = sum(seconds for _, seconds in timings)
+    print(
+        f"Warmed up {problem.__name__} in {total * 1000:.1f}ms: "
+        + ", ".join(f"{name} {seconds * 1000:.1f}ms" for name, seconds in timings)
+    )
+    return metadata
+
+
+def warmed_up(problem: Problem, problems: Callable[[], list[str]]) -> ProblemMetadata:
+    """
+    Gets the metadata of a problem, warming it up first if it hasn't been
+    :param problems: lists the names of every hosted problem, only called if the problem is warmed up
+    """
+    metadata = get_metadata(problem)
+    return metadata if metadata is not None else warm_up(problem, problems())
+
+
+_server_version: Optional[str] = None
+
+
+def server_version() -> str:
+    """
+    Gets the installed version of the server, looked up once as it reads the package metadata from disk
+    """
+    global _server_version
+    if _server_version is None:
+        from importlib.metadata import version
+
+        _server_version = version("soluzion_server")
+    return _server_version
+
+
+def _roles_of(problem: Problem) -> list[dict]:
+    return getattr(problem, "ROLES", None) or []
+
+
+def _option_list(problem: Problem) -> dict[str, Any]:
+    options = getattr(problem, "OPTIONS", None) or []
+    decode(ListOptions, {"options": options})
+    return {"options": options}
+
+
+def _info(problem: Problem, problems: list[str]) -> dict[str, Any]:
+    return encode(
+        Info(
+            getattr(problem, "PROBLEM_AUTHORS", []),
+            getattr(problem, "PROBLEM_CREATION_DATE", ""),
+            getattr(problem, "PROBLEM_DESC", ""),
+            getattr(problem, "PROBLEM_NAME", ""),
+            getattr(problem, "PROBLEM_VERSION", ""),
+            problems,
+            server_version(),
+            getattr(problem, "SOLUZION_VERSION", ""),
+        )
+    )
@@ -0,0 +1,372 @@
+from __future__ import annotations
+
+import itertools
+import json
+import threading
+from typing import Any, Callable, Optional
+
+import simple_websocket
+import socketio
+from engineio import packet as eio_packet
+from flask import Flask, Response, request
+from flask_socketio import SocketIO
+from socketio import packet
+
+from soluzion_server.metadata import EncodedPayload
+from soluzion_server.outbound import OutboundQueue, collapse_key
+
+NAMESPACE = "/"
+
+ENGINEIO_BACKLOG = 8
+"""Number of packets a Socket.IO client's queue lets Engine.IO hold for it before waiting for them to be
+written"""
+
+_client_numbers = itertools.count(1)
+
+
+def encode_frame(*items: Any) -> str:
+    # A payload encoded ahead of time is put in as it is, rather than encoded again
+    if len(items) > 1 and isinstance(items[-1], EncodedPayload):
+        head = json.dumps(list(items[:-1]), separators=(",", ":"))
+        return f"{head[:-1]},{items[-1].json}]"
+    return json.dumps(list(items), separators=(",", ":"))
+
+
+def decode_frame(message: str) -> Optional[tuple[Optional[int], str, list]]:
+    """
+    Reads a frame sent by a client
+    :return: the acknowledgement id if a response is expected, the event name and its arguments, or None
+    if the frame is malformed
+    """
+    try:
+        frame = json.loads(message)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(frame, list):
+        return None
+
+    ack_id = frame.pop(0) if frame and isinstance(frame[0], int) else None
+    if not frame or not isinstance(frame[0], str):
+        return None
+    return ack_id, frame[0], frame[1:]
+
+
+class RawClient:
+    """
+    A client connected to the plain WebSocket endpoint, written to by its OutboundQueue's sender
+    """
+
+    def __init__(self, ws: simple_websocket.Server):
+        self.ws = ws
+
+    def send(self, frame: str):
+        try:
+            self.ws.send(frame)
+        except simple_websocket.ConnectionClosed:
+            pass
+
+
+def _is_threading_queue(packets: Any) -> bool:
+    return isinstance(getattr(packets, "not_full", None), threading.Condition) and (
+        hasattr(getattr(packets, "queue", None), "__len__")
+    )
+
+
+class _ServerInternals:
+    """
+    The parts of python-socketio's server that aren't public but are needed to send through the
+    OutboundQueues and serve plain WebSocket clients, checked for when the server is created so another
+    version fails at startup instead of on the first client
+    """
+
+    def __init__(self, server: socketio.Server):
+        self.server = server
+        eio = server.eio
+        checks = {
+            "Server._send_packet": callable(getattr(server, "_send_packet", None)),
+            "Server._send_eio_packet": callable(
+                getattr(server, "_send_eio_packet", None)
+            ),
+            "Server._trigger_event": callable(getattr(server, "_trigger_event", None)),
+            "Server.environ": isinstance(getattr(server, "environ", None), dict),
+            "Server.not_handled": hasattr(server, "not_handled"),
+            "engineio Server.sockets": isinstance(getattr(eio, "sockets", None), dict),
+            # Each Engine.IO socket's queue is made by create_queue, a queue.Queue whose not_full
+            # condition is notified whenever the writer takes a packet
+            "engineio Socket.queue.not_full": callable(
+                getattr(eio, "create_queue", None)
+            )
+            and _is_threading_queue(eio.create_queue()),
+        }
+        missing = [name for name, found in checks.items() if not found]
+        if missing:
+            from importlib.metadata import version
+
+            raise RuntimeError(
+                f"python-socketio {version('python-socketio')} doesn't have {', '.join(missing)}, "
+                f"which the send queues rely on, install the version setup.py asks for"
+            )
+        self.not_handled = server.not_handled
+
+    def route_acks(self, send: Callable[[str, Any], bool]):
+        """
+        Makes the server hand its acknowledgements to send instead of writing them itself
+        :param send: takes the Engine.IO sid and the ACK packet, returning False to have it written directly
+        """
+        write = self.server._send_packet
+
+        def send_packet(eio_sid, pkt):
+            if pkt.packet_type != packet.ACK or not send(eio_sid, pkt):
+                write(eio_sid, pkt)
+
+        self.server._send_packet = send_packet
+
+    def send_eio_packets(self, eio_sid: str, packets: list[eio_packet.Packet]):
+        for pkt in packets:
+            self.server._send_eio_packet(eio_sid, pkt)
+
+    def wait_for_backlog(self, eio_sid: str, limit: int, timeout: float) -> bool:
+        """
+        Waits until Engine.IO has fewer than limit packets waiting to be written to a client, woken by its
+        writer taking them off the socket's queue
+        :return: whether it has, False if the timeout ran out first
+        """
+        socket = self.server.eio.sockets.get(eio_sid)
+        if socket is None:
+            return True
+        packets = socket.queue
+        with packets.not_full:
+            return packets.not_full.wait_for(
+                lambda: len(packets.queue) < limit, timeout
+            )
+
+    def trigger_event(self, event: str, *args) -> Any:
+        return self.server._trigger_event(event, NAMESPACE, *args)
+
+    def add_environ(self, eio_sid: str, environ: dict):
+        """
+        Registers the environment of a client the server didn't accept itself
+        """
+        self.server.environ[eio_sid] = environ
+
+    def remove_environ(self, eio_sid: str):
+        self.server.environ.pop(eio_sid, None)
+
+
+class SharedRoomManager(socketio.Manager):
+    """
+    Keeps the plain WebSocket clients in the same rooms as the Socket.IO clients, and sends them their
+    events as frames instead of Socket.IO packets. Every client's events go through an OutboundQueue,
+    so a slow client only holds up its own sender, and so do the acknowledgements, which arrive after the
+    events their handler sent
+    """
+
+    def __init__(self, send_queue_limit: int = 256):
+        """
+        :param send_queue_limit: number of events a client may fall behind by before it's disconnected
+        """
+        super().__init__()
+        self.raw_clients: dict[str, RawClient] = {}
+        """Plain WebSocket clients by the stand-in Engine.IO sid they are registered under"""
+
+        self.send_queue_limit = send_queue_limit
+        self.queues: dict[str, OutboundQueue] = {}
+        self.queues_lock = threading.Lock()
+        self.internals: Optional[_ServerInternals] = None
+
+    def set_server(self, server):
+        super().set_server(server)
+        self.internals = _ServerInternals(server)
+        self.internals.route_acks(self._enqueue_ack)
+
+    def _queue(self, sid: str, eio_sid: str) -> OutboundQueue:
+        with self.queues_lock:
+            queue = self.queues.get(sid)
+            if queue is None:
+                client = self.raw_clients.get(eio_sid)
+                if client is not None:
+                    write, ready = client.send, lambda timeout: True
+                else:
+                    write = lambda packets: self.internals.send_eio_packets(
+                        eio_sid, packets
+                    )
+                    ready = lambda timeout: self.internals.wait_for_backlog(
+                        eio_sid, ENGINEIO_BACKLOG, timeout
+                    )
+                queue = self.queues[sid] = OutboundQueue(
+                    sid, write, ready, self.send_queue_limit
+                )
+            return queue
+
+    @staticmethod
+    def _eio_packets(pkt: packet.Packet) -> list[eio_packet.Packet]:
+        encoded = pkt.encode()
+        return [
+            eio_packet.Packet(eio_packet.MESSAGE, part)
+            for part in (encoded if isinstance(encoded, list) else [encoded])
+        ]
+
+    def _enqueue_ack(self, eio_sid: str, pkt: packet.Packet) -> bool:
+        """
+        Queues a Socket.IO acknowledgement behind the events its handler sent, so they arrive first
+        :return: False if the client isn't connected, for the server to send it as it would have
+        """
+        sid = self.sid_from_eio_sid(eio_sid, pkt.namespace or NAMESPACE)
+        if sid is None:
+            return False
+        self.enqueue(sid, eio_sid, None, self._eio_packets(pkt))
+        return True
+
+    def enqueue(self, sid: str, eio_sid: str, key, payload) -> bool:
+        """
+        Queues a payload for a client, disconnecting it if it has fallen too far behind
+        :param payload: a frame for plain WebSocket clients, or a list of Engine.IO packets
+        """
+        if self._queue(sid, eio_sid).put(key, payload):
+            return True
+
+        print(
+            f"Disconnecting {sid}, which fell more than {self.send_queue_limit} events behind"
+        )
+        client = self.raw_clients.get(eio_sid)
+        if client is not None:
+            self.server.start_background_task(client.ws.close)
+        else:
+            self.server.start_background_task(self.server.disconnect, sid, NAMESPACE)
+        return False
+
+    def emit(
+        self,
+        event,
+        data,
+        namespace,
+        room=None,
+        skip_sid=None,
+        callback=None,
+        to=None,
+        **kwargs,
+    ):
+        if callback is not None or namespace not in self.rooms:
+            return super().emit(
+                event,
+                data,
+                namespace,
+                room=room,
+                skip_sid=skip_sid,
+                callback=callback,
+                to=to,
+                **kwargs,
+            )
+
+        skip_sids = skip_sid if isinstance(skip_sid, list) else [skip_sid]
+        if isinstance(data, tuple):
+            args = list(data)
+        else:
+            args = [data] if data is not None else []
+        key = collapse_key(event, data)
+
+        # Each form is only encoded once, however many clients get it
+        frame = None
+        packets = None
+        for sid, eio_sid in self.get_participants(namespace, to or room):
+            if sid in skip_sids:
+                continue
+            if eio_sid in self.raw_clients:
+                if frame is None:
+                    frame = encode_frame(event, *args)
+                self.enqueue(sid, eio_sid, key, frame)
+            else:
+                if packets is None:
+                    packets = self._eio_packets(
+                        self.server.packet_class(
+                            packet.EVENT, namespace=namespace, data=[event, *args]
+                        )
+                    )
+                self.enqueue(sid, eio_sid, key, packets)
+
+    def disconnect(self, sid, namespace, **kwargs):
+        with self.queues_lock:
+            queue = self.queues.pop(sid, None)
+        if queue is not None:
+            queue.close()
+        return super().disconnect(sid, namespace, **kwargs)
+
+
+def _serve(manager: SharedRoomManager, ws, environ: dict):
+    """
+    Registers the client with the Socket.IO server under a stand-in Engine.IO sid, then runs the same
+    handlers as Socket.IO events for each frame until it disconnects
+    """
+    eio_sid = f"ws-{next(_client_numbers)}"
+    client = RawClient(ws)
+    internals = manager.internals
+
+    internals.add_environ(eio_sid, environ)
+    manager.raw_clients[eio_sid] = client
+    sid = manager.connect(eio_sid, NAMESPACE)
+
+    try:
+        internals.trigger_event("connect", sid, environ, None)
+
+        while True:
+            frame = decode_frame(ws.receive())
+            if frame is None:
+                print(f"Ignoring malformed frame from {sid}")
+                continue
+            ack_id, event, args = frame
+
+            try:
+                response = internals.trigger_event(event, sid, *args)
+            except Exception as e:
+                print(f"Error handling {event} from {sid}: {e}")
+                response = None
+
+            if ack_id is not None:
+                if response is internals.not_handled:
+                    response = None
+                # Queued behind the events the handler sent, so they arrive first
+                manager.enqueue(sid, eio_sid, None, encode_frame(ack_id, response))
+    except simple_websocket.ConnectionClosed:
+        pass
+    finally:
+        manager.pre_disconnect(sid, NAMESPACE)
+        internals.trigger_event("disconnect", sid)
+        manager.disconnect(sid, NAMESPACE)
+        del manager.raw_clients[eio_sid]
+        internals.remove_environ(eio_sid)
+
+
+class _ClosedResponse(Response):
+    """
+    Stands in for the response once the WebSocket closes, since the connection was handed over
+    """
+
+    def __init__(self, mode: str):
+        super().__init__()
+        self.mode = mode
+
+    def __call__(self, environ, start_response):
+        if self.mode == "werkzeug":
+            # Werkzeug treats this as the client hanging up, instead of writing a response
+            raise ConnectionError()
+        if self.mode == "gunicorn":
+            raise StopIteration()
+        return []
+
+
+def configure_websocket_endpoint(app: Flask, socketio_server: SocketIO, path: str):
+    """
+    Adds a plain WebSocket endpoint speaking the same events as Socket.IO, without its handshake,
+    polling fallback and packet encoding. Each frame is a JSON array, [event, data] for an event, or
+    [id, event, data] for an event expecting the handler's response back as [id, response]
+    """
+    server = socketio_server.server
+    manager = server.manager
+    if not isinstance(manager, SharedRoomManager):
+        raise ValueError("The Socket.IO server needs a SharedRoomManager")
+
+    @app.route(path, websocket=True)
+    def websocket():
+        ws = simple_websocket.Server.accept(request.environ, ping_interval=25)
+        _serve(manager, ws, request.environ)
+        return _ClosedResponse(ws.mode)
@@ -173,7 +173,9 @@ def main():
             sio.emit(ClientToServer.CREATE_ROOM.value, CreateRoom(args.room).to_dict())
             sio.emit(
                 ClientToServer.JOIN_ROOM.value,
-                JoinRoom(args.room, args.username).to_dict(),
+                JoinRoom(
+                    [StateRepresentation.MESSAGE], args.room, args.username
+                ).to_dict(),
             )
             if args.roles is not None:
                 sio.emit(ClientToServer.SET_ROLES.value, SetRoles(args.roles).to_dict())
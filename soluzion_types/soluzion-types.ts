@@ -17,6 +17,10 @@ type ClientToServerEvents = {
    */
   create_room: {
     room: string;
+    /**
+     * Name of the hosted problem to play in the room, the server's default problem if absent
+     */
+    problem?: string | null;
   };
   /**
    * Request for the server to delete an empty room
@@ -30,6 +34,15 @@ type ClientToServerEvents = {
   join_room: {
     room: string;
     username: string | null;
+    /**
+     * Representations of the state to receive in game_started and operator_applied, both if absent
+     */
+    representations?: StateRepresentation[] | null;
+    /**
+     * Receive a single step event for each operator applied, instead of transition, operator_applied, game_ended and
+     * operators_available
+     */
+    step_events?: boolean | null;
   };
   /**
    * Request to set the sender's username
@@ -79,6 +92,47 @@ type ClientToServerEvents = {
    * Get information about the problem and the server
    */
   info: {};
+  /**
+   * Request the next operator on the way to a goal from the current state of the sender's game
+   */
+  hint: {};
+  /**
+   * Request a sequence of operators leading from the current state of the sender's game to a goal
+   */
+  solve: {};
+  /**
+   * Request the best operator for the sender's roles in the current state of their game, from a game tree search
+   */
+  best_move: {};
+  /**
+   * Request for a bot player, played by the server, to join the sender's room
+   */
+  add_bot: {
+    /**
+     * How the bot picks its operators, "random" if absent
+     */
+    policy?: BotPolicy | null;
+    /**
+     * Roles for the bot to play
+     */
+    roles?: number[] | null;
+    username?: string | null;
+  };
+  /**
+   * Request to remove a bot player from the sender's room
+   */
+  remove_bot: {
+    /**
+     * Sid of the bot, as listed in the room's players
+     */
+    sid: string;
+  };
+  /**
+   * Request for the sender to watch the games in a room without playing, until they leave_room
+   */
+  spectate: {
+    room: string;
+  };
 };
 
 type ClientToServerResponse = {
@@ -99,7 +153,47 @@ type ClientToServerResponse = {
     problem_authors: string[];
     problem_creation_date: string;
     problem_desc: string;
+    /**
+     * Names of every problem the server hosts, any of which can be played in a new room
+     */
+    problems?: string[] | null;
+  };
+  hint: {
+    /**
+     * Next operator to apply, null if the state is a goal or no goal can be reached
+     */
+    operator: PlanOperator | null;
+    /**
+     * Number of operators between the state and the nearest goal, null if no goal can be reached
+     */
+    distance: number | null;
+  };
+  solve: {
+    /**
+     * Operators leading to the nearest goal, null if no goal can be reached
+     */
+    operators: PlanOperator[] | null;
   };
+  best_move: {
+    /**
+     * Best operator to apply, null if the sender has no move
+     */
+    operator: PlanOperator | null;
+    /**
+     * Score of the position after the move for the sender, from a win at 1000000 to a loss at -1000000.
+     * Null if the search didn't complete any depth
+     */
+    score: number | null;
+    /**
+     * Number of moves ahead the search looked
+     */
+    depth: number;
+  };
+};
+
+type PlanOperator = {
+  name: string;
+  op_no: number;
 };
 
 type Room = {
@@ -107,8 +201,23 @@ type Room = {
   owner: string;
   in_game: boolean;
   players: Player[];
+  /**
+   * Name of the problem played in the room
+   */
+  problem?: string | null;
 };
 
+/**
+ * "message" is the state's __str__ text, "state" is its serialized form
+ */
+type StateRepresentation = "message" | "state";
+
+/**
+ * How a bot picks its operators. "random" picks any applicable operator, "plan" follows the shortest path to a goal,
+ * and "best" uses the game tree search of best_move
+ */
+type BotPolicy = "random" | "plan" | "best";
+
 type Player = {
   sid: string;
   name: string;
@@ -170,13 +279,13 @@ type ServerToClientEvents = {
    */
   game_started: {
     /**
-     * JSON representation of new state
+     * JSON representation of new state, null unless the client requested the "state" representation
      */
     state: string | null;
     /**
-     * new state's __str__ message
+     * new state's __str__ message, null unless the client requested the "message" representation
      */
-    message: string;
+    message: string | null;
   };
   /**
    * The game has ended for the current client's room
@@ -189,13 +298,13 @@ type ServerToClientEvents = {
    */
   operator_applied: {
     /**
-     * JSON representation of new state
+     * JSON representation of new state, null unless the client requested the "state" representation
      */
     state: string | null;
     /**
-     * new state's __str__ output
+     * new state's __str__ output, null unless the client requested the "message" representation
      */
-    message: string;
+    message: string | null;
     operator: {
       name: string;
       op_no: number;
@@ -225,6 +334,37 @@ type ServerToClientEvents = {
   transition: {
     message: string;
   };
+  /**
+   * Everything one operator application produced in the current client's game, sent in place of transition,
+   * operator_applied, game_ended and operators_available to clients that joined with step_events
+   */
+  step: {
+    /**
+     * Number of operators applied in the game so far, including this one
+     */
+    step: number;
+    operator: ServerToClientEvents["operator_applied"]["operator"];
+    /**
+     * Messages of the transitions the operator triggered, in order
+     */
+    transitions: string[];
+    /**
+     * JSON representation of new state, null unless the client requested the "state" representation
+     */
+    state: string | null;
+    /**
+     * new state's __str__ output, null unless the client requested the "message" representation
+     */
+    message: string | null;
+    /**
+     * Goal message if the operator ended the game, null otherwise
+     */
+    game_ended: string | null;
+    /**
+     * Operators now available to the client
+     */
+    operators: ServerToClientEvents["operators_available"]["operators"];
+  };
 };
 
 type ErrorResponse = {
@@ -243,7 +383,14 @@ type ServerError =
   | "GameNotStarted"
   | "InvalidOperator"
   | "InvalidRoles"
-  | "ResponseTimeout";
+  | "InvalidState"
+  | "NoSuchBot"
+  | "Overloaded"
+  | "ProblemHostFailed"
+  | "RateLimited"
+  | "ResponseTimeout"
+  | "SearchBudgetExceeded"
+  | "UnknownProblem";
 
 type Role = {
   name: string;